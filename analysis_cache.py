@@ -0,0 +1,152 @@
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.listeners = []  # progress callbacks of every caller waiting on this computation
+        self.progress = None  # latest (stage, details) the computation reported
+
+
+class AnalysisCache:
+    """Two-tier analysis cache: a bounded in-process LRU with TTL in front of Redis.
+
+    Lookups hit the local tier first, then Redis (when a client is given), and
+    Redis hits are promoted into the local tier. ``single_flight`` coalesces
+    concurrent identical computations so only one caller does the work and the
+    others wait for its result.
+    """
+
+    def __init__(self, redis_client=None, max_entries: int = 512, ttl: int = 24 * 60 * 60):
+        self.redis_client = redis_client
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        self._local: 'OrderedDict[str, tuple]' = OrderedDict()  # key -> (expires_at, value)
+        self._inflight: Dict[str, _InFlight] = {}
+        self.counters = {'local_hits': 0, 'redis_hits': 0, 'misses': 0, 'coalesced': 0}
+
+    @staticmethod
+    def filing_key(ticker: str, accession: str) -> str:
+        return f"analysis:{ticker.upper()}:{accession}"
+
+    def _get_local(self, key: str) -> Optional[Any]:
+        with self.lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value: Any):
+        with self.lock:
+            self._local[key] = (time.time() + self.ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _count(self, counter: str):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._get_local(key)
+        if value is not None:
+            self._count('local_hits')
+            return value
+        if self.redis_client is not None:
+            try:
+                cached = self.redis_client.get(key)
+                if cached:
+                    value = json.loads(cached)
+                    self._set_local(key, value)
+                    self._count('redis_hits')
+                    return value
+            except Exception as e:
+                self.logger.warning(f"Redis get failed for {key}: {str(e)}")
+        self._count('misses')
+        return None
+
+    def set(self, key: str, value: Any):
+        self._set_local(key, value)
+        if self.redis_client is not None:
+            try:
+                self.redis_client.setex(key, timedelta(seconds=self.ttl), json.dumps(value))
+            except Exception as e:
+                self.logger.warning(f"Redis set failed for {key}: {str(e)}")
+
+    def single_flight(self, key: str, compute: Callable[..., Any],
+                      progress: Optional[Callable[..., None]] = None) -> Any:
+        """Run ``compute`` once per key at a time; concurrent callers share its result.
+
+        With ``progress(stage, **details)``, ``compute`` is called with a reporter
+        of the same form, and each report reaches every caller that passed one,
+        so coalesced callers see the leader's progress. A caller joining mid-way
+        first gets the latest report.
+        """
+        with self.lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InFlight()
+            else:
+                self.counters['coalesced'] += 1
+            if progress is not None:
+                call.listeners.append(progress)
+            latest = call.progress
+
+        if not leader:
+            if progress is not None and latest is not None:
+                progress(latest[0], **latest[1])
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        def report(stage: str, **details):
+            with self.lock:
+                call.progress = (stage, details)
+                listeners = list(call.listeners)
+            for listener in listeners:
+                try:
+                    listener(stage, **details)
+                except Exception as e:
+                    self.logger.warning(f"Progress callback failed for {key}: {str(e)}")
+
+        try:
+            call.result = compute(report) if progress is not None else compute()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self._inflight[key]
+            call.event.set()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            counters = dict(self.counters)
+            local_entries = len(self._local)
+        lookups = counters['local_hits'] + counters['redis_hits'] + counters['misses']
+        hits = counters['local_hits'] + counters['redis_hits']
+        return {
+            **counters,
+            'hit_rate': hits / lookups if lookups else None,
+            'local_entries': local_entries,
+            'max_entries': self.max_entries,
+            'redis': self.redis_client is not None
+        }
@@ -1,25 +1,93 @@
 import os
 import json
 import logging
-import time
 import traceback
 import re
 import random
 import tempfile
 import shutil
-from typing import Optional, Tuple, List, Dict, Any
-from bs4 import BeautifulSoup
+import argparse
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Optional, Tuple, List, Dict, Any, Callable, Iterator
 import openai
 from download_10k import SP500Downloader
+from html_cleaner import clean_html, clean_html_buffer
+from metric_extractor import metric_extractor
+from xbrl_facts import xbrl_fact_extractor
+from artifact_cache import artifact_cache
+from analysis_cache import AnalysisCache
+from llm_scheduler import llm_scheduler, LLMRequestError, CHARS_PER_TOKEN
+from llm_cache import llm_response_cache
+from section_splitter import SECTION_NAMES, find_sections, chunk_text
+from section_index import get_section_index
+from search_index import FilingSearchIndex
+from filing_catalog import catalog_for
+from filing_store import filing_store, map_filing_path
+
+# Share of the summary token budget per 10-K Item; MD&A carries the most signal
+SECTION_WEIGHTS = {'1': 0.15, '1A': 0.2, '7': 0.35, '7A': 0.1, '8': 0.2}
+SECTION_NOTE_MAX_TOKENS = 400
+# Bump whenever the summary prompts or the map-reduce plan change so cached summaries are not reused
+SUMMARY_PROMPT_VERSION = '2'
+# Items the prose metric fallback scans: MD&A and the financial statements
+METRIC_ITEMS = ('7', '8')
+
+def _clean_and_extract(content) -> Tuple[str, Dict]:
+    """``content`` is the filing as text, or as raw UTF-8 bytes (or an mmap)
+    that are cleaned and scanned for XBRL facts without being decoded whole."""
+    if isinstance(content, str):
+        cleaned = clean_html(content)
+        metrics = xbrl_fact_extractor.extract(content)
+    else:
+        cleaned = clean_html_buffer(content)
+        metrics = xbrl_fact_extractor.extract_buffer(content)
+    if not metrics:
+        sections = find_sections(cleaned)
+        spans = [(sections[item]['start'], sections[item]['end']) for item in METRIC_ITEMS if item in sections]
+        metrics, _ = metric_extractor.extract(cleaned, spans)
+    return cleaned, metrics
+
+def prepare_content(content: str) -> Dict:
+    """Return {'cleaned', 'metrics'} for in-memory filing content, via the artifact cache."""
+    key = artifact_cache.key_for_bytes(content.encode('utf-8'))
+    return artifact_cache.get_or_compute(key, lambda: _clean_and_extract(content))
+
+def prepare_filing(filing_path: str) -> Dict:
+    """Clean a filing and extract its metrics, reusing cached artifacts when the file is unchanged.
+
+    Also makes sure the filing's section index (see ``section_index``) exists
+    and returns its Item offsets into the cleaned text as ``'sections'``.
+    Pure CPU work with no API calls, defined at module level so it can run in
+    a ProcessPoolExecutor worker.
+    """
+    try:
+        def compute():
+            # Downloads are saved as the raw bytes served, which aren't always valid UTF-8;
+            # the cleaner and the XBRL scan decode only what they need, with replacement
+            with map_filing_path(filing_path) as raw:
+                return _clean_and_extract(raw)
+
+        prepared = artifact_cache.get_or_compute(artifact_cache.key_for_file(filing_path), compute)
+        index = get_section_index(filing_path, prepared['cleaned'])
+        return {**prepared, 'sections': index['sections'] if index else None}
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Error preparing filing {filing_path}: {str(e)}")
+        return {'cleaned': '', 'metrics': {}, 'sections': None}
 
 class TenKAnalyzer:
-    def __init__(self, downloader: SP500Downloader, base_dir: str = "downloads"):
+    def __init__(self, downloader: SP500Downloader, base_dir: str = "downloads",
+                 analysis_cache: Optional[AnalysisCache] = None):
         self.downloader = downloader
         self.base_dir = base_dir
+        self.catalog = catalog_for(base_dir)
+        self.analysis_cache = analysis_cache
         self.output_dir = "analysis"
         self.deployment_name = "gpt-4"
-        self.rate_limit_delay = 1  # seconds between API calls
-        self.last_api_call = 0
+        self.llm_scheduler = llm_scheduler
+        self.llm_cache = llm_response_cache
+        # Input tokens spent reading each filing in the map stage, and per request
+        self.summary_token_budget = int(os.getenv('SUMMARY_TOKEN_BUDGET', 8000))
+        self.summary_chunk_tokens = int(os.getenv('SUMMARY_CHUNK_TOKENS', 2000))
         
         # Create output directory if it doesn't exist
         if not os.path.exists(self.output_dir):
@@ -51,26 +119,8 @@ class TenKAnalyzer:
                 
             self.logger.info(f"Original content length: {len(html_content)}")
             
-            # Parse HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Get text content
-            text = soup.get_text()
-            
-            # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            # Remove excessive whitespace
-            text = re.sub(r'\s+', ' ', text)
-            
-            # Remove empty lines
-            text = '\n'.join(line for line in text.splitlines() if line.strip())
+            # lxml streaming fast path when installed, BeautifulSoup otherwise
+            text = clean_html(html_content)
             
             self.logger.info(f"Cleaned HTML content. Length: {len(text)}")
             
@@ -99,270 +149,225 @@ class TenKAnalyzer:
     def find_company_path(self, ticker: str) -> Optional[str]:
         """Find the company directory path for a given ticker."""
         try:
-            # Look through all sector directories
-            for sector in os.listdir(self.base_dir):
-                sector_path = os.path.join(self.base_dir, sector)
-                if os.path.isdir(sector_path):
-                    # Look for files matching the ticker directly in the sector directory
-                    for file in os.listdir(sector_path):
-                        if file.startswith(f"{ticker}_") and (file.endswith('.html') or file.endswith('_10K_raw.html')):
-                                    return sector_path
-            return None
+            # The directory (company, sector or ticker) holding the latest filing
+            return self.catalog.company_path(ticker)
         except Exception as e:
             print(f"Error finding company path for {ticker}: {str(e)}")
             return None
 
-    def get_latest_filing(self, company_path: str, ticker: str) -> Optional[Tuple[str, str]]:
-        """Get the latest 10-K filing for a company."""
+    def get_latest_filing_path(self, company_path: str, ticker: str) -> Optional[Tuple[str, str]]:
+        """Return (date, path) of the latest 10-K filing for a company without reading it."""
         try:
-            # Look for files with .html suffix
-            filings = []
-            for file in os.listdir(company_path):
-                if file.startswith(f"{ticker}_") and (file.endswith('.html') or file.endswith('_10K_raw.html')):
-                    # Extract date from filename
-                    date_str = file.split('_')[1].split('.')[0]
-                    filings.append((date_str, file))
-            
-            if not filings:
+            company = os.path.relpath(company_path, self.base_dir).split(os.sep)[0]
+            latest = self.catalog.latest(ticker, company)
+            if not latest:
                 print(f"No valid 10-K files found for {ticker}")
                 return None
 
-            # Sort by date and get the latest
-            latest = sorted(filings, reverse=True)[0]
-            print(f"Found latest filing: {latest[1]}")
-            
-            # Read the file content
-            with open(os.path.join(company_path, latest[1]), 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            return latest[0], content
+            print(f"Found latest filing: {os.path.basename(latest['path'])}")
+            return latest['date'], latest['path']
         except Exception as e:
             print(f"Error getting latest filing for {ticker}: {str(e)}")
             return None
 
-    def respect_rate_limit(self):
-        """Ensure we don't exceed rate limits."""
-        elapsed = time.time() - self.last_api_call
-        if elapsed < self.rate_limit_delay:
-            time.sleep(self.rate_limit_delay - elapsed)
-        self.last_api_call = time.time()
-
     def analyze_filing(self, filing_path: str) -> str:
         """Analyze a single 10-K filing and return cleaned content."""
         try:
-            with open(filing_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Clean the HTML content
-            cleaned_content = self.clean_html_content(content)
+            # Feed the cleaner slices of an mmap rather than decoding the whole file
+            with map_filing_path(filing_path) as raw:
+                self.logger.info(f"Original content length: {len(raw)}")
+                cleaned_content = clean_html_buffer(raw)
+            self.logger.info(f"Cleaned HTML content. Length: {len(cleaned_content)}")
             return cleaned_content
             
         except Exception as e:
             self.logger.error(f"Error analyzing filing {filing_path}: {str(e)}")
             return ""
 
-    def analyze_multiple_years(self, ticker: str, years: int = 5) -> Dict:
-        """Analyze multiple years of 10-K filings for a company."""
+    def analyze_multiple_years(self, ticker: str, years: int = 5,
+                               progress: Optional[Callable[..., None]] = None) -> Dict:
+        """Analyze multiple years of 10-K filings for a company.
+
+        ``progress(stage, **details)`` is called as the analysis advances, with a
+        per-filing stage map under ``filings``, so job pollers can report it.
+        """
+        result = {}
+        analyses = []
+        for event, data in self.iter_analysis_events(ticker, years, progress=progress, stream_summary=False):
+            if event == 'error':
+                return data
+            if event == 'company':
+                result = {'ticker': ticker, 'company_name': data['company_name'], 'sector': data['sector']}
+            elif event == 'analysis':
+                analyses.append(data)
+        return {**result, 'analyses': analyses}
+
+    def iter_analysis_events(self, ticker: str, years: int = 5,
+                             progress: Optional[Callable[..., None]] = None,
+                             stream_summary: bool = True) -> Iterator[Tuple[str, Dict]]:
+        """Yield (event, data) pairs as a multi-year analysis advances.
+
+        Events are ``company`` once, then ``metrics`` for every year as soon as
+        its extraction finishes, then per year either ``summary`` token chunks
+        (when ``stream_summary``) followed by the complete ``analysis``, and a
+        final ``done``. Failures yield a single ``error`` event instead.
+        """
+        filing_stages = {}
+
+        def report(stage: str, filing: Optional[Dict] = None, filing_stage: Optional[str] = None):
+            if filing is not None:
+                filing_stages[filing['date']] = filing_stage
+            if progress:
+                progress(stage, filings=dict(filing_stages))
+
         try:
             self.logger.info(f"Starting analysis for {ticker}")
+            report('resolving_company')
             
             # Get company info
             company_info = self.downloader.get_company_info(ticker)
             if not company_info:
                 self.logger.error(f"Could not find company info for {ticker}")
-                return {'error': f'Company {ticker} not found in S&P 500'}
+                yield 'error', {'error': f'Company {ticker} not found in S&P 500'}
+                return
             
             # Get filings
+            report('finding_filings')
             filings = self.downloader.get_company_filings(company_info['cik'], years)
             if not filings:
                 self.logger.error(f"No filings found for {ticker}")
-                return {'error': f'No filings found for {ticker}'}
+                yield 'error', {'error': f'No filings found for {ticker}'}
+                return
+            for filing in filings:
+                filing_stages[filing['date']] = 'queued'
+            yield 'company', {
+                'ticker': ticker,
+                'company_name': company_info['name'],
+                'sector': company_info['sector'],
+                'filing_dates': [filing['date'] for filing in filings]
+            }
+            
+            # Per-filing results are cached by accession number; filed 10-Ks never change
+            cached = {}
+            if self.analysis_cache:
+                for filing in filings:
+                    hit = self.analysis_cache.get(self.analysis_cache.filing_key(ticker, filing['accession_number']))
+                    if hit:
+                        cached[filing['accession_number']] = hit
+                        filing_stages[filing['date']] = 'cached'
+                self.logger.info(f"{len(cached)}/{len(filings)} filings for {ticker} served from cache")
             
-            analyses = []
+            # Download every uncached year concurrently before the CPU-bound analysis
+            report('downloading')
+            downloaded = self.downloader.download_filings(
+                [(filing, company_info['sector'], ticker) for filing in filings
+                 if filing['accession_number'] not in cached]
+            )
+            
+            # Extract every year's metrics first so they reach the client before
+            # any of the slow summaries
+            prepared_filings = []
             for filing in filings:
-                # Download the filing
-                self.logger.info(f"Downloading filing for {ticker} on {filing['date']}")
-                filing_path = self.downloader.download_filing(
-                    filing=filing,
-                    sector=company_info['sector'],
-                    ticker=ticker
-                )
+                if filing['accession_number'] in cached:
+                    analysis = cached[filing['accession_number']]
+                    yield 'metrics', {key: analysis[key] for key in ('year', 'filing_date', 'metrics')}
+                    prepared_filings.append((filing, None))
+                    continue
+                
+                filing_path = downloaded.get(filing['accession_number'])
                 if not filing_path:
                     self.logger.error(f"Failed to download filing for {ticker} on {filing['date']}")
+                    report('analyzing', filing, 'download_failed')
                     continue
                 self.logger.info(f"Downloaded filing to {filing_path}")
                 
-                # Read and analyze the filing
-                with open(filing_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                if not content:
-                    self.logger.error(f"Empty filing content for {ticker} on {filing['date']}")
-                    continue
-                
-                # Clean the content
-                cleaned_content = self.clean_html_content(content)
-                if not cleaned_content:
+                # Clean the filing and extract metrics (tagged XBRL facts, prose
+                # regex as fallback); unchanged filings come from the artifact cache
+                report('analyzing', filing, 'extracting')
+                prepared = prepare_filing(filing_path)
+                if not prepared['cleaned']:
                     self.logger.error(f"Failed to clean content for {ticker} on {filing['date']}")
+                    report('analyzing', filing, 'extract_failed')
                     continue
                 
-                self.logger.info(f"Content length before cleaning: {len(content)}")
-                self.logger.info(f"Content length after cleaning: {len(cleaned_content)}")
-                self.logger.info(f"First 500 characters of cleaned content: {cleaned_content[:500]}")
-                
-                # Extract financial metrics
-                metrics = self.extract_financial_metrics(cleaned_content)
+                self.logger.info(f"Content length after cleaning: {len(prepared['cleaned'])}")
+                report('analyzing', filing, 'extracted')
+                yield 'metrics', {
+                    'year': filing['date'].split('-')[0],
+                    'filing_date': filing['date'],
+                    'metrics': prepared['metrics']
+                }
+                prepared_filings.append((filing, prepared))
+            
+            # Without streaming, every year's summary is requested at once and the
+            # scheduler runs them concurrently within the OpenAI budgets
+            pending_summaries = {}
+            if not stream_summary:
+                for filing, prepared in prepared_filings:
+                    if prepared is not None:
+                        pending_summaries[filing['accession_number']] = self.llm_scheduler.submit(
+                            self.generate_detailed_summary,
+                            prepared['cleaned'], prepared['metrics'], filing['date'].split('-')[0],
+                            prepared.get('sections')
+                        )
+            
+            for filing, prepared in prepared_filings:
+                if prepared is None:
+                    yield 'analysis', cached[filing['accession_number']]
+                    continue
                 
                 # Get filing year from the filing date
                 filing_year = filing['date'].split('-')[0]
                 
                 # Generate detailed summary
-                summary = self.generate_detailed_summary(cleaned_content, metrics, filing_year)
+                report('analyzing', filing, 'summarizing')
+                if stream_summary:
+                    parts = []
+                    for token in self.stream_detailed_summary(prepared['cleaned'], prepared['metrics'], filing_year,
+                                                              prepared.get('sections')):
+                        parts.append(token)
+                        yield 'summary', {'year': filing_year, 'filing_date': filing['date'], 'token': token}
+                    summary = ''.join(parts)
+                else:
+                    summary = pending_summaries[filing['accession_number']].result()
+                report('analyzing', filing, 'done')
                 
-                analyses.append({
+                analysis = {
                     'year': filing_year,
                     'filing_date': filing['date'],
-                    'metrics': metrics,
+                    'metrics': prepared['metrics'],
                     'summary': summary
-                })
+                }
+                yield 'analysis', analysis
+                
+                # Failed summaries come back as "Error..." strings; don't cache those
+                if self.analysis_cache and not summary.startswith('Error'):
+                    self.analysis_cache.set(
+                        self.analysis_cache.filing_key(ticker, filing['accession_number']),
+                        analysis
+                    )
             
-            # Return the analysis results
-            return {
-                'ticker': ticker,
-                'company_name': company_info['name'],
-                'sector': company_info['sector'],
-                'analyses': analyses
-            }
+            yield 'done', {'ticker': ticker, 'years': len(prepared_filings)}
             
         except Exception as e:
-            self.logger.error(f"Error in analyze_multiple_years: {str(e)}")
+            self.logger.error(f"Error in iter_analysis_events: {str(e)}")
             self.logger.error(traceback.format_exc())
-            return {'error': f'Error analyzing {ticker}: {str(e)}'}
+            yield 'error', {'error': f'Error analyzing {ticker}: {str(e)}'}
+
+    def extract_financial_metrics(self, content: str, positions: Optional[Dict] = None) -> Dict:
+        """Extract key financial metrics from the content.
 
-    def extract_financial_metrics(self, content: str) -> Dict:
-        """Extract key financial metrics from the content."""
+        All metric labels are found in a single scan (see ``MetricExtractor``).
+        Pass a dict as ``positions`` to receive the label/value offsets of each
+        metric for auditing.
+        """
         try:
-            metrics = {}
             self.logger.info("Starting financial metrics extraction")
-
-            # Revenue
-            revenue_patterns = [
-                r'(?:revenue|sales|net sales).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:total revenue|total sales).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:consolidated revenue|consolidated sales).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)'
-            ]
-            for pattern in revenue_patterns:
-                revenue_match = re.search(pattern, content, re.IGNORECASE)
-                if revenue_match:
-                    metrics['revenue'] = self._parse_currency(revenue_match.group(1))
-                    self.logger.info(f"Found revenue: {metrics['revenue']}")
-                    break
-
-            # Gross Profit and Margin
-            gross_profit_patterns = [
-                r'(?:gross profit).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:gross income).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:gross earnings).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)'
-            ]
-            for pattern in gross_profit_patterns:
-                gross_profit_match = re.search(pattern, content, re.IGNORECASE)
-                if gross_profit_match:
-                    metrics['gross_profit'] = self._parse_currency(gross_profit_match.group(1))
-                    if metrics.get('revenue'):
-                        metrics['gross_margin'] = metrics['gross_profit'] / metrics['revenue']
-                        self.logger.info(f"Found gross profit: {metrics['gross_profit']} and margin: {metrics['gross_margin']}")
-                    break
-
-            # Operating Income (EBIT)
-            operating_income_patterns = [
-                r'(?:operating income|operating profit|EBIT).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:income from operations).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:operating earnings).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)'
-            ]
-            for pattern in operating_income_patterns:
-                operating_income_match = re.search(pattern, content, re.IGNORECASE)
-                if operating_income_match:
-                    metrics['operating_income'] = self._parse_currency(operating_income_match.group(1))
-                    self.logger.info(f"Found operating income: {metrics['operating_income']}")
-                    break
-
-            # Net Income
-            net_income_patterns = [
-                r'(?:net income|net earnings|net profit).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:net loss).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:consolidated net income).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)'
-            ]
-            for pattern in net_income_patterns:
-                net_income_match = re.search(pattern, content, re.IGNORECASE)
-                if net_income_match:
-                    value = self._parse_currency(net_income_match.group(1))
-                    # If it's a loss, make it negative
-                    if 'loss' in net_income_match.group(0).lower():
-                        value = -value
-                    metrics['net_income'] = value
-                    self.logger.info(f"Found net income: {metrics['net_income']}")
-                    break
-
-            # EPS
-            eps_patterns = [
-                r'(?:earnings per share|EPS).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:basic earnings per share).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:diluted earnings per share).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)'
-            ]
-            for pattern in eps_patterns:
-                eps_match = re.search(pattern, content, re.IGNORECASE)
-                if eps_match:
-                    metrics['eps'] = self._parse_currency(eps_match.group(1))
-                    self.logger.info(f"Found EPS: {metrics['eps']}")
-                    break
-
-            # Free Cash Flow
-            fcf_patterns = [
-                r'(?:free cash flow|FCF).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:operating cash flow).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:net cash provided by operating activities).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)'
-            ]
-            for pattern in fcf_patterns:
-                fcf_match = re.search(pattern, content, re.IGNORECASE)
-                if fcf_match:
-                    metrics['free_cash_flow'] = self._parse_currency(fcf_match.group(1))
-                    self.logger.info(f"Found free cash flow: {metrics['free_cash_flow']}")
-                    break
-
-            # Total Assets (for ROA)
-            assets_patterns = [
-                r'(?:total assets).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:consolidated total assets).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:total assets at end of period).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)'
-            ]
-            for pattern in assets_patterns:
-                assets_match = re.search(pattern, content, re.IGNORECASE)
-                if assets_match:
-                    metrics['total_assets'] = self._parse_currency(assets_match.group(1))
-                    self.logger.info(f"Found total assets: {metrics['total_assets']}")
-                    break
-
-            # Total Equity (for ROE)
-            equity_patterns = [
-                r'(?:total equity|shareholders equity|stockholders equity).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:total stockholders equity).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)',
-                r'(?:total shareholders equity).*?(\$?\d+(?:,\d{3})*(?:\.\d+)?)'
-            ]
-            for pattern in equity_patterns:
-                equity_match = re.search(pattern, content, re.IGNORECASE)
-                if equity_match:
-                    metrics['total_equity'] = self._parse_currency(equity_match.group(1))
-                    self.logger.info(f"Found total equity: {metrics['total_equity']}")
-                    break
-
-            # Calculate ROE and ROA
-            if metrics.get('net_income'):
-                if metrics.get('total_equity'):
-                    metrics['roe'] = metrics['net_income'] / metrics['total_equity']
-                    self.logger.info(f"Calculated ROE: {metrics['roe']}")
-                if metrics.get('total_assets'):
-                    metrics['roa'] = metrics['net_income'] / metrics['total_assets']
-                    self.logger.info(f"Calculated ROA: {metrics['roa']}")
+            metrics, found_at = metric_extractor.extract(content)
+            for metric, where in found_at.items():
+                self.logger.info(f"Found {metric}: {metrics[metric]} ('{where['label']}' at {where['label_pos']})")
+            if positions is not None:
+                positions.update(found_at)
 
             self.logger.info(f"Extracted {len(metrics)} metrics: {list(metrics.keys())}")
             return metrics
@@ -372,6 +377,17 @@ class TenKAnalyzer:
             self.logger.error(traceback.format_exc())
             return {}
 
+    def extract_xbrl_metrics(self, html_content: str) -> Dict:
+        """Extract key financial metrics from the inline-XBRL facts of the raw filing."""
+        try:
+            metrics = xbrl_fact_extractor.extract(html_content)
+            self.logger.info(f"Extracted {len(metrics)} XBRL metrics: {list(metrics.keys())}")
+            return metrics
+        except Exception as e:
+            self.logger.error(f"Error extracting XBRL metrics: {str(e)}")
+            self.logger.error(traceback.format_exc())
+            return {}
+
     def _parse_currency(self, value_str: str) -> float:
         """Parse currency string to float."""
         try:
@@ -383,23 +399,9 @@ class TenKAnalyzer:
             self.logger.error(f"Error parsing currency value: {str(e)}")
             return 0.0
 
-    def generate_detailed_summary(self, content: str, metrics: Dict, year: str = None) -> str:
-        """Generate a detailed summary of the filing content with metrics analysis."""
-        try:
-            self.logger.info(f"Generating summary for year {year}")
-            self.logger.info(f"Content length: {len(content)}")
-            self.logger.info(f"Number of metrics: {len(metrics)}")
-            
-            # Respect rate limits
-            self.respect_rate_limit()
-            
-            # Check if OpenAI API key is set
-            if not os.getenv('OPENAI_API_KEY'):
-                self.logger.error("OpenAI API key not set")
-                return "Error: OpenAI API key not configured"
-            
-            # Prepare the content for analysis
-            analysis_prompt = f"""Please provide a comprehensive analysis of the company's performance, focusing on:
+    def build_summary_messages(self, notes: str, metrics: Dict) -> List[Dict]:
+        """Chat messages asking for a detailed analysis from section notes and metrics."""
+        analysis_prompt = f"""Please provide a comprehensive analysis of the company's performance, focusing on:
 
 1. Business Performance:
    - Revenue growth and trends
@@ -427,32 +429,143 @@ class TenKAnalyzer:
 
 Please provide specific insights and analysis rather than just listing metrics. Focus on the implications of the numbers and their impact on the company's future prospects.
 
-Content:
-{content[:4000]}
+Notes from the filing's business, risk factor, MD&A, market risk and financial statement sections:
+{notes}
 
 Key Metrics:
 {json.dumps(metrics, indent=2)}"""
-
-            self.logger.info("Sending request to OpenAI API")
+        return [
+            {"role": "system", "content": "You are a financial analyst providing a detailed analysis of 10-K filings. Focus on key performance indicators and their implications."},
+            {"role": "user", "content": analysis_prompt}
+        ]
+
+    def build_section_messages(self, item: str, chunk: str, part: int, parts: int) -> List[Dict]:
+        """Chat messages asking for the investor-relevant facts in one chunk of a section."""
+        return [
+            {"role": "system", "content": "You extract the facts from 10-K filings that matter to an investor."},
+            {"role": "user", "content": (
+                f"This is part {part} of {parts} of Item {item} ({SECTION_NAMES[item]}) of a 10-K.\n"
+                f"List its key facts, figures, trends and risks as concise bullet points.\n\n{chunk}"
+            )}
+        ]
+
+    def summary_params(self) -> Dict:
+        # Deterministic mode pins temperature so cached and fresh answers agree
+        return {'max_tokens': 2000, 'temperature': 0 if self.llm_cache.deterministic else 0.7}
+
+    def complete_cached(self, messages: List[Dict], params: Dict) -> str:
+        """Send a chat request through the scheduler unless the response is already cached."""
+        key = self.llm_cache.key_for(self.deployment_name, messages, params)
+        response = self.llm_cache.get(key)
+        if response is None:
+            response = self.llm_scheduler.complete(messages, model=self.deployment_name, **params)
+            self.cache_response(key, response)
+        return response
+
+    def cache_response(self, key: str, response: str) -> None:
+        try:
+            self.llm_cache.put(key, response, self.deployment_name)
+        except OSError as e:
+            self.logger.warning(f"Could not cache LLM response: {str(e)}")
+
+    def plan_section_chunks(self, content: str, sections: Optional[Dict] = None) -> List[Tuple[str, str, int, int]]:
+        """Split the summarized Items into (item, chunk, part, parts) within the token budget.
+
+        Each Item found gets a share of ``summary_token_budget`` by its weight in
+        ``SECTION_WEIGHTS``, taken from the start of the Item. ``sections`` are
+        Item offsets from the filing's section index; without them the headings
+        are located here. Without any Item headings the filing is treated as a
+        single Item 1.
+        """
+        if sections is None:
+            sections = find_sections(content)
+        sections = {item: content[sections[item]['start']:sections[item]['end']]
+                    for item in SECTION_WEIGHTS if item in sections}
+        if not sections:
+            sections = {'1': content}
+        total_weight = sum(SECTION_WEIGHTS[item] for item in sections)
+        chunk_chars = self.summary_chunk_tokens * CHARS_PER_TOKEN
+        planned = []
+        for item, text in sections.items():
+            budget_chars = int(self.summary_token_budget * SECTION_WEIGHTS[item] / total_weight) * CHARS_PER_TOKEN
+            chunks = chunk_text(text[:budget_chars], chunk_chars)
+            planned.extend((item, chunk, part, len(chunks)) for part, chunk in enumerate(chunks, 1))
+        return planned
+
+    def summarize_sections(self, content: str, sections: Optional[Dict] = None) -> str:
+        """Map stage: note the key facts of each section chunk, all chunks in parallel.
+
+        Uses its own threads rather than the scheduler's pool, which may be the
+        caller's; the scheduler still caps how many requests are in flight.
+        """
+        planned = self.plan_section_chunks(content, sections)
+        params = {'max_tokens': SECTION_NOTE_MAX_TOKENS, 'temperature': 0}
+        self.logger.info(f"Summarizing {len(planned)} section chunks")
+        with ThreadPoolExecutor(max_workers=self.llm_scheduler.max_concurrency) as executor:
+            futures = [
+                executor.submit(self.complete_cached, self.build_section_messages(item, chunk, part, parts), params)
+                for item, chunk, part, parts in planned
+            ]
+            notes = []
+            for (item, _, part, parts), future in zip(planned, futures):
+                try:
+                    note = future.result()
+                except LLMRequestError as e:
+                    self.logger.error(f"Could not summarize Item {item} part {part}: {str(e)}")
+                    continue
+                heading = f"Item {item} ({SECTION_NAMES[item]})" + (f", part {part} of {parts}" if parts > 1 else "")
+                notes.append(f"### {heading}\n{note}")
+        if not notes:
+            raise LLMRequestError("no section of the filing could be summarized")
+        return "\n\n".join(notes)
+
+    def summary_key(self, content: str, metrics: Dict) -> str:
+        return self.llm_cache.content_key(self.deployment_name, content, metrics, SUMMARY_PROMPT_VERSION)
+
+    def get_cached_summary(self, content: str, metrics: Dict) -> Optional[str]:
+        """Return a stored summary for this filing content and metrics, skipping the map stage.
+
+        Falls back to a summary imported with ``--warm-llm-cache``.
+        """
+        summary = self.llm_cache.get(self.summary_key(content, metrics))
+        if summary is None:
+            summary = self.llm_cache.get(self.llm_cache.imported_key(self.deployment_name, content))
+        if summary is not None:
+            self.logger.info("Serving summary from the LLM response cache")
+        return summary
+
+    def generate_detailed_summary(self, content: str, metrics: Dict, year: str = None,
+                                  sections: Optional[Dict] = None) -> str:
+        """Generate a detailed summary of the filing content with metrics analysis.
+
+        Map-reduce over the filing's key Items: section chunks are summarized
+        in parallel (``summarize_sections``), then the notes are reduced into
+        the final analysis. Requests go through the shared ``llm_scheduler``,
+        which budgets requests and tokens per minute and retries rate limits.
+        """
+        try:
+            self.logger.info(f"Generating summary for year {year}")
+            self.logger.info(f"Content length: {len(content)}")
+            self.logger.info(f"Number of metrics: {len(metrics)}")
+            
+            # Check if OpenAI API key is set
+            if not os.getenv('OPENAI_API_KEY'):
+                self.logger.error("OpenAI API key not set")
+                return "Error: OpenAI API key not configured"
+            
+            cached = self.get_cached_summary(content, metrics)
+            if cached is not None:
+                return cached
+            
+            self.logger.info("Sending requests to OpenAI API")
             try:
-                response = openai.ChatCompletion.create(
-                    model="gpt-4",
-                    messages=[
-                        {"role": "system", "content": "You are a financial analyst providing a detailed analysis of 10-K filings. Focus on key performance indicators and their implications."},
-                        {"role": "user", "content": analysis_prompt}
-                    ],
-                    max_tokens=2000,
-                    temperature=0.7
-                )
-                
-                summary = response.choices[0].message.content
+                notes = self.summarize_sections(content, sections)
+                summary = self.complete_cached(self.build_summary_messages(notes, metrics), self.summary_params())
                 self.logger.info(f"Successfully generated summary of length {len(summary)}")
+                self.cache_response(self.summary_key(content, metrics), summary)
                 return summary
                 
-            except openai.error.RateLimitError as e:
-                self.logger.error(f"OpenAI rate limit exceeded: {str(e)}")
-                return "Error: Rate limit exceeded. Please try again later."
-            except openai.error.APIError as e:
+            except LLMRequestError as e:
                 self.logger.error(f"OpenAI API error: {str(e)}")
                 return "Error: API request failed. Please try again later."
             except Exception as e:
@@ -465,26 +578,65 @@ Key Metrics:
             self.logger.error(traceback.format_exc())
             return "Error generating detailed summary."
 
+    def stream_detailed_summary(self, content: str, metrics: Dict, year: str = None,
+                                sections: Optional[Dict] = None) -> Iterator[str]:
+        """Like ``generate_detailed_summary`` but yields the final summary as tokens arrive.
+
+        The map stage runs first without streaming. Errors are yielded as a
+        single "Error: ..." chunk, matching the strings ``generate_detailed_summary``
+        returns.
+        """
+        self.logger.info(f"Streaming summary for year {year}")
+        
+        if not os.getenv('OPENAI_API_KEY'):
+            self.logger.error("OpenAI API key not set")
+            yield "Error: OpenAI API key not configured"
+            return
+        
+        cached = self.get_cached_summary(content, metrics)
+        if cached is not None:
+            yield cached
+            return
+        
+        try:
+            messages = self.build_summary_messages(self.summarize_sections(content, sections), metrics)
+            params = self.summary_params()
+            key = self.llm_cache.key_for(self.deployment_name, messages, params)
+            summary = self.llm_cache.get(key)
+            if summary is not None:
+                yield summary
+            else:
+                parts = []
+                for token in self.llm_scheduler.stream(messages, model=self.deployment_name, **params):
+                    parts.append(token)
+                    yield token
+                summary = ''.join(parts)
+                self.cache_response(key, summary)
+            self.cache_response(self.summary_key(content, metrics), summary)
+        except LLMRequestError as e:
+            self.logger.error(f"OpenAI API error: {str(e)}")
+            yield "Error: API request failed. Please try again later."
+        except Exception as e:
+            self.logger.error(f"Unexpected error while streaming summary: {str(e)}")
+            self.logger.error(traceback.format_exc())
+            yield "Error: Failed to generate summary. Please try again later."
+
     def analyze_company(self, ticker: str, sector: str) -> List[Dict]:
         """Analyze all available filings for a company."""
-        company_dir = os.path.join(self.base_dir, sector, ticker)
-        if not os.path.exists(company_dir):
+        filings = self.catalog.filings(ticker, company=sector)
+        if not filings:
             self.logger.warning(f"No filings found for {ticker} in sector {sector}")
             return []
         
         analyses = []
-        for filing_date in os.listdir(company_dir):
-            filing_dir = os.path.join(company_dir, filing_date)
-            if os.path.isdir(filing_dir):
-                filing_path = os.path.join(filing_dir, f"{ticker}_{filing_date}_10K.html")
-                if os.path.exists(filing_path):
-                    analysis = self.analyze_filing(filing_path)
-                    if analysis:
-                        analyses.append({
-                            'ticker': ticker,
-                            'date': filing_date,
-                            'content': analysis
-                        })
+        for filing in filings:
+            analysis = self.analyze_filing(filing['path'])
+            if analysis:
+                analyses.append({
+                    'ticker': ticker,
+                    'date': filing['date'],
+                    'content': analysis
+                })
         
         return self.analyze_multiple_years(ticker)
 
@@ -506,7 +658,7 @@ Key Metrics:
         
         return results
 
-    def analyze_specific_ticker(self, ticker: str) -> None:
+    def analyze_specific_ticker(self, ticker: str, summarize: bool = False) -> None:
         """Analyze a specific ticker's latest 10-K filing."""
         try:
             print(f"\nLooking for {ticker} filings...")
@@ -518,62 +670,113 @@ Key Metrics:
 
             print(f"Found company directory: {company_path}")
             # Get the latest filing
-            latest_filing = self.get_latest_filing(company_path, ticker)
+            latest_filing = self.get_latest_filing_path(company_path, ticker)
             if not latest_filing:
                 print(f"Could not find any 10-K filings for {ticker}")
                 return
 
-            filing_year, filing_content = latest_filing
+            filing_year, filing_path = latest_filing
             print(f"Found latest filing from {filing_year}")
 
             # Analyze the filing
-            analysis = self.analyze_filing(filing_content)
-            if analysis:
-                # Save the analysis
-                output_file = os.path.join(self.output_dir, f"{ticker}_{filing_year}_analysis.txt")
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(analysis)
-                print(f"\nAnalysis completed for {ticker}. Results saved to {output_file}")
-            else:
-                print(f"Failed to analyze {ticker}")
+            summary = self.save_ticker_analysis(ticker, filing_year, prepare_filing(filing_path), summarize)
+            if summary:
+                self.wait_for_summaries([summary])
 
         except Exception as e:
             print(f"Error analyzing {ticker}: {str(e)}")
             return
 
-    def analyze_all_companies(self) -> None:
-        """Analyze all companies in the downloads directory."""
+    def save_ticker_analysis(self, ticker: str, filing_year: str, prepared: Dict,
+                             summarize: bool = False) -> Optional[Future]:
+        """Write the cleaned filing and, optionally, queue an LLM summary.
+
+        The summary runs on the LLM scheduler's pool so summaries for several
+        tickers overlap; the returned future completes once it is written.
+        """
+        analysis = prepared.get('cleaned')
+        if not analysis:
+            print(f"Failed to analyze {ticker}")
+            return None
+
+        # Save the analysis
+        output_file = os.path.join(self.output_dir, f"{ticker}_{filing_year}_analysis.txt")
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(analysis)
+        print(f"\nAnalysis completed for {ticker}. Results saved to {output_file}")
+
+        if summarize:
+            return self.llm_scheduler.submit(
+                self.save_ticker_summary, ticker, filing_year, analysis, prepared.get('metrics', {}),
+                prepared.get('sections')
+            )
+        return None
+
+    def save_ticker_summary(self, ticker: str, filing_year: str, analysis: str, metrics: Dict,
+                            sections: Optional[Dict] = None) -> None:
+        """Generate and write the summary file for one ticker."""
+        summary = self.generate_detailed_summary(analysis, metrics, filing_year, sections)
+        summary_file = os.path.join(self.output_dir, f"{ticker}_{filing_year}_summary.md")
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            f.write(summary)
+        print(f"Summary for {ticker} saved to {summary_file}")
+
+    def wait_for_summaries(self, summaries: List[Future]) -> None:
+        """Block until queued summaries are written, logging any failures."""
+        for future in summaries:
+            try:
+                future.result()
+            except Exception as e:
+                logging.error(f"Error writing summary: {str(e)}")
+
+    def find_latest_filings(self) -> List[Tuple[str, str, str]]:
+        """Return (ticker, date, path) for the latest filing of every downloaded ticker."""
+        latest = []
+        for ticker in self.catalog.tickers():
+            filing = self.catalog.latest(ticker)
+            if filing:
+                latest.append((ticker, filing['date'], filing['path']))
+        return latest
+
+    def analyze_all_companies(self, workers: int = 1, summarize: bool = False) -> None:
+        """Analyze all companies in the downloads directory.
+
+        With ``workers`` > 1, HTML cleaning and metric extraction (CPU-bound) fan
+        out over a process pool and results are handled as they complete. The
+        optional LLM summaries run concurrently on the budgeted LLM scheduler.
+        """
         logging.info("Starting analysis of all companies...")
-        
-        # Get all sector directories
-        for sector in os.listdir(self.base_dir):
-            sector_path = os.path.join(self.base_dir, sector)
-            if not os.path.isdir(sector_path):
-                continue
-            
-            logging.info(f"\nProcessing sector: {sector}")
-            
-            # Get all files in the sector directory
-            files = os.listdir(sector_path)
-            # Extract unique tickers from filenames
-            tickers = set()
-            for file in files:
-                if file.endswith('.html') or file.endswith('_10K_raw.html'):
-                    ticker = file.split('_')[0]
-                    tickers.add(ticker)
-            
-            # Process each unique ticker
-            for ticker in sorted(tickers):
+        filings = self.find_latest_filings()
+        logging.info(f"Found {len(filings)} tickers to analyze")
+        invalid = self.catalog.stats()['invalid']
+        if invalid:
+            logging.warning(f"Skipping {sum(invalid.values())} unusable downloads: {invalid}")
+        summaries = []
+
+        if workers <= 1:
+            for ticker, filing_year, filing_path in filings:
                 try:
                     logging.info(f"\nAnalyzing {ticker}...")
-                    self.analyze_specific_ticker(ticker)
-                    # Add a small delay between companies to respect rate limits
-                    time.sleep(self.rate_limit_delay)
+                    summaries.append(self.save_ticker_analysis(ticker, filing_year, prepare_filing(filing_path), summarize))
                 except Exception as e:
                     logging.error(f"Error processing {ticker}: {str(e)}")
                     traceback.print_exc()
-                    continue
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(prepare_filing, filing_path): (ticker, filing_year)
+                    for ticker, filing_year, filing_path in filings
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    ticker, filing_year = futures[future]
+                    try:
+                        logging.info(f"[{done}/{len(futures)}] Prepared {ticker}")
+                        summaries.append(self.save_ticker_analysis(ticker, filing_year, future.result(), summarize))
+                    except Exception as e:
+                        logging.error(f"Error processing {ticker}: {str(e)}")
+                        traceback.print_exc()
         
+        self.wait_for_summaries([summary for summary in summaries if summary])
         logging.info("Completed analysis of all companies.")
 
     def calculate_trends(self, analyses: List[Dict]) -> Dict:
@@ -612,8 +815,44 @@ Key Metrics:
         return trends
 
 def main():
-    analyzer = TenKAnalyzer()
-    analyzer.analyze_all_companies()
+    parser = argparse.ArgumentParser(description="Analyze downloaded 10-K filings")
+    parser.add_argument('--ticker', help="Analyze only this ticker's latest filing")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processes used for HTML cleaning and metric extraction")
+    parser.add_argument('--summarize', action='store_true',
+                        help="Also generate a GPT summary for each filing (rate limited)")
+    parser.add_argument('--warm-llm-cache', action='store_true',
+                        help="Import existing analysis/*_summary.md files into the LLM response cache and exit")
+    parser.add_argument('--repair-downloads', action='store_true',
+                        help="Quarantine XBRL viewer shells and truncated downloads, re-fetch the 10-Ks and exit")
+    parser.add_argument('--no-refetch', action='store_true',
+                        help="With --repair-downloads, only quarantine")
+    parser.add_argument('--pack-filings', action='store_true',
+                        help="Pack downloaded filings into the compressed filing store, compact it and exit")
+    parser.add_argument('--remove-originals', action='store_true',
+                        help="With --pack-filings, delete each original once its packed copy is verified")
+    parser.add_argument('--build-search-index', action='store_true',
+                        help="Index new or changed filings for full-text search (/search) and exit")
+    args = parser.parse_args()
+
+    analyzer = TenKAnalyzer(SP500Downloader())
+    if args.warm_llm_cache:
+        imported, skipped = analyzer.llm_cache.warm_from_analysis_dir(analyzer.deployment_name, analyzer.output_dir)
+        print(f"Imported {imported} summaries into the LLM response cache ({skipped} skipped)")
+    elif args.repair_downloads:
+        counts = analyzer.downloader.repair_downloads(refetch=not args.no_refetch)
+        print(f"Downloads repaired: {counts}")
+    elif args.pack_filings:
+        counts = filing_store.pack(analyzer.catalog.filings(formats=('html', 'txt')), args.remove_originals)
+        compacted = filing_store.compact()
+        print(f"Filings packed: {counts}; compacted: {compacted}; store: {filing_store.stats()}")
+    elif args.build_search_index:
+        counts = FilingSearchIndex().update(prepare_filing, analyzer.base_dir, workers=args.workers)
+        print(f"Search index updated: {counts}")
+    elif args.ticker:
+        analyzer.analyze_specific_ticker(args.ticker.upper(), summarize=args.summarize)
+    else:
+        analyzer.analyze_all_companies(workers=args.workers, summarize=args.summarize)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
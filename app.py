@@ -1,23 +1,30 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from download_10k import SP500Downloader
-from analyze_10k import TenKAnalyzer
+from analyze_10k import TenKAnalyzer, prepare_content, prepare_filing
+from artifact_cache import artifact_cache
+from analysis_cache import AnalysisCache
+from job_queue import JobQueue, DONE, FAILED
+from llm_scheduler import llm_scheduler
+from section_index import load_section_index, read_section
+from search_index import FilingSearchIndex
+from company_registry import company_registry
+from filing_store import filing_store, open_filing_path
 import os
 import logging
 import traceback
 import json
 from typing import Dict, List, Optional
 import socket
+import threading
 from config import *
 import time
 import concurrent.futures
 import redis
 from dotenv import load_dotenv
-import pandas as pd
 import requests
 import random
 from rate_limiter import sec_rate_limiter
-from datetime import datetime, timedelta
 
 # Configure logging
 logging.basicConfig(
@@ -42,11 +49,6 @@ logger.info("Initializing Flask app...")
 app = Flask(__name__)
 CORS(app)
 
-logger.info("Initializing downloader and analyzer...")
-# Initialize downloader and analyzer
-downloader = SP500Downloader()
-analyzer = TenKAnalyzer(downloader)
-
 # Redis configuration with environment variables and defaults
 REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
 REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
@@ -71,57 +73,40 @@ except (redis.ConnectionError, Exception) as e:
     logger.info("Using in-memory cache instead")
     redis_client = {}  # Fallback to in-memory cache
 
-def get_cached_analysis(ticker: str, year: str) -> Optional[dict]:
-    """Get cached analysis results for a ticker and year."""
-    if isinstance(redis_client, dict):  # In-memory cache
-        cache_key = f"analysis:{ticker}:{year}"
-        return redis_client.get(cache_key)
-    else:  # Redis cache
-        cache_key = f"analysis:{ticker}:{year}"
-        cached_data = redis_client.get(cache_key)
-        if cached_data:
-            return json.loads(cached_data)
-    return None
-
-def cache_analysis(ticker: str, year: str, analysis: dict):
-    """Cache analysis results for a ticker and year."""
-    cache_key = f"analysis:{ticker}:{year}"
-    if isinstance(redis_client, dict):  # In-memory cache
-        redis_client[cache_key] = analysis
-    else:  # Redis cache
-        redis_client.setex(cache_key, timedelta(hours=24), json.dumps(analysis))
+# Two-tier analysis cache: bounded in-process LRU/TTL in front of Redis
+analysis_cache = AnalysisCache(None if isinstance(redis_client, dict) else redis_client)
+
+logger.info("Initializing downloader and analyzer...")
+# Initialize downloader and analyzer
+downloader = SP500Downloader()
+analyzer = TenKAnalyzer(downloader, analysis_cache=analysis_cache)
+
+# Background analysis jobs; /jobs endpoints enqueue and poll them. A job coalesced onto
+# an analysis already running for the ticker gets that analysis's progress.
+job_queue = JobQueue(
+    lambda payload, progress: analysis_cache.single_flight(
+        f"analyze:{payload['ticker']}",
+        lambda report: analyzer.analyze_multiple_years(payload['ticker'], progress=report),
+        progress=progress
+    ),
+    workers=int(os.getenv('ANALYSIS_JOB_WORKERS', 2))
+)
+job_queue.start()
+
+# Full-text search over downloaded filings, built with `analyze_10k.py --build-search-index`.
+# SEARCH_INDEX_ON_STARTUP=1 refreshes it in the background instead; set it on one process only,
+# since every worker that imports the app would otherwise run the same build.
+search_index = FilingSearchIndex()
+if os.getenv('SEARCH_INDEX_ON_STARTUP', '0').lower() in ('1', 'true', 'yes'):
+    threading.Thread(target=search_index.update, args=(prepare_filing,), daemon=True).start()
 
 def get_company_info(ticker: str) -> Optional[Dict]:
     """Get company information from S&P 500 data."""
     try:
-        app.logger.info(f"Getting company info for {ticker}")
-        
-        # Check if the CSV file exists
-        csv_path = 'sp500_companies.csv'
-        if not os.path.exists(csv_path):
-            app.logger.error(f"CSV file {csv_path} does not exist")
-            return None
-            
-        # Read the CSV file
-        try:
-            companies = pd.read_csv(csv_path)
-            app.logger.info(f"Successfully read CSV file with {len(companies)} companies")
-        except Exception as e:
-            app.logger.error(f"Error reading CSV file: {str(e)}")
+        company_info = company_registry.info(ticker)
+        if not company_info:
+            app.logger.error(f"Company {ticker} not found in the company registry")
             return None
-            
-        # Find the company
-        company = companies[companies['symbol'] == ticker]
-        if company.empty:
-            app.logger.error(f"Company {ticker} not found in CSV file")
-            return None
-            
-        # Extract company info
-        company_info = {
-            'name': company['name'].iloc[0],
-            'sector': company['sector'].iloc[0],
-            'cik': str(company['cik'].iloc[0]).zfill(10)
-        }
         
         app.logger.info(f"Found company info for {ticker}: {company_info}")
         return company_info
@@ -207,9 +192,8 @@ def view_analysis(ticker, date):
         with open(analysis_file, 'r') as f:
             content = f.read()
 
-        # Use TenKAnalyzer to clean and extract metrics/summary
-        cleaned_content = analyzer.clean_html_content(content)
-        metrics = analyzer.extract_financial_metrics(cleaned_content)
+        # Clean and extract metrics, reusing cached artifacts for unchanged files
+        metrics = prepare_content(content)['metrics']
         summary = analyzer.generate_metrics_summary(metrics)
 
         return jsonify({
@@ -224,6 +208,105 @@ def view_analysis(ticker, date):
         logger.error(f"Error reading or analyzing analysis file: {str(e)}")
         return jsonify({'error': 'Failed to read or analyze analysis'}), 500
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """API endpoint exposing cache hit/miss counters."""
+    return jsonify({
+        'success': True,
+        'artifacts': artifact_cache.stats(),
+        'analyses': analysis_cache.stats(),
+        'llm_responses': analyzer.llm_cache.stats(),
+        'search_index': search_index.stats(),
+        'filing_catalog': analyzer.catalog.stats(),
+        'filing_store': filing_store.stats(),
+        'company_registry': company_registry.stats()
+    })
+
+@app.route('/api/llm/stats', methods=['GET'])
+def llm_stats():
+    """API endpoint exposing LLM queue depth, latency and rate-limit counters."""
+    return jsonify({'success': True, **llm_scheduler.stats()})
+
+@app.route('/search', methods=['GET'])
+def search():
+    """Full-text search over downloaded filings, ranked by BM25 with highlighted snippets.
+
+    ``q`` takes words (all must match), "quoted phrases", OR/NOT and prefix*
+    terms; ``ticker`` and ``year`` (filing year) narrow the results.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'success': False, 'error': 'Query parameter q is required'}), 400
+    try:
+        index_status = search_index.status()
+        if not index_status['documents']:
+            return jsonify({
+                'success': False,
+                'error': 'Search index has not been built; run python analyze_10k.py --build-search-index',
+                'index': index_status
+            }), 503
+        started = time.time()
+        results = search_index.search(
+            query,
+            ticker=request.args.get('ticker') or None,
+            year=request.args.get('year', type=int),
+            limit=min(request.args.get('limit', 20, type=int), 100),
+            offset=request.args.get('offset', 0, type=int)
+        )
+        return jsonify({
+            'success': True,
+            'query': query,
+            'results': results,
+            'took_ms': round((time.time() - started) * 1000, 1),
+            'index': index_status
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error searching filings for {query!r}: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/sections/<ticker>/<item>', methods=['GET'])
+def get_section(ticker, item):
+    """API endpoint returning one 10-K Item of a downloaded filing, read from its section index."""
+    try:
+        ticker = ticker.upper()
+        item = item.upper()
+        date = request.args.get('date')
+        company_path = analyzer.find_company_path(ticker)
+        if not company_path:
+            return jsonify({'success': False, 'error': f'No filings found for {ticker}'}), 404
+
+        if date:
+            filing = analyzer.catalog.find(ticker, date)
+            filing_path = filing['path'] if filing else None
+        else:
+            latest = analyzer.get_latest_filing_path(company_path, ticker)
+            date, filing_path = latest if latest else (None, None)
+        if not filing_path:
+            return jsonify({'success': False, 'error': f'No filing found for {ticker}'}), 404
+
+        # Built once per filing; later requests only slice the cleaned text
+        index = load_section_index(filing_path)
+        if index is None:
+            prepare_filing(filing_path)
+            index = load_section_index(filing_path)
+        section = index['sections'].get(item) if index else None
+        if not section:
+            return jsonify({'success': False, 'error': f'Item {item} not found in the {ticker} filing'}), 404
+
+        return jsonify({
+            'success': True,
+            'ticker': ticker,
+            'date': date,
+            'item': item,
+            'offsets': section,
+            'text': read_section(filing_path, item)
+        })
+    except Exception as e:
+        logger.error(f"Error reading section {item} for {ticker}: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/analyze', methods=['POST'])
 def analyze():
     try:
@@ -232,7 +315,13 @@ def analyze():
         if not ticker:
             return jsonify({'success': False, 'error': 'Ticker is required'}), 400
         logger.info(f"Received analysis request for ticker: {ticker}")
-        result = analyzer.analyze_multiple_years(ticker)
+        # Concurrent requests for the same ticker share a single analysis
+        result = analysis_cache.single_flight(
+            f"analyze:{ticker}",
+            lambda report: analyzer.analyze_multiple_years(ticker, progress=report),
+            # Reports still reach any jobs coalesced onto this request
+            progress=lambda stage, **details: logger.debug(f"Analysis of {ticker}: {stage}")
+        )
         if 'error' in result:
             return jsonify({'success': False, 'error': result['error']}), 404
         return jsonify({'success': True, **result})
@@ -240,6 +329,72 @@ def analyze():
         logger.error(f"Error in /analyze endpoint: {str(e)}")
         return jsonify({'success': False, 'error': f'Internal server error: {str(e)}'}), 500
 
+@app.route('/analyze/stream', methods=['GET'])
+def analyze_stream():
+    """Stream an analysis as Server-Sent Events: each year's metrics as soon as
+    they are extracted, then the summaries token by token."""
+    ticker = request.args.get('ticker', '').upper()
+    if not ticker:
+        return jsonify({'success': False, 'error': 'Ticker is required'}), 400
+    logger.info(f"Received streaming analysis request for ticker: {ticker}")
+
+    def generate():
+        for event, data in analyzer.iter_analysis_events(ticker):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        # Keep proxies from buffering the stream
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue an analysis and return its job id without waiting for it."""
+    data = request.get_json(silent=True) or {}
+    ticker = data.get('ticker', '').upper()
+    if not ticker:
+        return jsonify({'success': False, 'error': 'Ticker is required'}), 400
+    job_id = job_queue.submit({'ticker': ticker})
+    logger.info(f"Queued analysis job {job_id} for {ticker}")
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': f'/jobs/{job_id}',
+        'result_url': f'/jobs/{job_id}/result'
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report a job's status and progress."""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'ticker': job['payload'].get('ticker'),
+        'status': job['status'],
+        'progress': job['progress'],
+        'error': job['error'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at']
+    })
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Return a finished job's analysis; 202 while it is still queued or running."""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job['status'] == DONE:
+        return jsonify({'success': True, **job['result']})
+    if job['status'] == FAILED:
+        return jsonify({'success': False, 'error': job['error']}), 500
+    return jsonify({'success': False, 'status': job['status'], 'progress': job['progress']}), 202
+
 def calculate_trends(metrics_by_year: Dict) -> Dict:
     """Calculate trends for key metrics across years."""
     trends = {}
@@ -288,19 +443,7 @@ def calculate_trends(metrics_by_year: Dict) -> Dict:
 def get_sp500_companies() -> List[Dict]:
     """Get list of S&P 500 companies from CSV file."""
     try:
-        with open('sp500_companies.csv', 'r') as f:
-            # Skip header
-            next(f)
-            companies = []
-            for line in f:
-                symbol, name, sector, cik = line.strip().split(',')
-                companies.append({
-                    'symbol': symbol,
-                    'name': name,
-                    'sector': sector,
-                    'cik': cik
-                })
-        return companies
+        return company_registry.companies()
     except Exception as e:
         logger.error(f"Error getting S&P 500 companies: {str(e)}")
         return []
@@ -310,67 +453,37 @@ def get_downloaded_filings(ticker: str, sector: str) -> List[Dict[str, str]]:
     try:
         app.logger.info(f"Getting downloaded filings for {ticker} in sector {sector}")
         filings = []
-        base_dir = "downloads"  # Match the base directory used in the downloader
-        
-        # Check if base directory exists
-        if not os.path.exists(base_dir):
-            app.logger.error(f"Base directory {base_dir} does not exist")
-            return []
-            
-        sector_dir = os.path.join(base_dir, sector)
-        if not os.path.exists(sector_dir):
-            app.logger.error(f"Sector directory {sector_dir} does not exist")
-            return []
-            
-        ticker_dir = os.path.join(sector_dir, ticker)
-        if not os.path.exists(ticker_dir):
-            app.logger.error(f"Ticker directory {ticker_dir} does not exist")
-            return []
-            
-        app.logger.info(f"Found ticker directory: {ticker_dir}")
         
-        # Get all year directories
-        try:
-            year_dirs = [d for d in os.listdir(ticker_dir) if os.path.isdir(os.path.join(ticker_dir, d))]
-            app.logger.info(f"Found year directories for {ticker}: {year_dirs}")
-        except Exception as e:
-            app.logger.error(f"Error reading year directories: {str(e)}")
+        # Saved by the downloader as <sector>/<ticker>/<year>/TICKER_YYYY-MM-DD.html (primary
+        # document) or, from before submissions were split, TICKER_YYYY-MM-DD.txt
+        submissions = [
+            filing for filing in analyzer.catalog.filings(ticker, company=sector, formats=('html', 'txt'))
+            if not filing['kind'] and os.path.basename(os.path.dirname(filing['directory'])) == ticker.upper()
+        ]
+        if not submissions:
+            app.logger.error(f"No downloaded filings for {ticker} in sector {sector}")
             return []
         
-        # Sort year directories in descending order
-        year_dirs.sort(reverse=True)
-        
-        # Get filings from each year directory
-        for year in year_dirs:
-            year_dir = os.path.join(ticker_dir, year)
+        for filing in submissions:
+            file_path = filing['path']
+            year = os.path.basename(filing['directory'])
             try:
-                year_files = [f for f in os.listdir(year_dir) if f.endswith('.txt')]
-                app.logger.info(f"Found {len(year_files)} files in {year} directory for {ticker}")
+                app.logger.info(f"Processing file {os.path.basename(file_path)} with date {filing['date']}")
                 
-                for filename in year_files:
-                    file_path = os.path.join(year_dir, filename)
-                    # Extract date from filename (format: TICKER_YYYY-MM-DD.txt)
-                    try:
-                        date_str = filename.split('_')[1].replace('.txt', '')
-                        app.logger.info(f"Processing file {filename} with date {date_str}")
-                        
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            if not content:
-                                app.logger.warning(f"Empty content in file {file_path}")
-                                continue
-                                
-                            filings.append({
-                                'date': date_str,
-                                'content': content,
-                                'year': year
-                            })
-                            app.logger.info(f"Successfully added filing from {date_str} for {ticker}")
-                    except Exception as e:
-                        app.logger.error(f"Error processing file {file_path}: {str(e)}")
+                with open_filing_path(file_path) as f:
+                    content = f.read().decode('utf-8')
+                    if not content:
+                        app.logger.warning(f"Empty content in file {file_path}")
                         continue
+                        
+                    filings.append({
+                        'date': filing['date'],
+                        'content': content,
+                        'year': year
+                    })
+                    app.logger.info(f"Successfully added filing from {filing['date']} for {ticker}")
             except Exception as e:
-                app.logger.error(f"Error reading year directory {year_dir}: {str(e)}")
+                app.logger.error(f"Error processing file {file_path}: {str(e)}")
                 continue
         
         # Sort filings by date in descending order
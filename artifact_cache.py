@@ -0,0 +1,185 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import logging
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from filing_store import filing_stat, open_filing_path
+
+# Bump whenever cleaning or metric extraction output changes so stale
+# artifacts are no longer found.
+EXTRACTOR_VERSION = '5'
+
+
+class ShardedFileCache:
+    """Cache entries as files under ``<cache_dir>/<key[:2]>/``, shared by the on-disk caches.
+
+    An entry is one or more files named ``<key><suffix>``, written through
+    temp files and renamed so concurrent readers never see partial entries.
+    Hits refresh the files' mtime; when the directory grows past ``max_bytes``
+    the least recently used files are evicted down to 90% of the budget.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+
+    def path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}{suffix}")
+
+    def get(self, key: str, suffixes: Sequence[str], decode: Callable[..., Any]) -> Any:
+        """Return ``decode(*contents)`` of an entry's files, or None on a miss
+        (missing files or contents ``decode`` rejects with ValueError/KeyError)."""
+        paths = [self.path(key, suffix) for suffix in suffixes]
+        try:
+            contents = []
+            for path in paths:
+                with open(path, 'rb') as f:
+                    contents.append(f.read())
+            value = decode(*contents)
+            now = time.time()
+            for path in paths:
+                os.utime(path, (now, now))
+        except (OSError, EOFError, ValueError, KeyError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, files: Dict[str, bytes]) -> None:
+        """Write an entry's files, given as {suffix: contents}."""
+        written = 0
+        for suffix, data in files.items():
+            path = self.path(key, suffix)
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            written += len(data)
+        with self.lock:
+            if self._total_bytes is not None:
+                self._total_bytes += written
+        self._evict_if_needed()
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for file in files:
+                if file.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict_if_needed(self):
+        with self.lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            if self._total_bytes <= self.max_bytes:
+                return
+            # Evict least recently used down to 90% of the budget
+            target = int(self.max_bytes * 0.9)
+            for _, size, path in sorted(self._scan()):
+                if self._total_bytes <= target:
+                    break
+                try:
+                    os.remove(path)
+                    self._total_bytes -= size
+                except OSError:
+                    continue
+            self.logger.info(f"Evicted {self.cache_dir} down to {self._total_bytes} bytes")
+
+    def stats(self) -> Dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes
+            }
+
+
+class ArtifactCache:
+    """Content-addressed on-disk cache of cleaned text and extracted metrics per filing.
+
+    Entries are keyed by the SHA-256 of the raw filing plus ``EXTRACTOR_VERSION``,
+    since filings never change once filed. Each entry is a gzip of the cleaned
+    text and a small metrics JSON, kept in a ``ShardedFileCache`` that evicts
+    the least recently used entries past ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir: str = os.getenv('ARTIFACT_CACHE_DIR', os.path.join('cache', 'artifacts')),
+                 max_bytes: int = int(os.getenv('ARTIFACT_CACHE_MAX_BYTES', 2 * 1024 ** 3))):
+        self.storage = ShardedFileCache(cache_dir, max_bytes)
+        self.logger = logging.getLogger(__name__)
+        # (path, size, mtime) -> key, so unchanged files are not re-hashed
+        self._file_keys: Dict[Tuple[str, int, float], str] = {}
+
+    @staticmethod
+    def key_for_bytes(data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        return hashlib.sha256(f"{EXTRACTOR_VERSION}:{digest}".encode()).hexdigest()
+
+    def key_for_file(self, path: str) -> str:
+        size, mtime = filing_stat(path)
+        memo_key = (os.path.abspath(path), size, mtime)
+        key = self._file_keys.get(memo_key)
+        if key is None:
+            digest = hashlib.sha256()
+            with open_filing_path(path) as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            key = hashlib.sha256(f"{EXTRACTOR_VERSION}:{digest.hexdigest()}".encode()).hexdigest()
+            self._file_keys[memo_key] = key
+        return key
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return {'cleaned', 'metrics'} for a key, or None on a miss."""
+        return self.storage.get(key, ('.json', '.txt.gz'), lambda metrics, text: {
+            'cleaned': gzip.decompress(text).decode('utf-8'),
+            'metrics': json.loads(metrics)
+        })
+
+    def put(self, key: str, cleaned: str, metrics: Dict) -> None:
+        self.storage.put(key, {
+            '.txt.gz': gzip.compress(cleaned.encode('utf-8')),
+            '.json': json.dumps(metrics).encode('utf-8')
+        })
+
+    def get_or_compute(self, key: str, compute: Callable[[], Tuple[str, Dict]]) -> Dict:
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        cleaned, metrics = compute()
+        if cleaned:
+            try:
+                self.put(key, cleaned, metrics)
+            except OSError as e:
+                self.logger.warning(f"Could not cache artifacts for {key}: {str(e)}")
+        return {'cleaned': cleaned, 'metrics': metrics}
+
+    def stats(self) -> Dict:
+        return self.storage.stats()
+
+
+# Shared instance used by the analyzer and its worker processes
+artifact_cache = ArtifactCache()
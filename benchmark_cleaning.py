@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import logging
+from html_cleaner import clean_html, etree
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def find_filings(base_dir: str = "downloads", min_size: int = 100 * 1024):
+    """Collect real filings (skipping small viewer shells) under the downloads directory."""
+    paths = []
+    for root, _, files in os.walk(base_dir):
+        for file in files:
+            path = os.path.join(root, file)
+            if file.lower().endswith('.html') and os.path.getsize(path) >= min_size:
+                paths.append(path)
+    return sorted(paths)
+
+def benchmark_cleaning(base_dir: str = "downloads") -> bool:
+    """Check the lxml cleaner matches the BeautifulSoup cleaner and report the speedup."""
+    if etree is None:
+        logger.error("lxml is not installed; nothing to benchmark")
+        return False
+
+    paths = find_filings(base_dir)
+    if not paths:
+        logger.error(f"No filings found under {base_dir}")
+        return False
+
+    total_soup = total_fast = 0.0
+    mismatches = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        start = time.perf_counter()
+        slow = clean_html(html, fast=False)
+        soup_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fast = clean_html(html, fast=True)
+        fast_time = time.perf_counter() - start
+
+        total_soup += soup_time
+        total_fast += fast_time
+        if slow != fast:
+            mismatches.append(path)
+        logger.info(f"{path}: {len(html)} bytes, soup {soup_time:.3f}s, lxml {fast_time:.3f}s "
+                    f"({soup_time / fast_time:.1f}x){'' if slow == fast else ' MISMATCH'}")
+
+    speedup = total_soup / total_fast
+    logger.info(f"{len(paths)} filings: soup {total_soup:.2f}s, lxml {total_fast:.2f}s, speedup {speedup:.1f}x")
+    if mismatches:
+        logger.error(f"{len(mismatches)} filings produced different text: {mismatches}")
+    return not mismatches and speedup >= 5
+
+if __name__ == "__main__":
+    sys.exit(0 if benchmark_cleaning(*sys.argv[1:]) else 1)
@@ -0,0 +1,166 @@
+import os
+import csv
+import json
+import time
+import threading
+import logging
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+
+class Company(NamedTuple):
+    symbol: str
+    name: Optional[str]
+    sector: Optional[str]
+    cik: Optional[str]
+    sp500: bool
+
+
+def _normalize_cik(value) -> Optional[str]:
+    value = str(value or '').strip()
+    if value.endswith('.0'):  # CIKs written as floats by pandas
+        value = value[:-2]
+    return value.zfill(10) if value.isdigit() else None
+
+
+class CompanyRegistry:
+    """Read-only ticker -> Company lookups merged from the local company files.
+
+    Sources, in order of precedence:
+
+    - ``sp500_companies.csv``: symbol, name, sector and CIK of S&P 500 members
+    - ``cik_cache.json``: {ticker: CIK}
+    - ``company_tickers.json``: SEC's ticker file, {"0": {"cik_str", "ticker", "title"}, ...}
+
+    The files are parsed once into an immutable mapping. Lookups are dict
+    reads with no lock. At most every ``check_interval`` seconds a lookup
+    stats the files, and if one changed the mapping is rebuilt and swapped
+    in whole. A missing or unparsable file is skipped.
+    """
+
+    def __init__(self, csv_path: str = 'sp500_companies.csv', cik_cache_path: str = 'cik_cache.json',
+                 tickers_path: str = 'company_tickers.json',
+                 check_interval: float = float(os.getenv('COMPANY_REGISTRY_CHECK_INTERVAL', 5.0))):
+        self.csv_path = csv_path
+        self.cik_cache_path = cik_cache_path
+        self.tickers_path = tickers_path
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        self._companies: Mapping[str, Company] = MappingProxyType({})
+        self._members: Tuple[Company, ...] = ()
+        self._signature = None
+        self._checked_at = 0.0
+        self.loads = 0
+
+    def _file_signature(self) -> Tuple:
+        signature = []
+        for path in (self.csv_path, self.cik_cache_path, self.tickers_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _read_json(self, path: str):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Skipping unreadable company file {path}: {str(e)}")
+            return None
+
+    def _load(self) -> Tuple[Dict[str, Company], List[Company]]:
+        companies: Dict[str, Company] = {}
+        members: List[Company] = []
+
+        if os.path.exists(self.csv_path):
+            try:
+                with open(self.csv_path, 'r', encoding='utf-8', newline='') as f:
+                    for row in csv.DictReader(f):
+                        symbol = (row.get('symbol') or '').strip().upper()
+                        if not symbol:
+                            continue
+                        company = Company(symbol, (row.get('name') or '').strip() or None,
+                                          (row.get('sector') or '').strip() or None,
+                                          _normalize_cik(row.get('cik')), True)
+                        companies[symbol] = company
+                        members.append(company)
+            except (OSError, csv.Error) as e:
+                self.logger.warning(f"Skipping unreadable company file {self.csv_path}: {str(e)}")
+
+        cik_cache = self._read_json(self.cik_cache_path)
+        if isinstance(cik_cache, dict):
+            for ticker, cik in cik_cache.items():
+                symbol = ticker.upper()
+                company = companies.get(symbol)
+                if company is None:
+                    companies[symbol] = Company(symbol, None, None, _normalize_cik(cik), False)
+                elif not company.cik:
+                    companies[symbol] = company._replace(cik=_normalize_cik(cik))
+
+        sec_tickers = self._read_json(self.tickers_path)
+        if isinstance(sec_tickers, dict):
+            for entry in sec_tickers.values():
+                if not isinstance(entry, dict) or not entry.get('ticker'):
+                    continue
+                symbol = str(entry['ticker']).upper()
+                company = companies.get(symbol) or Company(symbol, None, None, None, False)
+                companies[symbol] = company._replace(
+                    name=company.name or entry.get('title'),
+                    cik=company.cik or _normalize_cik(entry.get('cik_str'))
+                )
+        return companies, members
+
+    def reload(self, force: bool = False) -> bool:
+        """Rebuild the mapping if a source file changed. Returns True if it was rebuilt."""
+        with self.lock:
+            now = time.time()
+            if not force and now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+            signature = self._file_signature()
+            if not force and signature == self._signature:
+                return False
+            companies, members = self._load()
+            self._companies = MappingProxyType(companies)
+            self._members = tuple(members)
+            self._signature = signature
+            self.loads += 1
+        self.logger.info(f"Loaded {len(companies)} companies ({len(members)} S&P 500 members)")
+        return True
+
+    def get(self, ticker: str) -> Optional[Company]:
+        self.reload()
+        return self._companies.get(ticker.upper())
+
+    def info(self, ticker: str) -> Optional[Dict]:
+        """{'name', 'sector', 'cik'} for a ticker with a known CIK, or None."""
+        company = self.get(ticker)
+        if company is None or not company.cik:
+            return None
+        return {'name': company.name or company.symbol, 'sector': company.sector or 'Unknown', 'cik': company.cik}
+
+    def cik(self, ticker: str) -> Optional[str]:
+        company = self.get(ticker)
+        return company.cik if company else None
+
+    def companies(self) -> List[Dict]:
+        """S&P 500 members from the CSV as {'symbol', 'name', 'sector', 'cik'} dicts."""
+        self.reload()
+        return [
+            {'symbol': company.symbol, 'name': company.name, 'sector': company.sector, 'cik': company.cik}
+            for company in self._members
+        ]
+
+    def stats(self) -> Dict:
+        self.reload()
+        return {'companies': len(self._companies), 'sp500_members': len(self._members), 'loads': self.loads}
+
+
+# Shared registry; every company lookup in the app and downloader goes through it
+company_registry = CompanyRegistry()
@@ -2,20 +2,32 @@ import os
 import logging
 import time
 import traceback
-from typing import Optional, Dict, List, Tuple, Any
-import re
+from typing import Optional, Dict, List, Tuple, Any, Callable, Iterable, Iterator
 from bs4 import BeautifulSoup
-import pandas as pd
 import requests
 from datetime import datetime, timedelta
+import csv
 import json
 import gzip
+import zlib
 import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from rate_limiter import sec_rate_limiter
+from filing_index import FilingIndex, INDEXED_FORMS
+from filing_catalog import catalog_for
+from company_registry import company_registry
+from download_manifest import DownloadManifest, write_stream, read_sidecar
+from submission_splitter import SubmissionSplitter
+from filing_validator import check_filing, quarantine_filing
+
+# Bytes held in memory per streamed download
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
 
 class SP500Downloader:
     def __init__(self, base_dir: str = "downloads"):
         self.base_dir = base_dir
+        self.catalog = catalog_for(base_dir)
         self.edgar_base_url = "https://www.sec.gov/Archives/edgar/data"
         
         # Debug: Log all environment variables (excluding sensitive values)
@@ -40,7 +52,14 @@ class SP500Downloader:
         }
         self.max_retries = 5
         self.retry_delay = 5  # Base delay between retries
+        self.max_workers = int(os.getenv('SEC_DOWNLOAD_WORKERS', 8))
+        # Exhibit types kept alongside the 10-K itself, e.g. "EX-13,EX-21"
+        self.filing_exhibits = tuple(
+            exhibit.strip() for exhibit in os.getenv('FILING_EXHIBITS', '').split(',') if exhibit.strip()
+        )
         self.setup_logging()
+        self.session = self.create_session()
+        self.filing_index = FilingIndex()
 
     def setup_logging(self):
         logging.basicConfig(
@@ -49,8 +68,21 @@ class SP500Downloader:
         )
         self.logger = logging.getLogger(__name__)
 
-    def make_sec_request(self, url: str) -> requests.Response:
-        """Make a request to SEC EDGAR with proper rate limiting and retries."""
+    def create_session(self) -> requests.Session:
+        """Create a keep-alive session whose connection pool fits every download worker."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update(self.headers)
+        return session
+
+    def make_sec_request(self, url: str, stream: bool = False) -> requests.Response:
+        """Make a request to SEC EDGAR with proper rate limiting and retries.
+
+        With ``stream`` the body is left unread for ``iter_content``; the caller
+        must close the response.
+        """
         for attempt in range(self.max_retries):
             try:
                 # Use the rate limiter to ensure we don't exceed 10 requests per second
@@ -58,18 +90,8 @@ class SP500Downloader:
                 
                 self.logger.info(f"Making request to {url} (attempt {attempt + 1}/{self.max_retries})")
                 
-                # Update headers for each request
-                headers = {
-                    'User-Agent': f'{self.email} Python/3.9 SEC EDGAR API',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'Host': 'www.sec.gov',
-                    'Accept': 'application/json',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Connection': 'keep-alive',
-                    'Cache-Control': 'max-age=0',
-                }
-                
-                response = requests.get(url, headers=headers)
+                # Pooled session reuses TLS connections across requests and threads
+                response = self.session.get(url, stream=stream)
                 
                 # Log response details
                 self.logger.info(f"Response status: {response.status_code}")
@@ -85,6 +107,7 @@ class SP500Downloader:
                         wait_time = min(30, self.retry_delay * (2 ** attempt) + random.uniform(0, 1))
                     
                     self.logger.warning(f"Rate limited. Waiting {wait_time:.2f} seconds...")
+                    response.close()
                     time.sleep(wait_time)
                     continue
                 
@@ -96,6 +119,7 @@ class SP500Downloader:
                         # Exponential backoff with jitter
                         wait_time = min(30, self.retry_delay * (2 ** attempt) + random.uniform(0, 1))
                         self.logger.warning(f"Retrying in {wait_time:.2f} seconds...")
+                        response.close()
                         time.sleep(wait_time)
                         continue
                     else:
@@ -113,10 +137,10 @@ class SP500Downloader:
                     continue
                 raise
 
-    def get_sp500_companies(self) -> pd.DataFrame:
+    def get_sp500_companies(self) -> List[Dict]:
         """Get S&P 500 companies data, downloading it if it doesn't exist."""
         try:
-            if not os.path.exists('sp500_companies.csv'):
+            if not os.path.exists(company_registry.csv_path):
                 self.logger.info("Downloading S&P 500 companies data...")
                 url = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
                 response = requests.get(url)
@@ -141,17 +165,17 @@ class SP500Downloader:
                             'cik': cik
                         })
                 
-                # Create DataFrame and save to CSV
-                df = pd.DataFrame(data)
-                df.to_csv('sp500_companies.csv', index=False)
-                self.logger.info(f"Downloaded {len(df)} S&P 500 companies")
-                return df
-            else:
-                df = pd.read_csv('sp500_companies.csv')
-                return df
+                # Save to CSV; the registry picks the new file up on reload
+                with open(company_registry.csv_path, 'w', encoding='utf-8', newline='') as f:
+                    writer = csv.DictWriter(f, fieldnames=['symbol', 'name', 'sector', 'cik'])
+                    writer.writeheader()
+                    writer.writerows(data)
+                company_registry.reload(force=True)
+                self.logger.info(f"Downloaded {len(data)} S&P 500 companies")
+            return company_registry.companies()
         except Exception as e:
             self.logger.error(f"Error getting S&P 500 companies: {e}")
-            return pd.DataFrame()
+            return []
 
     def get_company_cik(self, ticker: str) -> Optional[str]:
         try:
@@ -162,11 +186,8 @@ class SP500Downloader:
             if ticker == 'AAPL':
                 return '0000320193'  # Apple's CIK number
                 
-            # Lazy load the S&P 500 companies data
-            df = self.get_sp500_companies()
-            company = df[df['symbol'].str.upper() == ticker]
-            if not company.empty:
-                cik = str(company['cik'].iloc[0]).zfill(10)
+            cik = company_registry.cik(ticker)
+            if cik:
                 self.logger.info(f"Found CIK for {ticker}: {cik}")
                 return cik
             self.logger.warning(f"CIK not found for ticker: {ticker}")
@@ -192,32 +213,84 @@ class SP500Downloader:
         self.logger.info(f"Total master index URLs: {len(urls)}")
         return urls
 
-    def download_master_idx(self, url: str) -> List[Dict]:
-        """Download and parse master index file."""
-        self.logger.info(f"Downloading master index from: {url}")
-        try:
-            response = requests.get(url, headers=self.headers)
+    def iter_master_idx(self, url: str, ciks: Optional[Iterable[str]] = None,
+                        form_types: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+        """Stream a master index file and yield only rows matching the CIK/form filters.
+
+        The response is decompressed chunk by chunk (gzip transfer encoding, or a
+        ``master.gz`` URL) and filtered on raw bytes, so only matching rows are ever
+        decoded or turned into dicts. Pass every S&P 500 CIK at once for bulk runs.
+        """
+        cik_filter = {c.lstrip('0').encode() for c in ciks} if ciks else None
+        form_filter = {f.encode() for f in form_types} if form_types else None
+
+        sec_rate_limiter.wait_for_token()
+        with self.session.get(url, stream=True) as response:
             response.raise_for_status()
-            lines = response.text.splitlines()
-            data_lines = lines[11:]
-            filings = []
-            for line in data_lines:
-                try:
-                    parts = line.strip().split('|')
-                    if len(parts) != 5:
+            if url.endswith('.gz'):
+                chunks = self._gunzip_chunks(response.iter_content(chunk_size=64 * 1024))
+            else:
+                # iter_content decodes Content-Encoding incrementally
+                chunks = response.iter_content(chunk_size=64 * 1024)
+
+            in_header = True
+            pending = b''
+            for chunk in chunks:
+                lines = (pending + chunk).split(b'\n')
+                pending = lines.pop()
+                for line in lines:
+                    if in_header:
+                        # Header ends at the dashed separator line
+                        if line.startswith(b'---'):
+                            in_header = False
                         continue
-                    cik, company_name, form_type, date_filed, filename = parts
-                    filings.append({
-                        'cik': cik,
-                        'company_name': company_name,
-                        'form_type': form_type,
-                        'date_filed': date_filed,
-                        'filename': filename
-                    })
-                except Exception as e:
-                    self.logger.warning(f"Error parsing line in master index: {str(e)}")
-                    continue
-            return filings
+                    row = self._match_master_idx_line(line, cik_filter, form_filter)
+                    if row:
+                        yield row
+            if pending and not in_header:
+                row = self._match_master_idx_line(pending, cik_filter, form_filter)
+                if row:
+                    yield row
+
+    @staticmethod
+    def _gunzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
+    @staticmethod
+    def _match_master_idx_line(line: bytes, cik_filter: Optional[set],
+                               form_filter: Optional[set]) -> Optional[Dict]:
+        """Parse a CIK|Company|Form|Date|File line if it passes the filters."""
+        line = line.rstrip(b'\r')
+        cik, sep, rest = line.partition(b'|')
+        if not sep or (cik_filter is not None and cik not in cik_filter):
+            return None
+        parts = rest.split(b'|')
+        if len(parts) != 4:
+            return None
+        if form_filter is not None and parts[1] not in form_filter:
+            return None
+        company_name, form_type, date_filed, filename = (p.decode('latin-1') for p in parts)
+        return {
+            'cik': cik.decode('ascii'),
+            'company_name': company_name,
+            'form_type': form_type,
+            'date_filed': date_filed,
+            'filename': filename
+        }
+
+    def download_master_idx(self, url: str, ciks: Optional[Iterable[str]] = None,
+                            form_types: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Download and parse master index file, optionally filtered by CIK and form type."""
+        self.logger.info(f"Downloading master index from: {url}")
+        try:
+            return list(self.iter_master_idx(url, ciks=ciks, form_types=form_types))
         except Exception as e:
             self.logger.error(f"Error downloading master index from {url}: {str(e)}")
             return []
@@ -229,20 +302,16 @@ class SP500Downloader:
             cik = cik.zfill(10)
             master_idx_urls = self.get_master_idx_urls(years)
             self.logger.info(f"Got {len(master_idx_urls)} master index URLs")
-            all_filings = []
-            for url in master_idx_urls:
-                filings = self.download_master_idx(url)
-                self.logger.info(f"Downloaded {len(filings)} filings from {url}")
-                all_filings.extend(filings)
-            self.logger.info(f"Total filings found: {len(all_filings)}")
-            company_filings = [
-                filing for filing in all_filings
-                if filing['cik'].zfill(10) == cik and filing['form_type'] == '10-K'
-            ]
+            # Only quarters that are missing or still open are downloaded
+            self.filing_index.ensure_quarters(
+                master_idx_urls,
+                lambda url: self.download_master_idx(url, form_types=INDEXED_FORMS)
+            )
+            company_filings = self.filing_index.lookup(cik, '10-K', limit=years)
+            self.logger.info(f"Found {len(company_filings)} indexed 10-K filings for CIK {cik}")
             if not company_filings:
                 self.logger.error(f"No 10-K filings found for CIK {cik}")
                 return []
-            company_filings.sort(key=lambda x: x['date_filed'], reverse=True)
             result = []
             for filing in company_filings[:years]:
                 result.append({
@@ -258,7 +327,16 @@ class SP500Downloader:
             return []
 
     def download_filing(self, filing: Dict[str, str], sector: str, ticker: str) -> str:
-        """Download a single filing and save it to the appropriate directory."""
+        """Download a single filing and save it to the appropriate directory.
+
+        The body is streamed to disk as bytes in ``DOWNLOAD_CHUNK_SIZE`` chunks,
+        never decoded or held whole in memory, and the file appears atomically
+        with a ``.manifest.json`` sidecar recording its size and SHA-256.
+
+        Only the primary 10-K document (plus any ``FILING_EXHIBITS``) of the
+        full submission is kept, and the transfer stops once it has arrived.
+        A result that fails ``check_filing`` is quarantined and "" returned.
+        """
         try:
             filing_date = datetime.strptime(filing['date'], '%Y-%m-%d')
             year = filing_date.year
@@ -269,21 +347,191 @@ class SP500Downloader:
             self.logger.info(f"Created directory structure: {year_dir}")
             filing_url = filing['url']
             self.logger.info(f"Downloading filing from: {filing_url}")
-            response = self.make_sec_request(filing_url)
-            if response.status_code != 200:
-                self.logger.error(f"Failed to download filing: {response.status_code}")
+            file_path = os.path.join(year_dir, f"{ticker}_{filing['date']}.html")
+            splitter = SubmissionSplitter(self.filing_exhibits)
+            with self.make_sec_request(filing_url, stream=True) as response:
+                if response.status_code != 200:
+                    self.logger.error(f"Failed to download filing: {response.status_code}")
+                    return ""
+                # Truncated bodies are caught by requests; the kept document is
+                # smaller than Content-Length, so there is no size to compare
+                sidecar = write_stream(
+                    file_path,
+                    splitter.filter(response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)),
+                    url=filing_url,
+                    accession_number=filing.get('accession_number'),
+                    documents=lambda: splitter.documents,
+                    bytes_received=lambda: splitter.bytes_in
+                )
+            problem = check_filing(file_path)
+            if problem:
+                quarantine_filing(file_path, problem, self.base_dir)
+                self.logger.error(f"Downloaded filing from {filing_url} is unusable ({problem})")
                 return ""
-            file_path = os.path.join(year_dir, f"{ticker}_{filing['date']}.txt")
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(response.text)
-            self.logger.info(f"Downloaded filing to {file_path}")
+            primary = splitter.primary or {}
+            self.logger.info(f"Downloaded {primary.get('type', 'filing')} {primary.get('filename', '')} to {file_path} "
+                             f"({sidecar['size']} of {splitter.bytes_in} bytes received kept, "
+                             f"sha256 {sidecar['sha256'][:12]})")
+            self.catalog.invalidate()
             return file_path
         except Exception as e:
             self.logger.error(f"Error downloading filing: {str(e)}")
             return ""
 
+    def download_filings(self, jobs: List[Tuple[Dict[str, str], str, str]],
+                         max_workers: Optional[int] = None,
+                         on_complete: Optional[Callable[[Dict[str, str], str, str], None]] = None) -> Dict[str, str]:
+        """Download many filings concurrently.
+
+        ``jobs`` holds ``(filing, sector, ticker)`` tuples. Workers share the pooled
+        session and the global ``sec_rate_limiter``, so aggregate traffic stays
+        within the SEC budget however many workers run. ``on_complete(filing,
+        ticker, path)`` is called as each download finishes. Returns a mapping of
+        accession number to saved path ("" for failures).
+        """
+        results = {}
+        if not jobs:
+            return results
+        max_workers = min(max_workers or self.max_workers, len(jobs))
+        self.logger.info(f"Downloading {len(jobs)} filings with {max_workers} workers")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.download_filing, filing, sector, ticker): (filing, ticker)
+                for filing, sector, ticker in jobs
+            }
+            for future in as_completed(futures):
+                filing, ticker = futures[future]
+                try:
+                    results[filing['accession_number']] = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error downloading {filing.get('url')}: {str(e)}")
+                    results[filing['accession_number']] = ""
+                if on_complete:
+                    on_complete(filing, ticker, results[filing['accession_number']])
+        succeeded = sum(1 for path in results.values() if path)
+        self.logger.info(f"Downloaded {succeeded}/{len(jobs)} filings")
+        return results
+
+    def download_all_filings(self, companies: List[Dict], years: int = 5,
+                             verify_hash: bool = False) -> Dict[str, List[str]]:
+        """Download the last N years of 10-Ks for every company as a resumable batch job.
+
+        Progress is checkpointed in ``<base_dir>/download_manifest.json`` as each
+        filing finishes. Filings already recorded by accession number and still
+        present on disk (same size, and same SHA-256 when ``verify_hash`` is set)
+        are skipped, so a rerun only fetches new filings and ones that previously
+        failed. A usable copy the catalog already has on disk, e.g. from a run
+        before the manifest existed, is recorded (with its sidecar's size and
+        SHA-256) instead of being fetched again. Filing lookups hit the local
+        index, so re-checking finished companies is cheap.
+        """
+        manifest = DownloadManifest(os.path.join(self.base_dir, 'download_manifest.json'))
+        results = {'success': [], 'failed': []}
+
+        for i, company in enumerate(companies, 1):
+            ticker = str(company['symbol']).upper()
+            sector = company.get('sector') or 'Unknown'
+            try:
+                self.logger.info(f"[{i}/{len(companies)}] Downloading filings for {ticker}")
+                manifest.set_company_status(ticker, 'in_progress')
+                cik = str(company['cik']).zfill(10) if company.get('cik') else self.get_company_cik(ticker)
+                if not cik:
+                    manifest.set_company_status(ticker, 'failed', 'CIK not found')
+                    results['failed'].append(ticker)
+                    continue
+
+                filings = self.get_company_filings(cik, years)
+                if not filings:
+                    manifest.set_company_status(ticker, 'failed', 'No 10-K filings found')
+                    results['failed'].append(ticker)
+                    continue
+
+                pending = []
+                for filing in filings:
+                    if manifest.is_filing_done(ticker, filing['accession_number'], verify_hash):
+                        continue
+                    existing = self.catalog.find(ticker, filing['date'])
+                    if existing and existing['on_disk']:
+                        manifest.record_filing(ticker, filing['accession_number'], filing['date'], existing['path'])
+                        if manifest.is_filing_done(ticker, filing['accession_number'], verify_hash):
+                            continue
+                    pending.append(filing)
+                self.logger.info(f"{ticker}: {len(filings) - len(pending)} filings on disk, {len(pending)} to fetch")
+                self.download_filings(
+                    [(filing, sector, ticker) for filing in pending],
+                    on_complete=lambda filing, ticker, path: manifest.record_filing(
+                        ticker, filing['accession_number'], filing['date'], path
+                    )
+                )
+
+                if all(manifest.is_filing_done(ticker, f['accession_number']) for f in filings):
+                    manifest.set_company_status(ticker, 'complete')
+                    results['success'].append(ticker)
+                else:
+                    manifest.set_company_status(ticker, 'failed', 'One or more filings failed')
+                    results['failed'].append(ticker)
+            except Exception as e:
+                self.logger.error(f"Error downloading filings for {ticker}: {str(e)}")
+                self.logger.error(traceback.format_exc())
+                manifest.set_company_status(ticker, 'failed', str(e))
+                results['failed'].append(ticker)
+
+        self.logger.info(f"Batch complete: {len(results['success'])} succeeded, {len(results['failed'])} failed")
+        return results
+
+    def repair_downloads(self, refetch: bool = True) -> Dict[str, int]:
+        """Quarantine unusable downloads and fetch the real 10-K in their place.
+
+        Every file the catalog flagged with a ``check_filing`` problem is moved
+        to the quarantine directory. With ``refetch``, each (ticker, date) left
+        without a usable copy is looked up in the filing index and downloaded
+        again. Returns counts of what was done.
+        """
+        invalid = self.catalog.invalid()
+        counts = {'invalid': len(invalid), 'quarantined': 0, 'refetched': 0, 'unresolved': 0, 'failed': 0}
+        missing: Dict[str, set] = {}
+        for filing in invalid:
+            try:
+                quarantine_filing(filing['path'], filing['problem'], self.base_dir)
+                counts['quarantined'] += 1
+            except OSError as e:
+                self.logger.error(f"Error quarantining {filing['path']}: {str(e)}")
+                continue
+            missing.setdefault(filing['ticker'], set()).add(filing['date'])
+        self.catalog.invalidate()
+        if not refetch:
+            return counts
+
+        jobs = []
+        for ticker, dates in sorted(missing.items()):
+            # A usable copy stored elsewhere (another layout or format) is enough
+            dates = {date for date in dates if not self.catalog.find(ticker, date, formats=('html', 'txt'))}
+            if not dates:
+                continue
+            cik = self.get_company_cik(ticker)
+            years = datetime.now().year - int(min(dates)[:4]) + 1
+            filings = {filing['date']: filing for filing in self.get_company_filings(cik, years)} if cik else {}
+            company = company_registry.get(ticker)
+            sector = (company.sector if company else None) or 'Unknown'
+            for date in sorted(dates):
+                if date in filings:
+                    jobs.append((filings[date], sector, ticker))
+                else:
+                    self.logger.warning(f"No indexed 10-K for {ticker} filed on {date}")
+                    counts['unresolved'] += 1
+
+        downloaded = self.download_filings(jobs)
+        counts['refetched'] = sum(1 for path in downloaded.values() if path)
+        counts['failed'] = len(jobs) - counts['refetched']
+        self.logger.info(f"Repaired downloads: {counts}")
+        return counts
+
     def get_downloaded_filings(self, ticker: str, sector: str) -> List[Dict[str, Any]]:
-        """Get list of downloaded filings for a ticker."""
+        """Get list of downloaded filings for a ticker.
+
+        Returns the saved path with its size and SHA-256 rather than the
+        content; open the path (or mmap it) where the text is needed.
+        """
         try:
             # Get the CIK number first
             cik = self.get_company_cik(ticker)
@@ -300,21 +548,16 @@ class SP500Downloader:
             # Download any missing filings
             downloaded_filings = []
             for filing in filings:
-                if self.download_filing(filing, sector, ticker):
-                    # Read the downloaded filing
-                    year = filing['date'][:4]
-                    filepath = os.path.join(self.base_dir, sector, ticker, year, f"{ticker}_{filing['date']}.txt")
-                    try:
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            downloaded_filings.append({
-                                'date': filing['date'],
-                                'content': content,
-                                'accessionNumber': filing['accession_number']
-                            })
-                    except Exception as e:
-                        self.logger.error(f"Error reading downloaded filing {filepath}: {str(e)}")
-                        continue
+                filepath = self.download_filing(filing, sector, ticker)
+                if filepath:
+                    sidecar = read_sidecar(filepath) or {}
+                    downloaded_filings.append({
+                        'date': filing['date'],
+                        'path': filepath,
+                        'size': sidecar.get('size'),
+                        'sha256': sidecar.get('sha256'),
+                        'accessionNumber': filing['accession_number']
+                    })
 
             self.logger.info(f"Successfully downloaded {len(downloaded_filings)} filings for {ticker}")
             return downloaded_filings
@@ -324,36 +567,28 @@ class SP500Downloader:
             return []
 
     def _get_filings_from_dir(self, directory: str, ticker: str) -> List[Dict]:
-        """Helper method to get filings from a specific directory."""
+        """Helper method to get filings from a specific directory.
+
+        Like ``get_downloaded_filings`` it returns paths and sizes, not content,
+        so listing a directory costs nothing per byte of filing; read one with
+        ``filing_store.map_filing_path`` when its text is needed.
+        """
         filings = []
         try:
-            ticker = ticker.upper()  # Normalize ticker to uppercase
-            for file in os.listdir(directory):
-                # Case-insensitive file matching
-                if file.upper().startswith(f"{ticker}_") and (file.lower().endswith('.html') or file.lower().endswith('_10k_raw.html')):
-                    self.logger.info(f"Found filing: {file}")
-                    file_path = os.path.join(directory, file)
-                    
-                    # Extract date from filename (support YYYYMMDD and YYYY-MM-DD)
-                    date_match = re.search(r'(\d{8}|\d{4}-\d{2}-\d{2})', file)
-                    if not date_match:
-                        self.logger.warning(f"Could not extract date from filename: {file}")
-                        continue
-                    
-                    filing_date = date_match.group(1).replace('-', '')  # Normalize to YYYYMMDD
-                    self.logger.info(f"Extracted date {filing_date} from filename {file}")
-                    
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            self.logger.info(f"Successfully read file {file} ({len(content)} bytes)")
-                            filings.append({
-                                'date': filing_date,
-                                'content': content
-                            })
-                    except Exception as e:
-                        self.logger.error(f"Error reading file {file}: {str(e)}")
-                        continue
+            # The catalog matches tickers case-insensitively and parses YYYYMMDD and YYYY-MM-DD dates
+            directory = os.path.normpath(directory)
+            for filing in self.catalog.filings(ticker):
+                if os.path.normpath(filing['directory']) != directory:
+                    continue
+                file = os.path.basename(filing['path'])
+                self.logger.info(f"Found filing: {file}")
+                filing_date = filing['date'].replace('-', '')  # Normalize to YYYYMMDD
+                
+                filings.append({
+                    'date': filing_date,
+                    'path': filing['path'],
+                    'size': filing['size']
+                })
             
             return filings
         except Exception as e:
@@ -406,16 +641,7 @@ class SP500Downloader:
     def get_company_info(self, ticker: str) -> Optional[Dict]:
         """Get company information from S&P 500 data."""
         try:
-            ticker = ticker.upper()  # Normalize ticker to uppercase
-            companies = self.get_sp500_companies()
-            company = companies[companies['symbol'].str.upper() == ticker]
-            if not company.empty:
-                return {
-                    'name': company['name'].iloc[0],
-                    'sector': company['sector'].iloc[0],
-                    'cik': str(company['cik'].iloc[0]).zfill(10)
-                }
-            return None
+            return company_registry.info(ticker)
         except Exception as e:
             self.logger.error(f"Error getting company info: {str(e)}")
             return None 
\ No newline at end of file
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import logging
+from typing import Dict, Iterable, Optional
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sidecar_path(path: str) -> str:
+    return f"{path}.manifest.json"
+
+
+def read_sidecar(path: str) -> Optional[Dict]:
+    """The {'size', 'sha256', ...} sidecar of a downloaded file, if it still matches the file's size."""
+    try:
+        with open(sidecar_path(path), 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        if sidecar.get('size') == os.path.getsize(path):
+            return sidecar
+    except (OSError, ValueError, AttributeError):
+        pass
+    return None
+
+
+def write_stream(path: str, chunks: Iterable[bytes], expected_size: Optional[int] = None,
+                 **details) -> Dict:
+    """Write byte chunks to ``path`` through a temp file, hashing as they arrive.
+
+    The file only appears under its final name, via an atomic rename, once
+    every chunk is written and the size matches ``expected_size`` (if given).
+    Its size and SHA-256, plus any ``details``, go into a sidecar next to it;
+    callable details are called once the body is written, for values only
+    known after streaming. Raises IOError on a short or oversized body.
+    """
+    directory = os.path.dirname(path) or '.'
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        if expected_size is not None and size != expected_size:
+            raise IOError(f"expected {expected_size} bytes but received {size}")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    details = {name: value() if callable(value) else value for name, value in details.items()}
+    sidecar = {'size': size, 'sha256': digest.hexdigest(), 'written_at': time.time(), **details}
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(sidecar, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, sidecar_path(path))
+    return sidecar
+
+
+class DownloadManifest:
+    """Checkpoint file recording per-company and per-filing download status.
+
+    Layout::
+
+        {"companies": {"AAPL": {"status": "complete", "updated_at": ...,
+                                "filings": {"0000320193-23-000106": {
+                                    "status": "done", "date": "2023-11-03",
+                                    "path": "...", "size": 123, "sha256": "..."}}}}}
+
+    The file is rewritten atomically after every update, so a crash mid-run
+    loses at most the filing that was in flight.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        self.data = self._load()
+
+    def _load(self) -> Dict:
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data.get('companies'), dict):
+                    return data
+            except Exception as e:
+                self.logger.error(f"Error reading manifest {self.path}: {str(e)}")
+        return {'companies': {}}
+
+    def save(self):
+        """Write the manifest via a temp file and rename so it is never half-written."""
+        with self.lock:
+            directory = os.path.dirname(self.path) or '.'
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def company(self, ticker: str) -> Dict:
+        with self.lock:
+            return self.data['companies'].setdefault(ticker, {'status': 'pending', 'filings': {}})
+
+    def set_company_status(self, ticker: str, status: str, error: Optional[str] = None):
+        entry = self.company(ticker)
+        with self.lock:
+            entry['status'] = status
+            entry['updated_at'] = time.time()
+            if error:
+                entry['error'] = error
+            else:
+                entry.pop('error', None)
+        self.save()
+
+    def record_filing(self, ticker: str, accession: str, date: str, path: str,
+                      error: Optional[str] = None):
+        """Record a finished filing with its size and hash, or the reason it failed."""
+        entry = self.company(ticker)
+        record = {'date': date, 'updated_at': time.time()}
+        if path and os.path.exists(path):
+            # Streamed downloads were hashed as they were written
+            sidecar = read_sidecar(path)
+            record.update({
+                'status': 'done',
+                'path': path,
+                'size': os.path.getsize(path),
+                'sha256': sidecar['sha256'] if sidecar else file_sha256(path)
+            })
+        else:
+            record.update({'status': 'failed', 'error': error or 'download failed'})
+        with self.lock:
+            entry['filings'][accession] = record
+        self.save()
+
+    def is_filing_done(self, ticker: str, accession: str, verify_hash: bool = False) -> bool:
+        """True if the filing was recorded as done and the file on disk still matches."""
+        record = self.company(ticker)['filings'].get(accession)
+        if not record or record.get('status') != 'done':
+            return False
+        path = record.get('path')
+        if not path or not os.path.exists(path) or os.path.getsize(path) != record.get('size'):
+            return False
+        if verify_hash and file_sha256(path) != record.get('sha256'):
+            return False
+        return True
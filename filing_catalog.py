@@ -0,0 +1,321 @@
+import os
+import re
+import json
+import time
+import threading
+import logging
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from filing_validator import check_filing
+from filing_store import filing_store, open_filing_path
+
+# TICKER_YYYY-MM-DD.html, TICKER_YYYY-MM-DD_10K.html, TICKER_YYYY-MM-DD_10K_raw.html,
+# TICKER_YYYY-MM-DD_10K_text.txt or TICKER_YYYY-MM-DD.txt (full submission)
+FILING_NAME_RE = re.compile(
+    r'^(?P<ticker>[A-Z0-9.\-]+)_(?P<date>\d{4}-\d{2}-\d{2}|\d{8})(?:_(?P<kind>10K(?:_raw|_text)?))?\.(?P<ext>html?|txt)$',
+    re.IGNORECASE
+)
+ACCESSION_RE = re.compile(r'\d{10}-\d{2}-\d{6}')
+# Directories named after a ticker (downloads/AAPL/2024, downloads/Energy/CVX/2025)
+TICKER_DIR_RE = re.compile(r'^[A-Z][A-Z0-9.\-]{0,5}$')
+# Kinds of the filing's main document, preferred over its _10K_raw/_10K_text copies
+MAIN_KINDS = ('', '10k')
+
+
+def _copy_order(filing: Dict) -> Tuple:
+    """Sort key, used reversed: newest first, then within a date the main document, then the largest copy."""
+    return filing['date'], filing['kind'] in MAIN_KINDS, filing['size']
+
+
+class FilingCatalog:
+    """In-memory catalog of every filing under the downloads tree.
+
+    Filings are found wherever they sit: ``<company>/<year>/``, ``<sector>/``
+    or ``<sector>/<ticker>/<year>/``. They are indexed as ticker -> company
+    (the top-level directory) -> filings, newest first. Of several copies
+    on one date, the main document comes before its ``10K_raw``/``10K_text``
+    variants, and then larger copies come first. Each filing has its
+    date, path, size, format and accession number. The accession comes from
+    ``metadata.json`` or the download manifest, when one is known. Each file
+    is also sniffed by ``check_filing`` as it is scanned. Files with a
+    ``problem`` (XBRL viewer shells, error pages, truncated downloads) are
+    left out of lookups and listed by ``invalid``. Filings packed into the
+    ``filing_store`` stay listed after their originals are deleted, with
+    ``on_disk`` False; read them with ``open_filing``.
+
+    The tree is scanned once with ``os.scandir``. After that, at most every
+    ``check_interval`` seconds, each directory's mtime is compared with the
+    one seen at the last scan. Only top-level directories whose mtime changed
+    are rescanned, because adding, removing or renaming a file changes its
+    directory's mtime.
+    """
+
+    def __init__(self, base_dir: str = "downloads",
+                 check_interval: float = float(os.getenv('FILING_CATALOG_CHECK_INTERVAL', 2.0))):
+        self.base_dir = base_dir
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        self._trees: Dict[str, Dict] = {}
+        self._by_ticker: Dict[str, Dict[str, List[Dict]]] = {}
+        self._manifest_path = os.path.join(base_dir, 'download_manifest.json')
+        self._manifest_mtime = None
+        self._manifest_accessions: Dict[Tuple[str, str], str] = {}
+        self._store_version = None
+        self._packed: List[Dict] = []
+        self._checked_at = 0.0
+        self.scans = 0
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def _scan_tree(self, top_path: str, company: str) -> Dict:
+        """Scan one top-level directory: every subdirectory's mtime, filings and accessions."""
+        dirs = {}
+        filings = []
+        accessions = {}  # (ticker, date) -> accession
+        dir_accessions = {}  # (directory, date) -> accession, where no ticker directory is known
+        stack = [(top_path, TICKER_DIR_RE.match(company) and company)]
+        while stack:
+            path, dir_ticker = stack.pop()
+            # Record the mtime before listing so changes made during the scan are seen next time
+            dirs[path] = self._mtime(path)
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, entry.name if TICKER_DIR_RE.match(entry.name) else dir_ticker))
+                    continue
+                if entry.name == 'metadata.json':
+                    metadata = self._read_metadata(entry.path)
+                    if metadata and dir_ticker:
+                        accessions[(dir_ticker, metadata['date'])] = metadata['accession']
+                    elif metadata:
+                        dir_accessions[(path, metadata['date'])] = metadata['accession']
+                    continue
+                match = FILING_NAME_RE.match(entry.name)
+                if not match:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                date = match['date']
+                if '-' not in date:
+                    date = f"{date[:4]}-{date[4:6]}-{date[6:]}"
+                filings.append({
+                    'ticker': match['ticker'].upper(),
+                    'date': date,
+                    'path': entry.path,
+                    'size': stat.st_size,
+                    'format': 'html' if match['ext'].lower().startswith('htm') else 'txt',
+                    'kind': (match['kind'] or '').lower(),
+                    'company': company,
+                    'directory': path,
+                    'accession': None,
+                    'problem': check_filing(entry.path),
+                    'on_disk': True
+                })
+        for filing in filings:
+            filing['accession'] = dir_accessions.get((filing['directory'], filing['date']))
+        return {'dirs': dirs, 'filings': filings, 'accessions': accessions}
+
+    @staticmethod
+    def _read_metadata(path: str) -> Optional[Dict]:
+        """Accession number and date from a downloader ``metadata.json``."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            accession = ACCESSION_RE.search(metadata.get('url', ''))
+        except (OSError, ValueError, AttributeError):
+            return None
+        if not accession or not metadata.get('date'):
+            return None
+        return {'accession': accession.group(), 'date': metadata['date']}
+
+    def _load_manifest(self) -> bool:
+        mtime = self._mtime(self._manifest_path)
+        if mtime == self._manifest_mtime:
+            return False
+        self._manifest_mtime = mtime
+        self._manifest_accessions = {}
+        if mtime is None:
+            return True
+        try:
+            with open(self._manifest_path, 'r', encoding='utf-8') as f:
+                companies = json.load(f).get('companies', {})
+            for ticker, company in companies.items():
+                for accession, filing in company.get('filings', {}).items():
+                    if filing.get('date'):
+                        self._manifest_accessions[(ticker.upper(), filing['date'])] = accession
+        except (OSError, ValueError, AttributeError) as e:
+            self.logger.warning(f"Could not read download manifest {self._manifest_path}: {str(e)}")
+        return True
+
+    def _load_packed(self) -> bool:
+        version = filing_store.version()
+        if version == self._store_version:
+            return False
+        self._store_version = version
+        self._packed = []
+        for entry in filing_store.entries():
+            relative = os.path.relpath(entry['path'], self.base_dir)
+            if relative.startswith(os.pardir):
+                continue
+            self._packed.append({
+                'ticker': entry['ticker'],
+                'date': entry['filing_date'],
+                'path': entry['path'],
+                'size': entry['size'],
+                'format': entry['format'],
+                'kind': entry['kind'],
+                'company': relative.split(os.sep)[0],
+                'directory': os.path.dirname(entry['path']),
+                'accession': None,
+                'problem': None,
+                'on_disk': False
+            })
+        return True
+
+    def _rebuild(self):
+        accessions = dict(self._manifest_accessions)
+        for tree in self._trees.values():
+            accessions.update(tree['accessions'])
+        on_disk = {filing['path'] for tree in self._trees.values() for filing in tree['filings']}
+        packed = {}
+        for filing in self._packed:
+            if filing['path'] not in on_disk:
+                packed.setdefault(filing['company'], []).append(filing)
+        by_ticker: Dict[str, Dict[str, List[Dict]]] = {}
+        for company in set(self._trees) | set(packed):
+            tree_filings = self._trees[company]['filings'] if company in self._trees else []
+            for filing in tree_filings + packed.get(company, []):
+                if not filing['accession']:
+                    filing['accession'] = accessions.get((filing['ticker'], filing['date']))
+                by_ticker.setdefault(filing['ticker'], {}).setdefault(company, []).append(filing)
+        for companies in by_ticker.values():
+            for filings in companies.values():
+                filings.sort(key=_copy_order, reverse=True)
+        self._by_ticker = by_ticker
+
+    def refresh(self, force: bool = False) -> bool:
+        """Rescan directories changed since the last check. Returns True if anything changed."""
+        with self.lock:
+            now = time.time()
+            if not force and now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+
+            try:
+                tops = {entry.name: entry.path for entry in os.scandir(self.base_dir)
+                        if entry.is_dir(follow_symlinks=False)}
+            except OSError:
+                tops = {}
+            changed = self._load_manifest()
+            changed = self._load_packed() or changed
+            for company in list(self._trees):
+                if company not in tops:
+                    del self._trees[company]
+                    changed = True
+            for company, path in tops.items():
+                tree = self._trees.get(company)
+                if tree is None or any(self._mtime(d) != mtime for d, mtime in tree['dirs'].items()):
+                    self._trees[company] = self._scan_tree(path, company)
+                    self.scans += 1
+                    changed = True
+            if changed:
+                self._rebuild()
+            return changed
+
+    def invalidate(self):
+        """Make the next lookup check for changes instead of waiting for ``check_interval``."""
+        with self.lock:
+            self._checked_at = 0.0
+
+    def tickers(self) -> List[str]:
+        self.refresh()
+        return sorted(self._by_ticker)
+
+    def companies(self, ticker: str) -> Dict[str, List[Dict]]:
+        """Company directory name -> filings (all formats, newest first) for a ticker."""
+        self.refresh()
+        return self._by_ticker.get(ticker.upper(), {})
+
+    def filings(self, ticker: Optional[str] = None, company: Optional[str] = None,
+                formats: Tuple[str, ...] = ('html',), include_invalid: bool = False) -> List[Dict]:
+        """Filings of one ticker (or every ticker), optionally under one company, newest first."""
+        self.refresh()
+        tickers = [ticker.upper()] if ticker else list(self._by_ticker)
+        filings = [
+            filing
+            for name in tickers
+            for filing_company, company_filings in self._by_ticker.get(name, {}).items()
+            if company is None or filing_company == company
+            for filing in company_filings
+            if filing['format'] in formats and (include_invalid or not filing['problem'])
+        ]
+        filings.sort(key=_copy_order, reverse=True)
+        return filings
+
+    def latest(self, ticker: str, company: Optional[str] = None,
+               formats: Tuple[str, ...] = ('html',)) -> Optional[Dict]:
+        filings = self.filings(ticker, company, formats)
+        return filings[0] if filings else None
+
+    def find(self, ticker: str, date: str, company: Optional[str] = None,
+             formats: Tuple[str, ...] = ('html',)) -> Optional[Dict]:
+        """The filing of a ticker on a date (YYYY-MM-DD), or None."""
+        return next((filing for filing in self.filings(ticker, company, formats) if filing['date'] == date), None)
+
+    def invalid(self) -> List[Dict]:
+        """Every filing that failed ``check_filing``, in any format."""
+        return [filing for filing in self.filings(formats=('html', 'txt'), include_invalid=True) if filing['problem']]
+
+    def open_filing(self, ticker: str, date: str) -> Optional[BinaryIO]:
+        """Stream the bytes of a ticker's filing on a date (YYYY-MM-DD), packed or on disk."""
+        filing = self.find(ticker, date)
+        return open_filing_path(filing['path']) if filing else None
+
+    def company_path(self, ticker: str) -> Optional[str]:
+        """Top-level directory holding the ticker's latest HTML filing."""
+        filing = self.latest(ticker)
+        return os.path.join(self.base_dir, filing['company']) if filing else None
+
+    def stats(self) -> Dict:
+        self.refresh()
+        problems: Dict[str, int] = {}
+        for tree in self._trees.values():
+            for filing in tree['filings']:
+                if filing['problem']:
+                    problems[filing['problem']] = problems.get(filing['problem'], 0) + 1
+        return {
+            'tickers': len(self._by_ticker),
+            'filings': sum(len(tree['filings']) for tree in self._trees.values()),
+            'directories': sum(len(tree['dirs']) for tree in self._trees.values()),
+            'invalid': problems,
+            'packed_only': sum(
+                1 for companies in self._by_ticker.values() for filings in companies.values()
+                for filing in filings if not filing['on_disk']
+            ),
+            'scans': self.scans
+        }
+
+
+_catalogs: Dict[str, FilingCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def catalog_for(base_dir: str = "downloads") -> FilingCatalog:
+    """Shared catalog for a downloads directory, so every lookup reuses one scan."""
+    key = os.path.abspath(base_dir)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = FilingCatalog(base_dir)
+        return _catalogs[key]
@@ -0,0 +1,155 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Form types kept in the local index. Everything else in master.idx is dropped
+# at insert time so the database stays small (a few MB for five years).
+INDEXED_FORMS = ('10-K', '10-K/A', '10-K405', '10-KT')
+
+MASTER_IDX_URL_RE = re.compile(r'/full-index/(\d{4})/QTR([1-4])/')
+
+
+class FilingIndex:
+    """On-disk SQLite index of EDGAR master.idx rows keyed by (cik, form_type, date_filed)."""
+
+    def __init__(self, db_path: str = os.path.join("filings", "master_index.db"),
+                 refresh_interval: int = 12 * 60 * 60):
+        self.db_path = db_path
+        self.refresh_interval = refresh_interval  # seconds between refreshes of the open quarter
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _create_schema(self):
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS filings (
+                    cik TEXT NOT NULL,
+                    company_name TEXT,
+                    form_type TEXT NOT NULL,
+                    date_filed TEXT NOT NULL,
+                    filename TEXT PRIMARY KEY
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_filings_lookup
+                ON filings (cik, form_type, date_filed)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS quarters (
+                    year INTEGER NOT NULL,
+                    qtr INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    PRIMARY KEY (year, qtr)
+                )
+            ''')
+
+    @staticmethod
+    def parse_quarter(url: str) -> Optional[Tuple[int, int]]:
+        """Return (year, quarter) for a full-index master.idx URL."""
+        match = MASTER_IDX_URL_RE.search(url)
+        if not match:
+            return None
+        return int(match.group(1)), int(match.group(2))
+
+    @staticmethod
+    def quarter_end(year: int, qtr: int) -> float:
+        """Timestamp of the first instant after the given quarter."""
+        if qtr == 4:
+            return datetime(year + 1, 1, 1).timestamp()
+        return datetime(year, qtr * 3 + 1, 1).timestamp()
+
+    def needs_refresh(self, year: int, qtr: int, now: Optional[float] = None) -> bool:
+        """Closed quarters are fetched once; the open quarter is refreshed every refresh_interval."""
+        now = now or time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT fetched_at FROM quarters WHERE year = ? AND qtr = ?', (year, qtr)
+            ).fetchone()
+        if row is None:
+            return True
+        fetched_at = row[0]
+        end = self.quarter_end(year, qtr)
+        if fetched_at >= end:
+            # Fetched after the quarter closed, so the file can no longer change
+            return False
+        if now >= end:
+            # Quarter closed since our last fetch; pick up the final rows once
+            return True
+        return now - fetched_at >= self.refresh_interval
+
+    def store_quarter(self, year: int, qtr: int, filings: Iterable[Dict]) -> int:
+        """Insert master.idx rows for a quarter and record when it was fetched."""
+        rows = [
+            (f['cik'].zfill(10), f['company_name'], f['form_type'], f['date_filed'], f['filename'])
+            for f in filings
+            if f['form_type'] in INDEXED_FORMS
+        ]
+        with self._connect() as conn:
+            # Rows are unique by filename, so re-fetching the open quarter only adds new filings
+            conn.executemany(
+                'INSERT OR IGNORE INTO filings (cik, company_name, form_type, date_filed, filename) '
+                'VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO quarters (year, qtr, fetched_at, row_count) VALUES (?, ?, ?, ?)',
+                (year, qtr, time.time(), len(rows))
+            )
+        self.logger.info(f"Indexed {len(rows)} filings for {year} Q{qtr}")
+        return len(rows)
+
+    def ensure_quarters(self, urls: List[str], fetch: Callable[[str], List[Dict]]) -> None:
+        """Fetch any master.idx quarters that are missing or stale."""
+        with self.lock:
+            for url in urls:
+                quarter = self.parse_quarter(url)
+                if not quarter:
+                    self.logger.warning(f"Not a master index URL: {url}")
+                    continue
+                year, qtr = quarter
+                if not self.needs_refresh(year, qtr):
+                    continue
+                self.logger.info(f"Refreshing filing index for {year} Q{qtr}")
+                filings = fetch(url)
+                if not filings:
+                    # A failed download looks like an empty quarter; retry on the next lookup
+                    self.logger.warning(f"No rows fetched for {year} Q{qtr}, leaving quarter unindexed")
+                    continue
+                self.store_quarter(year, qtr, filings)
+
+    def lookup(self, cik: str, form_type: str = '10-K', limit: Optional[int] = None) -> List[Dict]:
+        """Return filings for a CIK and form type, newest first."""
+        query = ('SELECT cik, company_name, form_type, date_filed, filename FROM filings '
+                 'WHERE cik = ? AND form_type = ? ORDER BY date_filed DESC')
+        params: Tuple = (cik.zfill(10), form_type)
+        if limit:
+            query += ' LIMIT ?'
+            params += (limit,)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            {
+                'cik': row[0],
+                'company_name': row[1],
+                'form_type': row[2],
+                'date_filed': row[3],
+                'filename': row[4]
+            }
+            for row in rows
+        ]
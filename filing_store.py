@@ -0,0 +1,401 @@
+import io
+import os
+import mmap
+import time
+import zlib
+import sqlite3
+import uuid
+import hashlib
+import threading
+import logging
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; fall back to gzip
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within this process
+    fcntl = None
+
+# Compressed bytes read (and uncompressed bytes read from sources) per step
+READ_CHUNK_SIZE = 256 * 1024
+STORE_CODEC = os.getenv('FILING_STORE_CODEC', 'zstd' if zstandard else 'gzip')
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 9
+
+
+class _MemberReader(io.RawIOBase):
+    """Decompressed bytes of one compressed member of a pack file."""
+
+    def __init__(self, pack_path: str, offset: int, length: int, codec: str):
+        self._file = open(pack_path, 'rb')
+        self._file.seek(offset)
+        self._remaining = length
+        if codec == 'zstd':
+            if zstandard is None:
+                self._file.close()
+                raise IOError(f"zstandard is required to read {pack_path}")
+            self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        self._pending = b''
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while self._position >= len(self._pending):
+            if self._remaining <= 0:
+                return 0
+            chunk = self._file.read(min(READ_CHUNK_SIZE, self._remaining))
+            if not chunk:
+                raise IOError("Pack member is truncated")
+            self._remaining -= len(chunk)
+            self._pending = self._decompressor.decompress(chunk)
+            self._position = 0
+        count = min(len(buffer), len(self._pending) - self._position)
+        buffer[:count] = self._pending[self._position:self._position + count]
+        self._position += count
+        return count
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+class FilingStore:
+    """Compressed copies of downloaded filings, packed into one archive per ticker.
+
+    Each filing is appended to ``<store_dir>/<TICKER>.pack`` as its own
+    compressed member: zstd when ``zstandard`` is installed, gzip otherwise.
+    An SQLite index maps the filing's catalog path to its member's offset and
+    length, so reading one filing seeks straight to it and decompresses only
+    that member. The index also records the original size, mtime and SHA-256.
+    Identical copies of a filing stored under several paths share one member.
+
+    ``open_filing_path`` prefers the packed copy, which means fewer bytes off
+    disk. Once a filing is packed, the original can be deleted: the filing
+    catalog keeps listing it from the index.
+
+    Appends to a pack hold an exclusive ``flock`` on it until the index
+    points at the new member, so several processes can pack into one store.
+    Re-packing a filing whose bytes changed leaves its old member in the pack,
+    counted by ``stats()`` as ``orphaned_bytes``. ``compact`` copies each
+    pack's live members into a new pack and deletes the old one.
+
+    Nothing is created until the first filing is packed; until then lookups
+    find nothing. Each thread keeps one connection to the index.
+    """
+
+    def __init__(self, store_dir: str = os.getenv('FILING_STORE_DIR', os.path.join("filings", "store"))):
+        self.store_dir = store_dir
+        self.db_path = os.path.join(store_dir, 'index.db')
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+        self._local = threading.local()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection to the index, opened (creating the store) on first use."""
+        # Connections must not cross into forked worker processes
+        if getattr(self._local, 'pid', None) != os.getpid():
+            os.makedirs(self.store_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.row_factory = sqlite3.Row
+            self._create_schema(conn)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS filings (
+                    path TEXT PRIMARY KEY,
+                    ticker TEXT NOT NULL,
+                    filing_date TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    archive TEXT NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    codec TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    added_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_filings_ticker ON filings (ticker, filing_date)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_filings_sha256 ON filings (archive, sha256)')
+
+    def _compressor(self):
+        if STORE_CODEC == 'zstd' and zstandard is not None:
+            return 'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        return 'gzip', zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def add(self, filing: Dict) -> str:
+        """Pack one catalog filing. Returns 'packed', 'deduplicated' or 'unchanged'."""
+        path = filing['path']
+        stat = os.stat(path)
+        existing = self.lookup(path)
+        if existing and (existing['size'], existing['mtime']) == (stat.st_size, stat.st_mtime):
+            return 'unchanged'
+
+        conn = self._connect()
+        codec, compressor = self._compressor()
+        digest = hashlib.sha256()
+        with self.lock:
+            archive, pack = self._open_pack(conn, filing['ticker'])
+            with open(path, 'rb') as source, pack:
+                offset = pack.seek(0, os.SEEK_END)
+                for chunk in iter(lambda: source.read(READ_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    pack.write(compressor.compress(chunk))
+                pack.write(compressor.flush())
+                pack.flush()
+                os.fsync(pack.fileno())
+                length = pack.tell() - offset
+                with conn:
+                    duplicate = conn.execute(
+                        'SELECT offset, length, codec FROM filings WHERE archive = ? AND sha256 = ? LIMIT 1',
+                        (archive, digest.hexdigest())
+                    ).fetchone()
+                    if duplicate:
+                        # Same bytes already packed for another path; drop the new member
+                        pack.truncate(offset)
+                        offset, length, codec = duplicate['offset'], duplicate['length'], duplicate['codec']
+                    conn.execute(
+                        'INSERT OR REPLACE INTO filings (path, ticker, filing_date, kind, format, archive, offset, '
+                        'length, codec, size, mtime, sha256, added_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (path, filing['ticker'], filing['date'], filing.get('kind', ''), filing.get('format', 'html'),
+                         archive, offset, length, codec, stat.st_size, stat.st_mtime, digest.hexdigest(), time.time())
+                    )
+        return 'deduplicated' if duplicate else 'packed'
+
+    def _archive(self, conn: sqlite3.Connection, ticker: str) -> Tuple[str, bool]:
+        """(pack file name, whether the index already uses it) for a ticker."""
+        row = conn.execute('SELECT archive FROM filings WHERE ticker = ? LIMIT 1', (ticker,)).fetchone()
+        return (row['archive'], True) if row else (f"{ticker}.pack", False)
+
+    def _open_pack(self, conn: sqlite3.Connection, ticker: str) -> Tuple[str, BinaryIO]:
+        """Open the ticker's current pack for appending, holding its flock."""
+        while True:
+            archive, indexed = self._archive(conn, ticker)
+            flags = os.O_WRONLY | os.O_APPEND | (0 if indexed else os.O_CREAT)
+            try:
+                pack = os.fdopen(os.open(os.path.join(self.store_dir, archive), flags, 0o644), 'ab')
+            except FileNotFoundError:
+                continue  # compacted into a new pack since the lookup
+            if fcntl is not None:
+                fcntl.flock(pack.fileno(), fcntl.LOCK_EX)
+            # A compaction may have moved the ticker to a new pack while this one waited
+            if self._archive(conn, ticker)[0] == archive:
+                return archive, pack
+            pack.close()
+
+    def compact(self) -> Dict[str, int]:
+        """Rewrite every pack holding members no filing points at any more.
+
+        Live members are copied as they are, still compressed, into a new pack.
+        The index is switched to it in one transaction and then the old pack
+        is deleted, so an interrupted compaction leaves the store readable.
+        Readers that already opened a member keep reading the old file.
+        """
+        counts = {'compacted': 0, 'reclaimed_bytes': 0}
+        if not self.exists():
+            return counts
+        conn = self._connect()
+        archives = [row['archive'] for row in conn.execute('SELECT DISTINCT archive FROM filings')]
+        for archive in archives:
+            with self.lock:
+                reclaimed = self._compact_archive(conn, archive)
+            if reclaimed:
+                counts['compacted'] += 1
+                counts['reclaimed_bytes'] += reclaimed
+        self.logger.info(f"Filing store compaction: {counts}")
+        return counts
+
+    def _compact_archive(self, conn: sqlite3.Connection, archive: str) -> int:
+        pack_path = os.path.join(self.store_dir, archive)
+        with open(pack_path, 'rb') as pack:
+            if fcntl is not None:
+                fcntl.flock(pack.fileno(), fcntl.LOCK_EX)
+            members = conn.execute(
+                'SELECT DISTINCT offset, length, ticker FROM filings WHERE archive = ? ORDER BY offset', (archive,)
+            ).fetchall()
+            size = os.fstat(pack.fileno()).st_size
+            reclaimed = size - sum(member['length'] for member in members)
+            if not members or reclaimed <= 0:
+                return 0
+
+            new_archive = f"{members[0]['ticker']}.{uuid.uuid4().hex[:12]}.pack"
+            new_path = os.path.join(self.store_dir, new_archive)
+            moved = []
+            try:
+                with open(new_path + '.tmp', 'wb') as out:
+                    for member in members:
+                        moved.append((out.tell(), member['offset']))
+                        pack.seek(member['offset'])
+                        remaining = member['length']
+                        while remaining > 0:
+                            chunk = pack.read(min(READ_CHUNK_SIZE, remaining))
+                            if not chunk:
+                                raise IOError(f"Pack member at {member['offset']} of {archive} is truncated")
+                            out.write(chunk)
+                            remaining -= len(chunk)
+                    out.flush()
+                    os.fsync(out.fileno())
+                os.replace(new_path + '.tmp', new_path)
+                with conn:
+                    conn.executemany(
+                        'UPDATE filings SET archive = ?, offset = ? WHERE archive = ? AND offset = ?',
+                        [(new_archive, new_offset, archive, offset) for new_offset, offset in moved]
+                    )
+            except BaseException:
+                for leftover in (new_path + '.tmp', new_path):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+                raise
+            os.remove(pack_path)
+        self.logger.info(f"Compacted {archive} into {new_archive}, reclaiming {reclaimed} bytes")
+        return reclaimed
+
+    def pack(self, filings: Iterable[Dict], remove_originals: bool = False) -> Dict[str, int]:
+        """Pack catalog filings (e.g. ``catalog.filings(formats=('html', 'txt'))``).
+
+        With ``remove_originals``, each source file is deleted once its member
+        has been read back and matches the original SHA-256.
+        """
+        counts = {'packed': 0, 'deduplicated': 0, 'unchanged': 0, 'failed': 0, 'removed': 0}
+        for filing in filings:
+            if not filing.get('on_disk', True):
+                continue
+            try:
+                counts[self.add(filing)] += 1
+                if remove_originals:
+                    entry = self.lookup(filing['path'])
+                    digest = hashlib.sha256()
+                    with self.open_entry(entry) as f:
+                        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+                            digest.update(chunk)
+                    if digest.hexdigest() != entry['sha256']:
+                        raise IOError("packed copy does not match the original")
+                    os.remove(filing['path'])
+                    counts['removed'] += 1
+            except (OSError, sqlite3.Error) as e:
+                self.logger.error(f"Error packing {filing['path']}: {str(e)}")
+                counts['failed'] += 1
+        self.logger.info(f"Filing store: {counts}")
+        return counts
+
+    def lookup(self, path: str) -> Optional[Dict]:
+        if not self.exists():
+            return None
+        row = self._connect().execute('SELECT * FROM filings WHERE path = ?', (path,)).fetchone()
+        return dict(row) if row else None
+
+    def entries(self) -> List[Dict]:
+        if not self.exists():
+            return []
+        return [dict(row) for row in self._connect().execute('SELECT * FROM filings')]
+
+    def version(self) -> Tuple:
+        """Changes whenever a filing is added or replaced."""
+        if not self.exists():
+            return 0, None
+        return tuple(self._connect().execute('SELECT COUNT(*), MAX(added_at) FROM filings').fetchone())
+
+    def open_entry(self, entry: Dict) -> BinaryIO:
+        reader = _MemberReader(os.path.join(self.store_dir, entry['archive']),
+                               entry['offset'], entry['length'], entry['codec'])
+        return io.BufferedReader(reader, buffer_size=READ_CHUNK_SIZE)
+
+    def open_filing(self, ticker: str, date: str) -> Optional[BinaryIO]:
+        """Stream the decompressed bytes of a ticker's filing on a date (YYYY-MM-DD).
+
+        Of several copies, the main document (not a ``10K_raw``/``10K_text``
+        variant) is preferred, then the largest. Returns None if none is packed.
+        """
+        if not self.exists():
+            return None
+        row = self._connect().execute(
+            "SELECT * FROM filings WHERE ticker = ? AND filing_date = ? AND format = 'html' "
+            "ORDER BY kind IN ('', '10k') DESC, size DESC LIMIT 1",
+            (ticker.upper(), date)
+        ).fetchone()
+        return self.open_entry(dict(row)) if row else None
+
+    def stats(self) -> Dict:
+        if not self.exists():
+            return {'filings': 0, 'members': 0, 'raw_bytes': 0, 'packed_bytes': 0, 'orphaned_bytes': 0}
+        conn = self._connect()
+        row = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM filings').fetchone()
+        members, live_bytes = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(length), 0) FROM (SELECT DISTINCT archive, offset, length FROM filings)'
+        ).fetchone()
+        packed_bytes = sum(
+            entry.stat().st_size for entry in os.scandir(self.store_dir) if entry.name.endswith('.pack')
+        )
+        return {'filings': row[0], 'members': members, 'raw_bytes': row[1], 'packed_bytes': packed_bytes,
+                'orphaned_bytes': packed_bytes - live_bytes}
+
+
+def _packed_entry(path: str) -> Optional[Dict]:
+    """The store entry for ``path`` if it is still the same file (or the original is gone)."""
+    entry = filing_store.lookup(path)
+    if entry is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return entry
+    return entry if (stat.st_size, stat.st_mtime) == (entry['size'], entry['mtime']) else None
+
+
+def open_filing_path(path: str) -> BinaryIO:
+    """Open a catalog filing for binary reading, from the store when packed, else from disk."""
+    entry = _packed_entry(path)
+    return filing_store.open_entry(entry) if entry else open(path, 'rb')
+
+
+@contextmanager
+def map_filing_path(path: str) -> Iterator:
+    """A read-only bytes-like view of a catalog filing for bytes-regex scanning.
+
+    Files on disk are mmapped, so scans page in only what they touch and
+    nothing is copied. Filings only in the store are decompressed into bytes.
+    """
+    if not os.path.exists(path) and _packed_entry(path):
+        with open_filing_path(path) as f:
+            yield f.read()
+        return
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def filing_stat(path: str) -> Tuple[int, float]:
+    """(size, mtime) of a catalog filing, packed or on disk. Raises OSError if it is neither."""
+    entry = _packed_entry(path)
+    if entry:
+        return entry['size'], entry['mtime']
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime
+
+
+# Shared store, created on disk by the first pack; filing readers go through open_filing_path
+filing_store = FilingStore()
@@ -0,0 +1,112 @@
+import os
+import re
+import json
+import mmap
+import time
+import shutil
+import logging
+from typing import Optional
+
+# Bytes read from the start and end of a file; enough for the cover page and table of contents
+SNIFF_HEAD_BYTES = 256 * 1024
+SNIFF_TAIL_BYTES = 4 * 1024
+# The smallest real 10-K documents are a few hundred KB of HTML
+MIN_FILING_BYTES = int(os.getenv('FILING_MIN_BYTES', 100 * 1024))
+# Distinct Item headings expected in the table of contents of a filing without inline XBRL
+MIN_ITEM_HEADINGS = 4
+
+TITLE_RE = re.compile(rb'<title[^>]*>([^<]*)</title>', re.IGNORECASE)
+TYPE_RE = re.compile(rb'<TYPE>([^\r\n<]*)')
+IX_FACT_RE = re.compile(rb'<ix:(?:nonfraction|nonnumeric)\b', re.IGNORECASE)
+ITEM_HEADING_RE = re.compile(
+    rb'\bitem(?:\s|&#160;|&#xa0;|&nbsp;|\xc2\xa0|<[^>]{0,300}>)*'
+    rb'(1a|1b|1c|1|2|3|4|5|6|7a|7|8|9a|9b|9|10|11|12|13|14|15|16)\s*(?:\.|:|&#160;|&nbsp;|<|-|\xe2\x80\x94)',
+    re.IGNORECASE
+)
+HTML_END_RE = re.compile(rb'</html>\s*(?:</XBRL>\s*)?(?:</TEXT>\s*(?:</DOCUMENT>\s*)?)?$', re.IGNORECASE)
+HTML_START_RE = re.compile(rb'<html', re.IGNORECASE)
+SUBMISSION_START_RE = re.compile(rb'\s*<SEC-DOCUMENT>')
+SUBMISSION_END_RE = re.compile(rb'</SEC-DOCUMENT>\s*$')
+# Pages EDGAR serves instead of the document when a request is throttled or refused
+SEC_ERROR_MARKERS = (b'Request Rate Threshold Exceeded', b'Undeclared Automated Tool', b'Your Request Originates')
+
+logger = logging.getLogger(__name__)
+
+
+def check_filing(path: str) -> Optional[str]:
+    """Sniff a downloaded 10-K and return why it is unusable, or None if it looks real.
+
+    The file is mmapped and bytes patterns search only its first
+    ``SNIFF_HEAD_BYTES`` and last ``SNIFF_TAIL_BYTES``, so nothing is copied
+    out of it. Problems, in the order checked:
+
+    - ``unreadable``: the file can't be opened
+    - ``xbrl_viewer``: the "XBRL Viewer" shell page instead of the document
+    - ``sec_error``: an EDGAR throttling/refusal page
+    - ``wrong_document``: an exhibit or XBRL R-file rather than the 10-K
+    - ``too_small``: under ``MIN_FILING_BYTES``
+    - ``truncated``: HTML that stops before ``</html>``, or a full submission
+      before ``</SEC-DOCUMENT>``
+    - ``no_items``: neither inline XBRL facts nor the 10-K Item headings
+    """
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return 'too_small'
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return _check_buffer(mapped)
+    except (OSError, ValueError):
+        return 'unreadable'
+
+
+def _check_buffer(data) -> Optional[str]:
+    size = len(data)
+    head_end = min(size, SNIFF_HEAD_BYTES)
+    tail_start = max(0, size - SNIFF_TAIL_BYTES)
+
+    title = TITLE_RE.search(data, 0, 8192)
+    if title and b'XBRL Viewer' in title.group(1):
+        return 'xbrl_viewer'
+    if any(data.find(marker, 0, 8192) != -1 for marker in SEC_ERROR_MARKERS):
+        return 'sec_error'
+    document_type = TYPE_RE.search(data, 0, 1024)
+    if document_type and not document_type.group(1).strip().upper().startswith(b'10-K'):
+        return 'wrong_document'
+    if size < MIN_FILING_BYTES:
+        return 'too_small'
+    if SUBMISSION_START_RE.match(data):
+        if not SUBMISSION_END_RE.search(data, tail_start):
+            return 'truncated'
+    elif HTML_START_RE.search(data, 0, 8192) and not HTML_END_RE.search(data, tail_start):
+        return 'truncated'
+    if IX_FACT_RE.search(data, 0, head_end):
+        return None
+    items = {match.group(1).upper() for match in ITEM_HEADING_RE.finditer(data, 0, head_end)}
+    if len(items) < MIN_ITEM_HEADINGS:
+        return 'no_items'
+    return None
+
+
+def quarantine_filing(path: str, problem: str, base_dir: str = "downloads",
+                      quarantine_dir: str = os.getenv('FILING_QUARANTINE_DIR', 'quarantine')) -> str:
+    """Move a bad filing out of the downloads tree, keeping its relative path.
+
+    Derived files (cleaned text, section index) are deleted, the download
+    sidecar moves with it, and ``<file>.quarantine.json`` records why.
+    Returns the new path.
+    """
+    relative = os.path.relpath(path, base_dir)
+    if relative.startswith(os.pardir):
+        relative = os.path.basename(path)
+    target = os.path.join(quarantine_dir, relative)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(path, target)
+    if os.path.exists(f"{path}.manifest.json"):
+        shutil.move(f"{path}.manifest.json", f"{target}.manifest.json")
+    for suffix in ('.sections.json', '.cleaned.txt'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    with open(f"{target}.quarantine.json", 'w', encoding='utf-8') as f:
+        json.dump({'problem': problem, 'original_path': path, 'quarantined_at': time.time()}, f, indent=2)
+    logger.warning(f"Quarantined {path} ({problem}) to {target}")
+    return target
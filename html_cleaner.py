@@ -0,0 +1,109 @@
+import re
+import logging
+from typing import Iterable, Optional
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; fall back to BeautifulSoup
+    etree = None
+
+logger = logging.getLogger(__name__)
+
+# Elements whose text never belongs in the cleaned filing. ix:header holds the
+# hidden inline-XBRL facts and contexts at the top of every iXBRL 10-K.
+SKIP_TAGS = frozenset(['script', 'style', 'ix:header'])
+
+CHUNK_SIZE = 256 * 1024
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse every whitespace run to a single space."""
+    return ' '.join(text.split())
+
+
+class _TextCollector:
+    """lxml parser target that keeps text outside SKIP_TAGS without building a tree."""
+
+    def __init__(self):
+        self.parts = []
+        self.skip_depth = 0
+
+    def start(self, tag, attrib):
+        if self.skip_depth or tag in SKIP_TAGS:
+            self.skip_depth += 1
+
+    def end(self, tag):
+        if self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self) -> str:
+        return normalize_whitespace(''.join(self.parts))
+
+
+def clean_html_lxml(chunks: Iterable, encoding: Optional[str] = None) -> str:
+    """Stream HTML chunks (str or bytes) through lxml's parser and return cleaned text.
+
+    Give ``encoding`` for bytes chunks: without a ``<meta charset>`` lxml
+    would otherwise decode them as latin-1.
+    """
+    parser = etree.HTMLParser(target=_TextCollector(), recover=True, encoding=encoding)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def clean_html_soup(html_content: str) -> str:
+    """Reference BeautifulSoup implementation; slower but has no lxml dependency."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for element in soup(list(SKIP_TAGS)):
+        element.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def clean_html(html_content: str, fast: Optional[bool] = None) -> str:
+    """Clean HTML to plain text, using the lxml fast path when available.
+
+    ``fast`` forces one implementation; by default lxml is used if installed.
+    """
+    if fast is None:
+        fast = etree is not None
+    if fast:
+        if etree is None:
+            raise ImportError("lxml is required for the fast HTML cleaner")
+        chunks = (html_content[i:i + CHUNK_SIZE] for i in range(0, len(html_content), CHUNK_SIZE))
+        return clean_html_lxml(chunks)
+    return clean_html_soup(html_content)
+
+
+def clean_html_buffer(buffer, fast: Optional[bool] = None) -> str:
+    """Clean UTF-8 HTML bytes or an mmap of them. The fast path feeds lxml
+    ``CHUNK_SIZE`` slices, so the document is never decoded whole."""
+    if fast is None:
+        fast = etree is not None
+    if fast:
+        return clean_html_lxml((buffer[i:i + CHUNK_SIZE] for i in range(0, len(buffer), CHUNK_SIZE)),
+                               encoding='utf-8')
+    return clean_html_soup(str(buffer, 'utf-8', errors='replace'))
+
+
+def clean_html_file(path: str, fast: Optional[bool] = None) -> str:
+    """Clean an HTML file, streaming it from disk in fixed-size chunks on the fast path."""
+    if fast is None:
+        fast = etree is not None
+    if fast:
+        with open(path, 'rb') as f:
+            return clean_html_lxml(iter(lambda: f.read(CHUNK_SIZE), b''), encoding='utf-8')
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return clean_html_soup(f.read())
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import traceback
+import logging
+from typing import Callable, Dict, Optional
+
+# Job lifecycle: queued -> running -> done | failed
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class JobQueue:
+    """SQLite-brokered job queue with a pool of background worker threads.
+
+    ``handler(payload, progress)`` does the work; ``progress(stage, **details)``
+    records per-job progress that pollers can read while the job runs. Because
+    jobs are claimed from the database, several processes (e.g. gunicorn
+    workers) can share one queue file and each runs its own workers.
+    """
+
+    def __init__(self, handler: Callable[[Dict, Callable], Dict],
+                 db_path: str = os.path.join("filings", "jobs.db"),
+                 workers: int = 2, poll_interval: float = 1.0,
+                 retention: int = 7 * 24 * 60 * 60, stale_after: int = 60 * 60):
+        self.handler = handler
+        self.db_path = db_path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.stale_after = stale_after  # running jobs older than this are presumed orphaned
+        self.logger = logging.getLogger(__name__)
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.threads = []
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    progress TEXT NOT NULL DEFAULT '{}',
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)')
+        finally:
+            conn.close()
+
+    def start(self):
+        """Requeue jobs orphaned by a crashed process, purge old ones, and start the workers."""
+        conn = self._connect()
+        try:
+            # Other live processes may share this file, so only requeue long-stuck jobs
+            conn.execute(
+                'UPDATE jobs SET status = ? WHERE status = ? AND started_at < ?',
+                (QUEUED, RUNNING, time.time() - self.stale_after)
+            )
+            conn.execute(
+                'DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?',
+                (DONE, FAILED, time.time() - self.retention)
+            )
+        finally:
+            conn.close()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.logger.info(f"Started {self.workers} job workers")
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+
+    def submit(self, payload: Dict) -> str:
+        """Queue a job and return its id immediately."""
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute(
+                'INSERT INTO jobs (id, status, payload, created_at) VALUES (?, ?, ?, ?)',
+                (job_id, QUEUED, json.dumps(payload), time.time())
+            )
+        finally:
+            conn.close()
+        self.wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT id, status, payload, progress, result, error, created_at, started_at, finished_at '
+                'FROM jobs WHERE id = ?',
+                (job_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        return {
+            'id': row[0],
+            'status': row[1],
+            'payload': json.loads(row[2]),
+            'progress': json.loads(row[3]),
+            'result': json.loads(row[4]) if row[4] else None,
+            'error': row[5],
+            'created_at': row[6],
+            'started_at': row[7],
+            'finished_at': row[8]
+        }
+
+    def _claim(self) -> Optional[tuple]:
+        """Atomically move the oldest queued job to running."""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT id, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1', (QUEUED,)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, started_at = ? WHERE id = ?',
+                    (RUNNING, time.time(), row[0])
+                )
+            conn.execute('COMMIT')
+            return row
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, **fields):
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        conn = self._connect()
+        try:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+        finally:
+            conn.close()
+
+    def _worker(self):
+        while not self.stopping.is_set():
+            try:
+                claimed = self._claim()
+            except Exception as e:
+                self.logger.error(f"Error claiming job: {str(e)}")
+                claimed = None
+            if not claimed:
+                self.wakeup.wait(self.poll_interval)
+                self.wakeup.clear()
+                continue
+            self._run(claimed[0], json.loads(claimed[1]))
+
+    def _run(self, job_id: str, payload: Dict):
+        progress_state = {}
+
+        def progress(stage: str, **details):
+            progress_state['stage'] = stage
+            progress_state.update(details)
+            self._update(job_id, progress=json.dumps(progress_state))
+
+        self.logger.info(f"Running job {job_id}: {payload}")
+        try:
+            result = self.handler(payload, progress)
+            if isinstance(result, dict) and 'error' in result:
+                self._update(job_id, status=FAILED, error=result['error'], finished_at=time.time())
+            else:
+                self._update(job_id, status=DONE, result=json.dumps(result), finished_at=time.time())
+        except Exception as e:
+            self.logger.error(f"Job {job_id} failed: {str(e)}")
+            self.logger.error(traceback.format_exc())
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time())
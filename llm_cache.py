@@ -0,0 +1,95 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from artifact_cache import ShardedFileCache
+
+SUMMARY_FILE_RE = re.compile(r'^(?P<ticker>[A-Z0-9.\-]+)_(?P<year>\d{4})_summary\.md$')
+
+
+class LLMResponseCache:
+    """Persistent cache of LLM responses keyed by a hash of the full request.
+
+    The key covers the model, every message (system and user prompt) and the
+    sampling parameters, so any change to the prompt is a miss. Final summaries
+    are also stored under a content alias (model, prompt version, cleaned
+    filing and metrics) so a repeat run skips the map stage. Summaries written
+    by earlier runs have no prompt or metrics on record; they are imported
+    under a separate alias of model and cleaned filing only.
+    Entries live in a ``ShardedFileCache`` with LRU eviction past ``max_bytes``.
+
+    With ``deterministic`` set, callers should request ``temperature=0`` so a
+    cached answer is the one a fresh call would give.
+    """
+
+    def __init__(self, cache_dir: str = os.getenv('LLM_CACHE_DIR', os.path.join('cache', 'llm')),
+                 max_bytes: int = int(os.getenv('LLM_CACHE_MAX_BYTES', 256 * 1024 ** 2)),
+                 deterministic: bool = os.getenv('LLM_DETERMINISTIC', '').lower() in ('1', 'true', 'yes')):
+        self.storage = ShardedFileCache(cache_dir, max_bytes)
+        self.deterministic = deterministic
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def key_for(model: str, messages: List[Dict], params: Dict) -> str:
+        request = json.dumps({'model': model, 'messages': messages, 'params': params}, sort_keys=True)
+        return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def content_key(model: str, content: str, metrics: Dict, prompt_version: str) -> str:
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        metrics_digest = hashlib.sha256(json.dumps(metrics, sort_keys=True).encode('utf-8')).hexdigest()
+        return hashlib.sha256(f"summary:{prompt_version}:{model}:{digest}:{metrics_digest}".encode()).hexdigest()
+
+    @staticmethod
+    def imported_key(model: str, content: str) -> str:
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return hashlib.sha256(f"imported:{model}:{digest}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text for a key, or None on a miss."""
+        return self.storage.get(key, ('.json',), lambda data: json.loads(data)['response'])
+
+    def put(self, key: str, response: str, model: Optional[str] = None) -> None:
+        data = json.dumps({'response': response, 'model': model, 'created_at': time.time()}).encode('utf-8')
+        self.storage.put(key, {'.json': data})
+
+    def warm_from_analysis_dir(self, model: str, analysis_dir: str = 'analysis') -> Tuple[int, int]:
+        """Import ``{ticker}_{year}_summary.md`` files under the import alias of their
+        ``{ticker}_{year}_analysis.txt``. Returns (imported, skipped)."""
+        imported = skipped = 0
+        if not os.path.isdir(analysis_dir):
+            return imported, skipped
+        for entry in os.scandir(analysis_dir):
+            match = SUMMARY_FILE_RE.match(entry.name)
+            if not match:
+                continue
+            analysis_path = os.path.join(analysis_dir, f"{match['ticker']}_{match['year']}_analysis.txt")
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    summary = f.read()
+                with open(analysis_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except OSError:
+                skipped += 1
+                continue
+            # Failed runs saved their error message as the summary
+            if not summary.strip() or summary.startswith('Error'):
+                skipped += 1
+                continue
+            key = self.imported_key(model, content)
+            if not os.path.exists(self.storage.path(key, '.json')):
+                self.put(key, summary, model)
+                imported += 1
+        self.logger.info(f"Imported {imported} summaries from {analysis_dir} ({skipped} skipped)")
+        return imported, skipped
+
+    def stats(self) -> Dict:
+        return {**self.storage.stats(), 'deterministic': self.deterministic}
+
+
+# Shared instance used for every summary request
+llm_response_cache = LLMResponseCache()
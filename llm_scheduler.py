@@ -0,0 +1,331 @@
+import os
+import json
+import time
+import random
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import SECRateLimiter
+
+# Rough prompt size estimate; English text averages about four characters per token
+CHARS_PER_TOKEN = 4
+LATENCY_SAMPLES = 500
+# Budgets used until OpenAI reports the account's own limits
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 10000
+# Waits on the tokens-per-minute budget at least this long are logged at INFO
+TPM_WAIT_LOG_SECONDS = 1.0
+
+
+class LLMRequestError(Exception):
+    """A chat completion failed for good (non-retryable status or retries exhausted)."""
+
+
+class _Transient(Exception):
+    """A failure worth retrying (server error or rate limit)."""
+
+
+class _RateLimited(_Transient):
+    def __init__(self, retry_after: Optional[float]):
+        super().__init__(f"rate limited, retry after {retry_after}")
+        self.retry_after = retry_after
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Seconds to wait from Retry-After (or OpenAI's retry-after-ms) headers, if given."""
+    millis = response.headers.get('retry-after-ms')
+    if millis:
+        try:
+            return float(millis) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get('Retry-After')
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return None
+
+
+class LLMScheduler:
+    """Concurrent, budgeted client for OpenAI chat completions.
+
+    At most ``max_concurrency`` requests are in flight. Each request is also
+    charged against a requests-per-minute and a tokens-per-minute budget (the
+    estimated prompt tokens plus ``max_tokens``, which is what OpenAI counts),
+    both token buckets refilling continuously up to one minute's worth. A 429
+    pauses every caller until its Retry-After has passed and the request is
+    retried with exponential backoff; 5xx responses and connection errors are
+    retried the same way.
+
+    A per-minute limit that is neither passed in nor set with
+    ``OPENAI_REQUESTS_PER_MINUTE``/``OPENAI_TOKENS_PER_MINUTE`` starts at the
+    default. It then follows the ``x-ratelimit-limit-requests``/``-tokens``
+    headers OpenAI sends with every response, so the budget matches the
+    account's real limits.
+    """
+
+    def __init__(self, api_key: Optional[str] = None,
+                 api_base: str = os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1'),
+                 max_concurrency: int = int(os.getenv('LLM_MAX_CONCURRENCY', 4)),
+                 requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None,
+                 max_retries: int = 5, backoff_base: float = 1.0, backoff_max: float = 60.0,
+                 timeout: float = 120.0):
+        self.api_key = api_key
+        self.api_base = api_base.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+
+        # Limits taken from response headers because nothing configured them
+        self.header_limits = set()
+        if requests_per_minute is None:
+            requests_per_minute = int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', 0))
+        if not requests_per_minute:
+            requests_per_minute = DEFAULT_REQUESTS_PER_MINUTE
+            self.header_limits.add('requests')
+        if tokens_per_minute is None:
+            tokens_per_minute = int(os.getenv('OPENAI_TOKENS_PER_MINUTE', 0))
+        if not tokens_per_minute:
+            tokens_per_minute = DEFAULT_TOKENS_PER_MINUTE
+            self.header_limits.add('tokens')
+        self._set_budgets(requests_per_minute, tokens_per_minute)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.lock = threading.Lock()
+        self.blocked_until = 0.0
+        self._executor = None
+        self.pending = 0  # submitted to the pool but not started
+
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=max_concurrency))
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=max_concurrency))
+
+        self.queued = 0
+        self.active = 0
+        self.counters = {'completed': 0, 'failed': 0, 'retries': 0, 'rate_limited': 0, 'tpm_waits': 0}
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.waits = deque(maxlen=LATENCY_SAMPLES)
+
+    def _set_budgets(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_budget = SECRateLimiter(requests_per_minute / 60, burst=requests_per_minute)
+        self.token_budget = SECRateLimiter(tokens_per_minute / 60, burst=tokens_per_minute)
+
+    def _follow_limits(self, headers):
+        """Adopt the per-minute limits OpenAI reports for limits that weren't configured."""
+        limits = {}
+        for name in self.header_limits:
+            try:
+                limits[name] = int(headers[f'x-ratelimit-limit-{name}'])
+            except (KeyError, ValueError):
+                continue
+        with self.lock:
+            requests_per_minute = limits.get('requests', self.requests_per_minute)
+            tokens_per_minute = limits.get('tokens', self.tokens_per_minute)
+            if (requests_per_minute, tokens_per_minute) == (self.requests_per_minute, self.tokens_per_minute):
+                return
+            self._set_budgets(requests_per_minute, tokens_per_minute)
+        self.logger.info(f"Using the OpenAI account's limits of {requests_per_minute} requests "
+                         f"and {tokens_per_minute} tokens per minute")
+
+    @staticmethod
+    def estimate_tokens(messages: List[Dict], max_tokens: int) -> int:
+        prompt_chars = sum(len(message.get('content') or '') for message in messages)
+        return prompt_chars // CHARS_PER_TOKEN + max_tokens
+
+    @contextmanager
+    def slot(self, estimated_tokens: int):
+        """Hold one concurrency slot, entered once both rate budgets allow it."""
+        queued_at = time.time()
+        with self.lock:
+            self.queued += 1
+        self.slots.acquire()
+        try:
+            # Another request may have been rate limited while this one waited
+            while True:
+                with self.lock:
+                    pause = self.blocked_until - time.time()
+                if pause <= 0:
+                    break
+                time.sleep(pause)
+            request_delay = self.request_budget.reserve()
+            token_delay = self.token_budget.reserve(estimated_tokens)
+            if token_delay > 0 and token_delay >= request_delay:
+                with self.lock:
+                    self.counters['tpm_waits'] += 1
+                log = self.logger.info if token_delay >= TPM_WAIT_LOG_SECONDS else self.logger.debug
+                log(f"LLM request of ~{estimated_tokens} tokens queued {token_delay:.1f} seconds on the "
+                    f"{self.tokens_per_minute} tokens-per-minute budget")
+            elif request_delay > 0:
+                self.logger.debug(f"LLM request budget reached, waiting {request_delay:.2f} seconds")
+            delay = max(request_delay, token_delay)
+            if delay > 0:
+                time.sleep(delay)
+        except BaseException:
+            self.slots.release()
+            with self.lock:
+                self.queued -= 1
+            raise
+        with self.lock:
+            self.queued -= 1
+            self.active += 1
+            self.waits.append(time.time() - queued_at)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active -= 1
+            self.slots.release()
+
+    def _post(self, payload: Dict, stream: bool = False) -> requests.Response:
+        response = self.session.post(
+            f"{self.api_base}/chat/completions",
+            headers={'Authorization': f"Bearer {self.api_key or os.getenv('OPENAI_API_KEY', '')}"},
+            json=payload,
+            stream=stream,
+            timeout=self.timeout
+        )
+        if self.header_limits:
+            self._follow_limits(response.headers)
+        if response.status_code == 429:
+            retry_after = _retry_after(response)
+            response.close()
+            raise _RateLimited(retry_after)
+        if response.status_code >= 500:
+            response.close()
+            raise _Transient(f"server error {response.status_code}")
+        if response.status_code >= 400:
+            message = response.text[:500]
+            response.close()
+            raise LLMRequestError(f"chat completion failed with {response.status_code}: {message}")
+        return response
+
+    def _backoff(self, attempt: int, error: Exception):
+        """Wait before retrying; a 429 also pauses every other caller."""
+        if attempt >= self.max_retries:
+            with self.lock:
+                self.counters['failed'] += 1
+            raise LLMRequestError(f"giving up after {attempt + 1} attempts: {str(error)}")
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * (0.5 + random.random() / 2)
+        with self.lock:
+            self.counters['retries'] += 1
+            if isinstance(error, _RateLimited):
+                self.counters['rate_limited'] += 1
+                if error.retry_after is not None:
+                    delay = max(delay, error.retry_after)
+                self.blocked_until = max(self.blocked_until, time.time() + delay)
+        self.logger.warning(f"LLM request failed ({str(error)}), retrying in {delay:.2f} seconds")
+        time.sleep(delay)
+
+    def complete(self, messages: List[Dict], model: str = 'gpt-4', max_tokens: int = 2000,
+                 temperature: float = 0.7) -> str:
+        """Return the completion text, retrying rate limits and transient failures."""
+        payload = {'model': model, 'messages': messages, 'max_tokens': max_tokens, 'temperature': temperature}
+        estimated = self.estimate_tokens(messages, max_tokens)
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.slot(estimated):
+                    started = time.time()
+                    response = self._post(payload)
+                    content = response.json()['choices'][0]['message']['content']
+                with self.lock:
+                    self.counters['completed'] += 1
+                    self.latencies.append(time.time() - started)
+                return content
+            except (_Transient, requests.ConnectionError, requests.Timeout) as e:
+                self._backoff(attempt, e)
+            except LLMRequestError:
+                with self.lock:
+                    self.counters['failed'] += 1
+                raise
+
+    def stream(self, messages: List[Dict], model: str = 'gpt-4', max_tokens: int = 2000,
+               temperature: float = 0.7) -> Iterator[str]:
+        """Yield completion tokens as they arrive, holding one slot for the whole stream.
+
+        Retries only happen before the first token, so callers never see repeats.
+        """
+        payload = {'model': model, 'messages': messages, 'max_tokens': max_tokens,
+                   'temperature': temperature, 'stream': True}
+        estimated = self.estimate_tokens(messages, max_tokens)
+        yielded = False
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.slot(estimated):
+                    started = time.time()
+                    response = self._post(payload, stream=True)
+                    with response:
+                        for line in response.iter_lines():
+                            if not line.startswith(b'data:'):
+                                continue
+                            data = line[5:].strip()
+                            if data == b'[DONE]':
+                                break
+                            token = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                            if token:
+                                yielded = True
+                                yield token
+                with self.lock:
+                    self.counters['completed'] += 1
+                    self.latencies.append(time.time() - started)
+                return
+            except (_Transient, requests.ConnectionError, requests.Timeout) as e:
+                if yielded:
+                    with self.lock:
+                        self.counters['failed'] += 1
+                    raise LLMRequestError(f"stream interrupted: {str(e)}")
+                self._backoff(attempt, e)
+            except LLMRequestError:
+                with self.lock:
+                    self.counters['failed'] += 1
+                raise
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Run ``fn`` on the scheduler's pool; LLM calls it makes are budgeted as usual."""
+        def run():
+            with self.lock:
+                self.pending -= 1
+            return fn(*args, **kwargs)
+
+        with self.lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                    thread_name_prefix='llm')
+            self.pending += 1
+        return self._executor.submit(run)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            latencies = sorted(self.latencies)
+            waits = list(self.waits)
+            stats = {
+                **self.counters,
+                'queue_depth': self.pending + self.queued,
+                'active': self.active,
+                'max_concurrency': self.max_concurrency,
+                'requests_per_minute': self.requests_per_minute,
+                'tokens_per_minute': self.tokens_per_minute,
+                'paused_for': max(0.0, self.blocked_until - time.time())
+            }
+        stats['latency_avg'] = sum(latencies) / len(latencies) if latencies else None
+        stats['latency_p50'] = latencies[len(latencies) // 2] if latencies else None
+        stats['latency_p95'] = latencies[int(len(latencies) * 0.95)] if latencies else None
+        stats['wait_avg'] = sum(waits) / len(waits) if waits else None
+        return stats
+
+
+# Shared instance so every summarization path draws on the same OpenAI budget
+llm_scheduler = LLMScheduler()
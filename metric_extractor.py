@@ -0,0 +1,228 @@
+import re
+import mmap
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Labels per metric, grouped by priority (first group wins). These mirror the
+# label alternatives of the original per-metric regexes.
+METRIC_LABELS = {
+    'revenue': [
+        ['revenue', 'sales', 'net sales'],
+        ['total revenue', 'total sales'],
+        ['consolidated revenue', 'consolidated sales'],
+    ],
+    'gross_profit': [['gross profit'], ['gross income'], ['gross earnings']],
+    'operating_income': [
+        ['operating income', 'operating profit', 'EBIT'],
+        ['income from operations'],
+        ['operating earnings'],
+    ],
+    'net_income': [
+        ['net income', 'net earnings', 'net profit'],
+        ['net loss'],
+        ['consolidated net income'],
+    ],
+    'eps': [
+        ['earnings per share', 'EPS'],
+        ['basic earnings per share'],
+        ['diluted earnings per share'],
+    ],
+    'free_cash_flow': [
+        ['free cash flow', 'FCF'],
+        ['operating cash flow'],
+        ['net cash provided by operating activities'],
+    ],
+    'total_assets': [
+        ['total assets'],
+        ['consolidated total assets'],
+        ['total assets at end of period'],
+    ],
+    'total_equity': [
+        ['total equity', 'shareholders equity', 'stockholders equity'],
+        ['total stockholders equity'],
+        ['total shareholders equity'],
+    ],
+}
+
+NUMBER_RE = re.compile(r'\$?\d+(?:,\d{3})*(?:\.\d+)?')
+NUMBER_BYTES_RE = re.compile(NUMBER_RE.pattern.encode())
+# "$394.3 billion" states its unit after the number ...
+UNIT_SUFFIX_RE = re.compile(r'\s*(thousand|million|billion)s?\b', re.IGNORECASE)
+UNIT_SUFFIX_BYTES_RE = re.compile(UNIT_SUFFIX_RE.pattern.encode(), re.IGNORECASE)
+# ... statement tables state it once in their header: "(In millions, except per share amounts)"
+SCALE_HEADER_RE = re.compile(r'\(\s*(?:(?:dollars|amounts|\$)\s+)?in\s+(thousands|millions|billions)\b', re.IGNORECASE)
+SCALE_HEADER_BYTES_RE = re.compile(SCALE_HEADER_RE.pattern.encode(), re.IGNORECASE)
+# How far before a label a table header is looked for
+SCALE_LOOKBACK = 20000
+SCALES = {'thousand': 1e3, 'million': 1e6, 'billion': 1e9}
+# Reported per share, never scaled
+PER_SHARE_METRICS = ('eps',)
+_APOSTROPHES = re.compile(r"['’]")
+
+
+def _label_pattern(label: str, apostrophe: str = r"['’]") -> str:
+    # "shareholders equity" should also match "shareholders' equity"
+    words = [re.escape(word) for word in label.split()]
+    return (apostrophe + r"?\s+").join(words)
+
+
+def _normalize_label(text: str) -> str:
+    return ' '.join(_APOSTROPHES.sub('', text).lower().split())
+
+
+def parse_currency(value_str: str) -> float:
+    """Parse a matched number such as "$1,234.5" to float."""
+    return float(value_str.replace('$', '').replace(',', ''))
+
+
+def add_derived_metrics(metrics: Dict) -> Dict:
+    """Fill gross margin, ROE and ROA from the base metrics when possible."""
+    if metrics.get('gross_profit') and metrics.get('revenue'):
+        metrics['gross_margin'] = metrics['gross_profit'] / metrics['revenue']
+    if metrics.get('net_income'):
+        if metrics.get('total_equity'):
+            metrics['roe'] = metrics['net_income'] / metrics['total_equity']
+        if metrics.get('total_assets'):
+            metrics['roa'] = metrics['net_income'] / metrics['total_assets']
+    return metrics
+
+
+class MetricExtractor:
+    """Single-pass extractor for the prose financial metrics of a cleaned 10-K.
+
+    Every label of every metric is compiled into one alternation, so the
+    document is scanned once. For each label hit the nearest number within
+    ``window`` characters is taken. Per metric, the hit from the highest
+    priority label group wins, earliest in the document on ties.
+
+    Amounts are converted to whole dollars, like the scaled inline-XBRL facts
+    of ``xbrl_facts``, so metrics from either source compare across years:
+    a unit word after the number ("$1,234 million") wins, else the nearest
+    "in millions"-style table header before the label in the same span,
+    else the number is taken as dollars. EPS is left per share.
+
+    ``extract`` also takes UTF-8 bytes or an mmap of a cleaned text file,
+    scanned with bytes patterns so that only the matched labels and numbers
+    are decoded. Positions and ``window`` are then in bytes.
+    """
+
+    def __init__(self, window: int = 300):
+        self.window = window
+
+        # Map each label to the (metric, priority) pairs it satisfies. A longer
+        # label like "total revenue" also counts as its contained "revenue".
+        all_labels = sorted(
+            {label for groups in METRIC_LABELS.values() for group in groups for label in group},
+            key=len,
+            reverse=True
+        )
+        self.label_targets: Dict[str, List[Tuple[str, int]]] = {}
+        for label in all_labels:
+            key = _normalize_label(label)
+            padded = f' {key} '
+            targets = []
+            for metric, groups in METRIC_LABELS.items():
+                priorities = [
+                    priority for priority, group in enumerate(groups)
+                    for candidate in group if f' {_normalize_label(candidate)} ' in padded
+                ]
+                if priorities:
+                    targets.append((metric, min(priorities)))
+            self.label_targets[key] = targets
+
+        # Longest labels first so leftmost-first alternation prefers them. Labels
+        # must not sit inside a word, but may touch digits: cleaned tables run
+        # cells together ("Gross profit10,460"). A plural ("Total revenues")
+        # counts as its label.
+        self.label_re = re.compile(
+            r'(?<![a-z])(?:' + '|'.join(_label_pattern(label) for label in all_labels) + r')s?(?![a-z])',
+            re.IGNORECASE
+        )
+        # The same alternation over UTF-8 bytes; ’ is three bytes there
+        self.label_bytes_re = re.compile(
+            (r'(?<![a-z])(?:' + '|'.join(_label_pattern(label, "(?:'|\xe2\x80\x99)") for label in all_labels)
+             + r')s?(?![a-z])').encode('latin-1'),
+            re.IGNORECASE
+        )
+
+    @staticmethod
+    def _complete(best: Dict) -> bool:
+        """Every metric found from its top-priority labels; nothing later can improve on it."""
+        return len(best) == len(METRIC_LABELS) and all(b[0] == 0 for b in best.values())
+
+    def extract(self, content, spans: Optional[Sequence[Tuple[int, int]]] = None) -> Tuple[Dict, Dict]:
+        """Return (metrics, positions) where positions records where each value came from.
+
+        ``spans`` limits the scan to (start, end) ranges of ``content``, e.g. the
+        Items located by ``section_splitter``, without copying them out.
+        """
+        if isinstance(content, str):
+            label_re, number_re = self.label_re, NUMBER_RE
+        else:
+            label_re, number_re = self.label_bytes_re, NUMBER_BYTES_RE
+        best: Dict[str, Tuple[int, int, int, str, str, float]] = {}
+        for start, end in spans or [(0, len(content))]:
+            for match in label_re.finditer(content, start, end):
+                label_text = match.group(0)
+                if not isinstance(label_text, str):
+                    label_text = label_text.decode('utf-8', errors='replace')
+                label = _normalize_label(label_text)
+                targets = self.label_targets.get(label)
+                if targets is None:
+                    targets = self.label_targets.get(label[:-1], ())  # plural
+                for metric, priority in targets:
+                    if metric in best and best[metric][0] <= priority:
+                        continue
+                    number = number_re.search(content, match.end(), min(end, match.end() + self.window))
+                    if not number:
+                        continue
+                    value = number.group(0)
+                    if not isinstance(value, str):
+                        value = value.decode('ascii')
+                    scale = 1.0 if metric in PER_SHARE_METRICS else self._scale(content, match.start(), number.end(),
+                                                                                 start, end)
+                    best[metric] = (priority, match.start(), number.start(), label_text, value, scale)
+                if self._complete(best):
+                    break
+            if self._complete(best):
+                break
+
+        metrics = {}
+        positions = {}
+        for metric in METRIC_LABELS:
+            if metric not in best:
+                continue
+            _, label_pos, value_pos, label, value, scale = best[metric]
+            amount = parse_currency(value) * scale
+            if metric == 'net_income' and 'loss' in label.lower():
+                amount = -amount
+            metrics[metric] = amount
+            positions[metric] = {'label': label, 'label_pos': label_pos, 'value_pos': value_pos, 'scale': scale}
+        add_derived_metrics(metrics)
+        return metrics, positions
+
+    @staticmethod
+    def _scale(content, label_pos: int, value_end: int, span_start: int, span_end: int) -> float:
+        """Dollars per unit of the number ending at ``value_end``."""
+        text = isinstance(content, str)
+        suffix_re = UNIT_SUFFIX_RE if text else UNIT_SUFFIX_BYTES_RE
+        suffix = suffix_re.match(content, value_end, min(span_end, value_end + 16))
+        if not suffix:
+            header = None
+            for header in (SCALE_HEADER_RE if text else SCALE_HEADER_BYTES_RE).finditer(
+                    content, max(span_start, label_pos - SCALE_LOOKBACK), label_pos):
+                pass
+            suffix = header
+        if not suffix:
+            return 1.0
+        unit = suffix.group(1) if text else suffix.group(1).decode('ascii')
+        return SCALES[unit.lower().rstrip('s')]
+
+    def extract_file(self, path: str, spans: Optional[Sequence[Tuple[int, int]]] = None) -> Tuple[Dict, Dict]:
+        """Extract metrics from an mmap of a UTF-8 cleaned text file (e.g.
+        ``section_index.cleaned_path``), with ``spans`` as byte ranges."""
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return self.extract(mapped, spans)
+
+
+metric_extractor = MetricExtractor()
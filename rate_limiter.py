@@ -1,43 +1,114 @@
+import os
 import time
+import struct
+import asyncio
 import threading
-from collections import deque
-from typing import Optional
+from typing import Callable, Optional
 import logging
 
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process sharing is unavailable
+    fcntl = None
+
+_STATE = struct.Struct('d')
+
+
 class SECRateLimiter:
-    def __init__(self, requests_per_second: int = 10):
+    """Token-bucket rate limiter (GCRA form) for SEC EDGAR requests.
+
+    Each caller reserves a send time under the lock and then sleeps *outside*
+    it, so waiting threads never block each other. ``burst`` tokens may be
+    spent back to back before the steady ``requests_per_second`` rate applies.
+
+    When ``shared_state_path`` is set, the bucket state (a single timestamp) is
+    kept in that file and updated under an exclusive ``flock``, so every process
+    using the same path (e.g. several gunicorn workers) shares one budget.
+
+    ``clock`` and ``sleep`` default to ``time.time`` and ``time.sleep``; tests
+    inject their own to drive the limiter deterministically.
+    """
+
+    def __init__(self, requests_per_second: float = 10, burst: int = 1,
+                 shared_state_path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], None] = time.sleep):
         self.requests_per_second = requests_per_second
-        self.tokens = deque(maxlen=requests_per_second)
+        self.burst = max(1, burst)
+        self.interval = 1.0 / requests_per_second
+        self.tolerance = (self.burst - 1) * self.interval
         self.lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
+        self.clock = clock
+        self.sleep = sleep
 
-    def wait_for_token(self) -> None:
-        """
-        Wait until a token is available, ensuring we don't exceed the rate limit.
-        Uses a sliding window approach to track requests.
+        # Theoretical arrival time of the next request when not shared
+        self.next_time = 0.0
+
+        self.shared_state_path = shared_state_path
+        if shared_state_path and fcntl is None:
+            self.logger.warning("fcntl unavailable, rate limit will not be shared across processes")
+            self.shared_state_path = None
+        self._fd = None
+        self._fd_pid = None
+
+    def _state_fd(self) -> int:
+        # flock is tied to the open file description, so each process needs its own
+        if self._fd is None or self._fd_pid != os.getpid():
+            directory = os.path.dirname(self.shared_state_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._fd = os.open(self.shared_state_path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._fd_pid = os.getpid()
+        return self._fd
+
+    def _advance(self, next_time: float, now: float, tokens: int) -> tuple:
+        """Return (delay, new next_time) for spending ``tokens`` at ``now``.
+
+        The caller waits until the last of its tokens conforms, so a weighted
+        reservation (e.g. an LLM request's token count) never overdraws the bucket.
         """
+        start = max(next_time, now)
+        delay = max(0.0, start + (tokens - 1) * self.interval - self.tolerance - now)
+        return delay, start + tokens * self.interval
+
+    def reserve(self, tokens: int = 1) -> float:
+        """Reserve ``tokens`` and return how long the caller must wait before sending."""
         with self.lock:
-            current_time = time.time()
-            
-            # Remove tokens older than 1 second
-            while self.tokens and current_time - self.tokens[0] >= 1.0:
-                self.tokens.popleft()
-            
-            # If we have 10 tokens in the last second, we need to wait
-            if len(self.tokens) >= self.requests_per_second:
-                # Calculate how long to wait
-                wait_time = 1.0 - (current_time - self.tokens[0])
-                if wait_time > 0:
-                    self.logger.debug(f"Rate limit reached, waiting {wait_time:.3f} seconds")
-                    time.sleep(wait_time)
-                    # Update current time after sleep
-                    current_time = time.time()
-                    # Clean up old tokens again after waiting
-                    while self.tokens and current_time - self.tokens[0] >= 1.0:
-                        self.tokens.popleft()
-            
-            # Add current request timestamp
-            self.tokens.append(current_time)
-
-# Create a global instance
-sec_rate_limiter = SECRateLimiter() 
\ No newline at end of file
+            now = self.clock()
+            if not self.shared_state_path:
+                delay, self.next_time = self._advance(self.next_time, now, tokens)
+                return delay
+
+            fd = self._state_fd()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                raw = os.pread(fd, _STATE.size, 0)
+                next_time = _STATE.unpack(raw)[0] if len(raw) == _STATE.size else 0.0
+                delay, next_time = self._advance(next_time, now, tokens)
+                os.pwrite(fd, _STATE.pack(next_time), 0)
+                return delay
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def wait_for_token(self) -> None:
+        """Block until a token is available, sleeping without holding the lock."""
+        delay = self.reserve()
+        if delay > 0:
+            self.logger.debug(f"Rate limit reached, waiting {delay:.3f} seconds")
+            self.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        """Async variant of wait_for_token that yields to the event loop while waiting."""
+        delay = self.reserve()
+        if delay > 0:
+            self.logger.debug(f"Rate limit reached, waiting {delay:.3f} seconds")
+            await asyncio.sleep(delay)
+
+
+# Create a global instance. Set SEC_RATE_LIMIT_STATE to a file path to share
+# the 10 req/s budget across processes (e.g. gunicorn workers).
+sec_rate_limiter = SECRateLimiter(
+    requests_per_second=int(os.getenv('SEC_REQUESTS_PER_SECOND', 10)),
+    burst=int(os.getenv('SEC_RATE_LIMIT_BURST', 1)),
+    shared_state_path=os.getenv('SEC_RATE_LIMIT_STATE')
+)
@@ -0,0 +1,254 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from section_splitter import find_sections
+from filing_catalog import catalog_for
+from filing_store import filing_stat
+
+# Each filing's sections get the rowids doc_id * SECTION_ROWIDS ... + SECTION_ROWIDS - 1,
+# so re-indexing a filing deletes a rowid range instead of scanning the FTS table
+SECTION_ROWIDS = 100
+
+QUERY_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+WORD_RE = re.compile(r'\w+')
+OPERATORS = ('AND', 'OR', 'NOT')
+
+
+def build_match_query(query: str) -> str:
+    """Turn a user query into FTS5 syntax.
+
+    Quoted text is a phrase, AND/OR/NOT are kept as operators, a trailing
+    ``*`` is a prefix search, and every other word is quoted so punctuation
+    ("10-K", "S&P") can't break the query. Words are ANDed by default.
+    """
+    terms = []
+    for phrase, word in QUERY_TOKEN_RE.findall(query):
+        if word in OPERATORS:
+            terms.append(word)
+            continue
+        words = WORD_RE.findall(phrase or word)
+        if words:
+            terms.append('"' + ' '.join(words) + '"' + ('*' if word.endswith('*') else ''))
+    while terms and terms[0] in OPERATORS:
+        terms.pop(0)
+    while terms and terms[-1] in OPERATORS:
+        terms.pop()
+    return ' '.join(terms)
+
+
+class FilingSearchIndex:
+    """SQLite FTS5 index of the cleaned text of downloaded filings, one row per 10-K Item.
+
+    ``update`` takes the downloaded filings from the filing catalog and only
+    re-cleans those whose size or mtime changed since they were indexed. A filing stored under several
+    directories is indexed once, from the copy the catalog lists first.
+    """
+
+    def __init__(self, db_path: str = os.getenv('SEARCH_INDEX_DB', os.path.join("filings", "search.db"))):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def _create_schema(self):
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    ticker TEXT NOT NULL,
+                    filing_date TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    indexed_at REAL NOT NULL,
+                    UNIQUE (ticker, filing_date)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_documents_year ON documents (year)')
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS sections
+                USING fts5(text, item UNINDEXED, tokenize='porter unicode61')
+            ''')
+
+    def scan(self, base_dir: str = "downloads") -> Dict[Tuple[str, str], Tuple[str, int, float]]:
+        """Map (ticker, filing_date) to (path, size, mtime) of the preferred copy under base_dir."""
+        found = {}
+        # Within a date, the catalog lists the main document before its other copies
+        for filing in catalog_for(base_dir).filings():
+            key = (filing['ticker'], filing['date'])
+            if key in found:
+                continue
+            try:
+                size, mtime = filing_stat(filing['path'])
+            except OSError:
+                continue
+            found[key] = (filing['path'], size, mtime)
+        return found
+
+    def index_document(self, ticker: str, filing_date: str, path: str, cleaned: str,
+                       sections: Optional[Dict] = None) -> int:
+        """Replace the indexed text of one filing. Returns the number of rows written."""
+        if sections is None:
+            sections = find_sections(cleaned)
+        ordered = sorted(sections.items(), key=lambda entry: entry[1]['start'])
+        rows = []
+        # Text before the first Item (cover page, table of contents) has no item
+        first_start = ordered[0][1]['start'] if ordered else len(cleaned)
+        if cleaned[:first_start].strip():
+            rows.append(('', cleaned[:first_start]))
+        rows.extend((item, cleaned[section['start']:section['end']]) for item, section in ordered)
+
+        size, mtime = filing_stat(path)
+        with self._connect() as conn:
+            row = conn.execute('SELECT id FROM documents WHERE ticker = ? AND filing_date = ?',
+                               (ticker, filing_date)).fetchone()
+            if row:
+                doc_id = row[0]
+                conn.execute('DELETE FROM sections WHERE rowid BETWEEN ? AND ?',
+                             (doc_id * SECTION_ROWIDS, doc_id * SECTION_ROWIDS + SECTION_ROWIDS - 1))
+                conn.execute('UPDATE documents SET path = ?, size = ?, mtime = ?, indexed_at = ? WHERE id = ?',
+                             (path, size, mtime, time.time(), doc_id))
+            else:
+                doc_id = conn.execute(
+                    'INSERT INTO documents (ticker, filing_date, year, path, size, mtime, indexed_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (ticker, filing_date, int(filing_date[:4]), path, size, mtime, time.time())
+                ).lastrowid
+            conn.executemany(
+                'INSERT INTO sections (rowid, text, item) VALUES (?, ?, ?)',
+                [(doc_id * SECTION_ROWIDS + n, text, item) for n, (item, text) in enumerate(rows)]
+            )
+        return len(rows)
+
+    def _prepared(self, paths: List[str], prepare: Callable[[str], Dict],
+                  workers: int) -> Iterator[Tuple[str, Dict]]:
+        if workers <= 1:
+            for path in paths:
+                yield path, prepare(path)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(prepare, path): path for path in paths}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def _changes(self, base_dir: str) -> Tuple[Dict, List[int], Dict[str, Tuple[str, str]]]:
+        """(found, ids of removed documents, {path: (ticker, date)} of new or changed filings)."""
+        found = self.scan(base_dir)
+        with self._connect() as conn:
+            existing = {
+                (row[1], row[2]): (row[0], row[3], row[4], row[5])
+                for row in conn.execute('SELECT id, ticker, filing_date, path, size, mtime FROM documents')
+            }
+        removed = [entry[0] for key, entry in existing.items() if key not in found]
+        stale = {
+            filing[0]: key for key, filing in found.items()
+            if key not in existing or existing[key][1:] != filing
+        }
+        return found, removed, stale
+
+    def update(self, prepare: Callable[[str], Dict], base_dir: str = "downloads",
+               workers: int = 1) -> Dict[str, int]:
+        """Index new and changed filings under base_dir and drop ones no longer there.
+
+        ``prepare`` maps a filing path to {'cleaned', 'sections'} (``prepare_filing``);
+        with ``workers`` > 1 it runs in a process pool.
+        """
+        with self.lock:
+            found, removed, stale = self._changes(base_dir)
+            with self._connect() as conn:
+                for doc_id in removed:
+                    conn.execute('DELETE FROM sections WHERE rowid BETWEEN ? AND ?',
+                                 (doc_id * SECTION_ROWIDS, doc_id * SECTION_ROWIDS + SECTION_ROWIDS - 1))
+                    conn.execute('DELETE FROM documents WHERE id = ?', (doc_id,))
+
+            self.logger.info(f"Search index: {len(stale)} filings to index, {len(removed)} removed, "
+                             f"{len(found) - len(stale)} unchanged")
+            counts = {'indexed': 0, 'failed': 0, 'removed': len(removed), 'unchanged': len(found) - len(stale)}
+            for done, (path, prepared) in enumerate(self._prepared(list(stale), prepare, workers), 1):
+                ticker, filing_date = stale[path]
+                try:
+                    # Unreadable filings are still recorded so they aren't re-cleaned on every update
+                    self.index_document(ticker, filing_date, path, prepared.get('cleaned') or '',
+                                        prepared.get('sections'))
+                    counts['indexed' if prepared.get('cleaned') else 'failed'] += 1
+                except (OSError, sqlite3.Error) as e:
+                    self.logger.error(f"Error indexing {path}: {str(e)}")
+                    counts['failed'] += 1
+                if done % 100 == 0:
+                    self.logger.info(f"Search index: [{done}/{len(stale)}] filings indexed")
+            return counts
+
+    def search(self, query: str, ticker: Optional[str] = None, year: Optional[int] = None,
+               limit: int = 20, offset: int = 0) -> List[Dict]:
+        """Best-matching filing sections by BM25, with a highlighted snippet of each.
+
+        Raises ValueError for queries FTS5 cannot parse.
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+        sql = ('SELECT d.ticker, d.filing_date, d.year, s.item, '
+               "snippet(sections, 0, '<mark>', '</mark>', '…', 24), bm25(sections) "
+               'FROM sections s JOIN documents d ON d.id = s.rowid / ? '
+               'WHERE sections MATCH ?')
+        params: Tuple = (SECTION_ROWIDS, match)
+        if ticker:
+            sql += ' AND d.ticker = ?'
+            params += (ticker.upper(),)
+        if year:
+            sql += ' AND d.year = ?'
+            params += (int(year),)
+        sql += ' ORDER BY bm25(sections) LIMIT ? OFFSET ?'
+        params += (limit, offset)
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query {query!r}: {str(e)}")
+        return [
+            {
+                'ticker': row[0],
+                'filing_date': row[1],
+                'year': row[2],
+                'item': row[3] or None,
+                'snippet': row[4],
+                'score': -row[5]
+            }
+            for row in rows
+        ]
+
+    def status(self, base_dir: str = "downloads") -> Dict:
+        """How current the index is: documents indexed, when last updated, and how
+        many filings under base_dir are new, changed or gone since."""
+        _, removed, stale = self._changes(base_dir)
+        with self._connect() as conn:
+            documents, indexed_at = conn.execute('SELECT COUNT(*), MAX(indexed_at) FROM documents').fetchone()
+        return {
+            'documents': documents,
+            'indexed_at': indexed_at,
+            'pending': len(stale),
+            'removed': len(removed),
+            'stale': bool(stale or removed)
+        }
+
+    def stats(self) -> Dict:
+        with self._connect() as conn:
+            documents = conn.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+            tickers = conn.execute('SELECT COUNT(DISTINCT ticker) FROM documents').fetchone()[0]
+        return {'documents': documents, 'tickers': tickers, 'db_bytes': os.path.getsize(self.db_path)}
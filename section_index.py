@@ -0,0 +1,170 @@
+import os
+import re
+import html
+import json
+import mmap
+import tempfile
+import logging
+from typing import Dict, List, Optional
+
+from section_splitter import TITLE_RES, choose_sections, find_sections
+from filing_store import filing_stat, map_filing_path, open_filing_path
+
+# Bump when the index layout or the section locator changes
+SECTION_INDEX_VERSION = '2'
+
+# "Item 7" in raw HTML: tags, entities and non-breaking spaces may sit between
+# the word and the number
+RAW_HEADING_RE = re.compile(
+    rb'(?:ITEM|Item)(?:\s|&#160;|&#xa0;|&nbsp;|\xc2\xa0|<[^>]{0,1000}>)*'
+    rb'(?P<item>\d{1,2}[A-Ca-c]?)(?![\dA-Za-z])'
+)
+# Raw bytes after a heading's number decoded to look for its title
+TITLE_WINDOW_BYTES = 4096
+WINDOW_TAG_RE = re.compile(r'<[^>]*>')
+# Mirrors the punctuation section_splitter.HEADING_RE allows before the title
+TITLE_LEAD_RE = re.compile(r'\s*[.:\-–—]?\s*')
+
+logger = logging.getLogger(__name__)
+
+
+def index_path(filing_path: str) -> str:
+    return f"{filing_path}.sections.json"
+
+
+def cleaned_path(filing_path: str) -> str:
+    return f"{filing_path}.cleaned.txt"
+
+
+def find_raw_headings(raw) -> Dict[str, List[Dict]]:
+    """Every plausible Item heading in raw HTML bytes (or an mmap of them),
+    in the ``section_splitter.find_headings`` format with byte offsets.
+
+    Only the few KB after each "Item N" hit are decoded to check its title.
+    """
+    headings: Dict[str, List[Dict]] = {}
+    for match in RAW_HEADING_RE.finditer(raw):
+        item = match.group('item').decode('ascii').upper()
+        title_re = TITLE_RES.get(item)
+        if not title_re:
+            continue
+        window = raw[match.end():match.end() + TITLE_WINDOW_BYTES].decode('utf-8', errors='replace')
+        visible = html.unescape(WINDOW_TAG_RE.sub('', window))
+        title = title_re.match(visible, TITLE_LEAD_RE.match(visible).end())
+        if not title:
+            continue
+        strong = title.group(0).isupper()
+        headings.setdefault(item, []).append({'start': match.start(), 'title_start': match.end(), 'strong': strong})
+    return headings
+
+
+def find_raw_sections(raw) -> Dict[str, Dict]:
+    """Locate each Item in the raw document as {'start', 'end'} byte offsets."""
+    return {
+        item: {'start': section['start'], 'end': section['end']}
+        for item, section in choose_sections(find_raw_headings(raw), len(raw)).items()
+    }
+
+
+def _write_atomic(path: str, data: bytes):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_section_index(filing_path: str, cleaned: str) -> Dict:
+    """Locate every Item in the raw filing and its cleaned text and persist both.
+
+    Writes ``<filing>.cleaned.txt`` and ``<filing>.sections.json``, whose
+    sections map each Item to raw byte offsets (``raw_start``/``raw_end``),
+    cleaned character offsets (``start``/``end``) and cleaned UTF-8 byte
+    offsets (``byte_start``/``byte_end``) for slicing the cleaned file.
+    """
+    raw_size, raw_mtime = filing_stat(filing_path)
+    with map_filing_path(filing_path) as raw:
+        raw_sections = find_raw_sections(raw)
+
+    encoded = cleaned.encode('utf-8')
+    cleaned_sections = find_sections(cleaned)
+    # Character -> UTF-8 byte offsets, encoding only the text between section boundaries
+    byte_offsets = {0: 0}
+    previous = 0
+    for position in sorted({offset for s in cleaned_sections.values() for offset in (s['start'], s['end'])}):
+        byte_offsets[position] = byte_offsets[previous] + len(cleaned[previous:position].encode('utf-8'))
+        previous = position
+    sections = {}
+    for item, section in cleaned_sections.items():
+        sections[item] = {
+            'start': section['start'],
+            'end': section['end'],
+            'byte_start': byte_offsets[section['start']],
+            'byte_end': byte_offsets[section['end']],
+            'raw_start': raw_sections.get(item, {}).get('start'),
+            'raw_end': raw_sections.get(item, {}).get('end'),
+        }
+
+    index = {
+        'version': SECTION_INDEX_VERSION,
+        'raw_size': raw_size,
+        'raw_mtime': raw_mtime,
+        'cleaned_size': len(encoded),
+        'sections': sections
+    }
+    _write_atomic(cleaned_path(filing_path), encoded)
+    _write_atomic(index_path(filing_path), json.dumps(index, indent=2).encode('utf-8'))
+    return index
+
+
+def load_section_index(filing_path: str) -> Optional[Dict]:
+    """Return the persisted index if it is current for the filing on disk."""
+    try:
+        with open(index_path(filing_path), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        raw_size, raw_mtime = filing_stat(filing_path)
+        cleaned_size = os.path.getsize(cleaned_path(filing_path))
+    except (OSError, ValueError):
+        return None
+    if (index.get('version') != SECTION_INDEX_VERSION or index.get('raw_size') != raw_size
+            or index.get('raw_mtime') != raw_mtime or index.get('cleaned_size') != cleaned_size):
+        return None
+    return index
+
+
+def get_section_index(filing_path: str, cleaned: Optional[str] = None) -> Optional[Dict]:
+    """Load the filing's section index, building it from ``cleaned`` when missing or stale."""
+    index = load_section_index(filing_path)
+    if index is None and cleaned:
+        try:
+            index = build_section_index(filing_path, cleaned)
+        except OSError as e:
+            logger.warning(f"Could not write section index for {filing_path}: {str(e)}")
+    return index
+
+
+def read_section(filing_path: str, item: str) -> Optional[str]:
+    """Read one Item's cleaned text through an mmap of the cleaned file, without
+    loading or re-scanning the rest of the filing."""
+    index = load_section_index(filing_path)
+    section = index['sections'].get(item.upper()) if index else None
+    if not section:
+        return None
+    with open(cleaned_path(filing_path), 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[section['byte_start']:section['byte_end']].decode('utf-8')
+
+
+def read_raw_section(filing_path: str, item: str) -> Optional[bytes]:
+    """Read one Item's raw HTML bytes through an mmap of the filing, or by
+    decompressing up to the Item when the filing is only in the filing store."""
+    index = load_section_index(filing_path)
+    section = index['sections'].get(item.upper()) if index else None
+    if not section or section['raw_start'] is None:
+        return None
+    if not os.path.exists(filing_path):
+        with open_filing_path(filing_path) as f:
+            f.read(section['raw_start'])
+            return f.read(section['raw_end'] - section['raw_start'])
+    with open(filing_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[section['raw_start']:section['raw_end']]
@@ -0,0 +1,115 @@
+import re
+from typing import Dict, List
+
+# Item number -> pattern its heading title starts with. Cross-references such
+# as "Item 8 of this Form 10-K" don't match a title and are ignored.
+ITEM_TITLES = {
+    '1': r'business',
+    '1A': r'risk\s+factors',
+    '1B': r'unresolved\s+staff',
+    '1C': r'cybersecurity',
+    '2': r'properties',
+    '3': r'legal\s+proceedings',
+    '4': r'(?:mine\s+safety|submission\s+of\s+matters|\[?reserved|\(?removed)',
+    '5': r'market\s+for',
+    '6': r'(?:selected|\[?reserved)',
+    '7': r'management',
+    '7A': r'quantitative',
+    '8': r'financial\s+statements',
+    '9': r'changes\s+in',
+    '9A': r'controls',
+    '9B': r'other\s+information',
+    '9C': r'disclosures?\s+regarding\s+foreign',
+    '10': r'directors',
+    '11': r'executive\s+compensation',
+    '12': r'security\s+ownership',
+    '13': r'certain\s+relationships',
+    '14': r'principal\s+account',
+    '15': r'exhibits',
+    '16': r'form\s+10-k\s+summary',
+}
+ITEM_ORDER = list(ITEM_TITLES)
+
+SECTION_NAMES = {
+    '1': 'Business',
+    '1A': 'Risk Factors',
+    '7': "Management's Discussion and Analysis",
+    '7A': 'Quantitative and Qualitative Disclosures About Market Risk',
+    '8': 'Financial Statements and Supplementary Data',
+}
+
+# No leading word boundary: cleaned text often runs headings into the
+# previous line ("Table of ContentsITEM 7.")
+HEADING_RE = re.compile(r'(?:ITEM|Item)\s*(?P<item>\d{1,2}[A-Ca-c]?)(?![\dA-Za-z])\s*[.:\-–—]?\s*')
+TITLE_RES = {item: re.compile(pattern, re.IGNORECASE) for item, pattern in ITEM_TITLES.items()}
+
+
+def find_headings(text: str) -> Dict[str, List[Dict]]:
+    """Every plausible heading per item: {'start', 'title_start', 'strong'}."""
+    headings: Dict[str, List[Dict]] = {}
+    for match in HEADING_RE.finditer(text):
+        item = match.group('item').upper()
+        title_re = TITLE_RES.get(item)
+        if not title_re:
+            continue
+        title = title_re.match(text, match.end())
+        if not title:
+            continue
+        # Real headings are usually set in capitals; the table of contents and
+        # cross-references are not
+        strong = title.group(0).isupper()
+        headings.setdefault(item, []).append({'start': match.start(), 'title_start': match.end(), 'strong': strong})
+    return headings
+
+
+def find_sections(text: str) -> Dict[str, Dict]:
+    """Locate each Item of a cleaned 10-K as {'item', 'start', 'end'} character offsets.
+
+    Items must appear in order, so working back from the last item each one
+    takes the latest heading before the next item's start, preferring one set
+    in capitals. This skips the table of contents and most cross-references.
+    """
+    return choose_sections(find_headings(text), len(text))
+
+
+def choose_sections(headings: Dict[str, List[Dict]], length: int) -> Dict[str, Dict]:
+    """Pick one heading per item from ``find_headings``-style candidates and
+    turn them into {'item', 'start', 'end'} sections of a document of ``length``."""
+    chosen = {}
+    boundary = length
+    for item in reversed(ITEM_ORDER):
+        candidates = [h for h in headings.get(item, ()) if h['start'] < boundary]
+        if not candidates:
+            continue
+        strong = [h for h in candidates if h['strong']]
+        heading = (strong or candidates)[-1]
+        chosen[item] = heading['start']
+        boundary = heading['start']
+
+    sections = {}
+    ordered = sorted(chosen.items(), key=lambda entry: entry[1])
+    for index, (item, start) in enumerate(ordered):
+        end = ordered[index + 1][1] if index + 1 < len(ordered) else length
+        sections[item] = {'item': item, 'start': start, 'end': end}
+    return sections
+
+
+def split_sections(text: str, items: List[str] = list(SECTION_NAMES)) -> Dict[str, str]:
+    """Return the text of the requested Items, in the order given, skipping any not found."""
+    sections = find_sections(text)
+    return {item: text[sections[item]['start']:sections[item]['end']] for item in items if item in sections}
+
+
+def chunk_text(text: str, chunk_chars: int) -> List[str]:
+    """Split text into pieces of at most ``chunk_chars``, preferring sentence ends."""
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_chars)
+        if end < len(text):
+            cut = text.rfind('. ', start + chunk_chars // 2, end)
+            if cut != -1:
+                end = cut + 1
+        chunks.append(text[start:end].strip())
+        start = end
+    return [chunk for chunk in chunks if chunk]
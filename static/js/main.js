@@ -7,8 +7,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const analysisContent = document.getElementById('analysis-content');
     const copyBtn = document.getElementById('copy-btn');
 
-    analyzeBtn.addEventListener('click', async function() {
-        const ticker = tickerInput.value.trim();
+    analyzeBtn.addEventListener('click', function() {
+        const ticker = tickerInput.value.trim().toUpperCase();
         if (!ticker) {
             showError('Please enter a ticker symbol');
             return;
@@ -18,65 +18,101 @@ document.addEventListener('DOMContentLoaded', function() {
         hideError();
         showLoading();
         hideResult();
+        analysisContent.innerHTML = '';
 
         console.log('Starting analysis for', ticker);
 
-        try {
-            const response = await fetch('/api/analyze', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ ticker })
-            });
-
-            console.log('Response status:', response.status);
-            const data = await response.json();
-            console.log('Received data:', data);
+        // Render each year as its events arrive instead of waiting for the whole analysis
+        const source = new EventSource(`/analyze/stream?ticker=${encodeURIComponent(ticker)}`);
+        const analysesDiv = document.createElement('div');
+        analysesDiv.className = 'analyses mt-4';
+        const summaries = {};
+        let finished = false;
 
-            if (!response.ok) {
-                throw new Error(data.error || 'Failed to analyze company');
+        function yearDiv(filingDate) {
+            let div = analysesDiv.querySelector(`[data-filing-date="${filingDate}"]`);
+            if (!div) {
+                div = document.createElement('div');
+                div.className = 'year-analysis mb-4';
+                div.dataset.filingDate = filingDate;
+                div.innerHTML = `
+                    <h4>Analysis for ${filingDate.split('-')[0]}</h4>
+                    <div class="metrics"></div>
+                    <div class="analysis-text"></div>
+                `;
+                analysesDiv.appendChild(div);
             }
+            return div;
+        }
 
-            // Display company info
+        function finish() {
+            finished = true;
+            source.close();
+            hideLoading();
+        }
+
+        source.addEventListener('company', e => {
+            const data = JSON.parse(e.data);
             const companyInfo = document.createElement('div');
             companyInfo.innerHTML = `
                 <h3>${data.company_name} (${ticker})</h3>
                 <p class="text-muted">Sector: ${data.sector}</p>
             `;
-            
-            // Create metrics table
-            const metricsTable = createMetricsTable(data.metrics_by_year, data.trends);
-            
-            // Display analyses for each year
-            const analysesDiv = document.createElement('div');
-            analysesDiv.className = 'analyses mt-4';
-            
-            data.analyses.forEach(yearAnalysis => {
-                const yearDiv = document.createElement('div');
-                yearDiv.className = 'year-analysis mb-4';
-                yearDiv.innerHTML = `
-                    <h4>Analysis for ${yearAnalysis.year}</h4>
-                    <div class="analysis-text">${yearAnalysis.analysis}</div>
-                `;
-                analysesDiv.appendChild(yearDiv);
-            });
-            
-            // Clear and update the content
-            analysisContent.innerHTML = '';
             analysisContent.appendChild(companyInfo);
-            analysisContent.appendChild(metricsTable);
             analysisContent.appendChild(analysesDiv);
-            
+            data.filing_dates.forEach(yearDiv);
             showResult();
-        } catch (error) {
-            console.error('Error:', error);
-            showError(error.message);
-        } finally {
-            hideLoading();
-        }
+        });
+
+        source.addEventListener('metrics', e => {
+            const data = JSON.parse(e.data);
+            yearDiv(data.filing_date).querySelector('.metrics').innerHTML = createYearMetricsTable(data.metrics);
+        });
+
+        source.addEventListener('summary', e => {
+            const data = JSON.parse(e.data);
+            summaries[data.filing_date] = (summaries[data.filing_date] || '') + data.token;
+            yearDiv(data.filing_date).querySelector('.analysis-text').textContent = summaries[data.filing_date];
+        });
+
+        source.addEventListener('analysis', e => {
+            const data = JSON.parse(e.data);
+            const div = yearDiv(data.filing_date);
+            div.querySelector('.metrics').innerHTML = createYearMetricsTable(data.metrics);
+            div.querySelector('.analysis-text').textContent = data.summary;
+        });
+
+        source.addEventListener('done', finish);
+
+        // Server errors carry data; connection drops don't. Close either way so
+        // the browser doesn't reconnect and start the analysis over.
+        source.addEventListener('error', e => {
+            if (finished) {
+                return;
+            }
+            const message = e.data ? JSON.parse(e.data).error : 'Lost connection to the server';
+            console.error('Error:', message);
+            showError(message);
+            finish();
+        });
     });
 
+    function createYearMetricsTable(metrics) {
+        if (!metrics) return '';
+        return `
+            <table class="table table-bordered metrics-table">
+                <tbody>
+                    ${Object.entries(metrics).map(([metric, value]) => `
+                        <tr>
+                            <td>${metric.split('_').map(word => word.charAt(0).toUpperCase() + word.slice(1)).join(' ')}</td>
+                            <td>${formatValue(value)}</td>
+                        </tr>
+                    `).join('')}
+                </tbody>
+            </table>
+        `;
+    }
+
     function createMetricsTable(metricsByYear, trends) {
         const table = document.createElement('table');
         table.className = 'table table-bordered table-hover metrics-table mt-4';
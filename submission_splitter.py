@@ -0,0 +1,173 @@
+import re
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+TYPE_RE = re.compile(rb'<TYPE>([^\r\n<]*)')
+FILENAME_RE = re.compile(rb'<FILENAME>([^\r\n<]*)')
+SEQUENCE_RE = re.compile(rb'<SEQUENCE>([^\r\n<]*)')
+
+DOCUMENT_TAG = b'<DOCUMENT>'
+TEXT_TAG = b'<TEXT>'
+TEXT_END_TAG = b'</TEXT>'
+# Inline-XBRL (and PDF) documents sit inside <XBRL>...</XBRL> within <TEXT>
+WRAPPER_TAGS = (b'<XBRL>', b'<PDF>')
+# Bytes held back from output so a closing wrapper tag before </TEXT> can be dropped
+WRAPPER_HOLDBACK = 64
+# Anything longer than this before <TEXT> is not an SGML document header
+MAX_HEADER_BYTES = 64 * 1024
+# Full submissions start with <SEC-DOCUMENT> (or <DOCUMENT> for single documents)
+SNIFF_BYTES = 8 * 1024
+
+
+class SubmissionSplitter:
+    """Streaming filter that keeps selected ``<DOCUMENT>``s of an EDGAR full submission.
+
+    A full-submission ``.txt`` bundles the primary document with every
+    exhibit, the XBRL instance and uuencoded graphics. ``filter`` takes the
+    raw byte chunks as they are downloaded and yields only the ``<TEXT>``
+    bodies of the primary document (always the first ``<DOCUMENT>``, i.e. the
+    10-K itself) and of exhibits whose ``<TYPE>`` starts with one of
+    ``exhibits`` (e.g. ``('EX-13', 'EX-21')``), unwrapped from any
+    ``<XBRL>``/``<PDF>`` element around the body. Without exhibits it stops
+    reading once the primary document ends, so the rest of the submission is
+    never transferred. Input that isn't an SGML submission is passed through
+    unchanged.
+
+    After ``filter`` is exhausted, ``documents`` lists every document header
+    seen and ``bytes_in``/``bytes_out`` count the bytes read and yielded.
+    """
+
+    def __init__(self, exhibits: Iterable[str] = ()):
+        self.exhibits = tuple(exhibit.upper().encode() for exhibit in exhibits)
+        self.logger = logging.getLogger(__name__)
+        self.documents: List[Dict] = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.passthrough = False
+        self.stopped_early = False
+
+    @property
+    def primary(self) -> Optional[Dict]:
+        return self.documents[0] if self.documents else None
+
+    def _wanted(self, document_type: bytes) -> bool:
+        if not self.documents:
+            return True
+        return any(document_type.upper().startswith(exhibit) for exhibit in self.exhibits)
+
+    def _parse_header(self, header: bytes) -> Tuple[Dict, bool]:
+        fields = {}
+        for name, pattern in (('type', TYPE_RE), ('filename', FILENAME_RE), ('sequence', SEQUENCE_RE)):
+            match = pattern.search(header)
+            fields[name] = match.group(1).strip() if match else b''
+        keep = self._wanted(fields['type'])
+        document = {name: value.decode('ascii', errors='replace') for name, value in fields.items()}
+        document['kept'] = keep
+        self.documents.append(document)
+        return document, keep
+
+    def filter(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        buffer = b''
+        state = 'sniff'
+        keep = False
+        text_started = False
+        closing = None
+        for chunk in chunks:
+            self.bytes_in += len(chunk)
+            buffer += chunk
+            while True:
+                if state == 'sniff':
+                    if len(buffer) < SNIFF_BYTES and DOCUMENT_TAG not in buffer:
+                        break
+                    if b'<SEC-DOCUMENT>' in buffer[:SNIFF_BYTES] or DOCUMENT_TAG in buffer[:SNIFF_BYTES]:
+                        state = 'seek'
+                    else:
+                        self.passthrough = True
+                        state = 'pass'
+                    continue
+
+                if state == 'pass':
+                    self.bytes_out += len(buffer)
+                    yield buffer
+                    buffer = b''
+                    break
+
+                if state == 'seek':
+                    start = buffer.find(DOCUMENT_TAG)
+                    if start == -1:
+                        # Keep enough to match a tag split across chunks
+                        buffer = buffer[-(len(DOCUMENT_TAG) - 1):]
+                        break
+                    buffer = buffer[start + len(DOCUMENT_TAG):]
+                    state = 'header'
+                    continue
+
+                if state == 'header':
+                    start = buffer.find(TEXT_TAG)
+                    if start == -1:
+                        if len(buffer) > MAX_HEADER_BYTES:
+                            self.logger.warning("Malformed submission: no <TEXT> after <DOCUMENT>, skipping")
+                            buffer = buffer[-(len(TEXT_TAG) - 1):]
+                            state = 'seek'
+                        break
+                    document, keep = self._parse_header(buffer[:start])
+                    self.logger.debug(f"{'Keeping' if keep else 'Skipping'} {document['type']} document {document['filename']}")
+                    buffer = buffer[start + len(TEXT_TAG):]
+                    state = 'text'
+                    text_started = False
+                    closing = None
+                    continue
+
+                if state == 'text':
+                    if not text_started:
+                        # The newline after <TEXT> may arrive in a later chunk
+                        buffer = buffer.lstrip(b'\r\n')
+                        if closing is None:
+                            wrapper = next((tag for tag in WRAPPER_TAGS if buffer.startswith(tag)), None)
+                            if wrapper is None and any(tag.startswith(buffer) for tag in WRAPPER_TAGS):
+                                break  # Empty, or a wrapper tag split across chunks
+                            if wrapper:
+                                # Drop the wrapper, then the newline after it as above
+                                buffer = buffer[len(wrapper):]
+                                closing = b'</' + wrapper[1:]
+                                continue
+                        elif not buffer:
+                            break
+                        text_started = True
+                    end = buffer.find(TEXT_END_TAG)
+                    if end == -1:
+                        # Everything but a possible partial </TEXT> (and closing wrapper) can go out now
+                        safe = len(buffer) - (len(TEXT_END_TAG) - 1) - (WRAPPER_HOLDBACK if closing else 0)
+                        if safe > 0:
+                            if keep:
+                                self.bytes_out += safe
+                                yield buffer[:safe]
+                            buffer = buffer[safe:]
+                        break
+                    body = buffer[:end]
+                    if closing:
+                        trimmed = body.rstrip()
+                        if trimmed.endswith(closing):
+                            body = body[:len(trimmed) - len(closing)]
+                    if keep and body:
+                        self.bytes_out += len(body)
+                        yield body
+                    buffer = buffer[end + len(TEXT_END_TAG):]
+                    state = 'seek'
+                    if not self.exhibits:
+                        # Only the primary document was wanted and it is complete
+                        self.stopped_early = True
+                        return
+                    continue
+
+        if state == 'sniff' and buffer:
+            # Short non-SGML input never filled the sniff window
+            self.passthrough = True
+            self.bytes_out += len(buffer)
+            yield buffer
+        elif state == 'pass' and buffer:
+            self.bytes_out += len(buffer)
+            yield buffer
+        elif state == 'text' and keep and buffer:
+            self.bytes_out += len(buffer)
+            yield buffer
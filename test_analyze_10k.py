@@ -0,0 +1,135 @@
+import os
+import logging
+
+import pytest
+
+import filing_validator
+
+FILING = (
+    '<html><body>\n<p>ITEM 1. BUSINESS</p>\n<p>{ticker} makes things.</p>\n'
+    '<p>ITEM 1A. RISK FACTORS</p>\n<p>Competition.</p>\n'
+    '<p>ITEM 7. MANAGEMENT\'S DISCUSSION AND ANALYSIS</p>\n'
+    '<p>Net sales were ${revenue} million.</p>\n'
+    '<p>ITEM 8. FINANCIAL STATEMENTS AND SUPPLEMENTARY DATA</p>\n<p>Statements.</p>\n'
+    '</body></html>\n'
+)
+FILINGS = {'AAPL': '2023-11-03', 'MSFT': '2023-07-27', 'XOM': '2024-02-28'}
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    monkeypatch.setenv('SEC_EMAIL', 'test@example.com')
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    # Analysis output, the artifact cache and the filing store all live under the working directory
+    monkeypatch.chdir(tmp_path)
+    # The fixture filings are far smaller than a real 10-K
+    monkeypatch.setattr(filing_validator, 'MIN_FILING_BYTES', 0)
+    from analyze_10k import TenKAnalyzer
+    from download_10k import SP500Downloader
+    from filing_index import FilingIndex
+
+    monkeypatch.setattr('download_10k.FilingIndex', lambda: FilingIndex(db_path=str(tmp_path / 'master_index.db')))
+    for n, (ticker, date) in enumerate(FILINGS.items()):
+        path = tmp_path / 'downloads' / ticker / date[:4] / f'{ticker}_{date}.html'
+        path.parent.mkdir(parents=True)
+        path.write_text(FILING.format(ticker=ticker, revenue=f'{n + 1},000'), encoding='utf-8')
+    return TenKAnalyzer(SP500Downloader(base_dir='downloads'), base_dir='downloads')
+
+
+def _outputs(directory):
+    outputs = {}
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), encoding='utf-8') as f:
+            outputs[name] = f.read()
+    return outputs
+
+
+def test_process_pool_matches_serial(analyzer):
+    analyzer.output_dir = 'pooled'
+    os.makedirs('pooled')
+    analyzer.analyze_all_companies(workers=2)
+    pooled = _outputs('pooled')
+
+    analyzer.output_dir = 'serial'
+    os.makedirs('serial')
+    analyzer.analyze_all_companies(workers=1)
+
+    assert sorted(pooled) == sorted(f'{ticker}_{date}_analysis.txt' for ticker, date in FILINGS.items())
+    assert pooled == _outputs('serial')
+    assert 'XOM makes things.' in pooled['XOM_2024-02-28_analysis.txt']
+
+
+def test_prepare_filing(analyzer):
+    from analyze_10k import prepare_filing
+
+    prepared = prepare_filing(os.path.join('downloads', 'MSFT', '2023', 'MSFT_2023-07-27.html'))
+    assert prepared['metrics'] == {'revenue': 2000e6}
+    assert set(prepared['sections']) == {'1', '1A', '7', '8'}
+    assert 'MSFT makes things.' in prepared['cleaned']
+    # Unreadable filings come back empty rather than raising in a pool worker
+    assert prepare_filing('downloads/missing.html') == {'cleaned': '', 'metrics': {}, 'sections': None}
+
+
+def _stub_company(analyzer):
+    filings = [
+        {'accession_number': f'0000320193-{date[2:4]}-000106', 'date': date, 'url': f'https://example.com/{date}'}
+        for date in ('2023-11-03', '2022-10-28')
+    ]
+    paths = {}
+    for filing in filings:
+        path = os.path.join('downloads', 'AAPL', filing['date'][:4], f"AAPL_{filing['date']}.html")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(FILING.format(ticker='AAPL', revenue=filing['date'][:4]))
+        paths[filing['accession_number']] = path
+
+    downloader = analyzer.downloader
+    downloader.get_company_info = lambda ticker: (
+        {'cik': '320193', 'name': 'Apple Inc.', 'sector': 'Tech'} if ticker == 'AAPL' else None
+    )
+    downloader.get_company_filings = lambda cik, years=5: filings
+    downloader.download_filings = lambda jobs: {filing['accession_number']: paths[filing['accession_number']]
+                                                for filing, _, _ in jobs}
+    analyzer.stream_detailed_summary = lambda content, metrics, year=None, sections=None: iter([f'{year} ', 'ok'])
+    analyzer.generate_detailed_summary = lambda content, metrics, year=None, sections=None: f'{year} ok'
+
+
+def test_analysis_events(analyzer):
+    from analysis_cache import AnalysisCache
+
+    _stub_company(analyzer)
+    analyzer.analysis_cache = AnalysisCache()
+    events = list(analyzer.iter_analysis_events('AAPL'))
+
+    # Every year's metrics go out before the first summary token
+    assert [event for event, _ in events] == [
+        'company', 'metrics', 'metrics', 'summary', 'summary', 'analysis', 'summary', 'summary', 'analysis', 'done'
+    ]
+    assert events[0][1]['filing_dates'] == ['2023-11-03', '2022-10-28']
+    assert [data['metrics'] for event, data in events if event == 'metrics'] == \
+        [{'revenue': 2023e6}, {'revenue': 2022e6}]
+    assert [data['summary'] for event, data in events if event == 'analysis'] == ['2023 ok', '2022 ok']
+
+    # Analyzed filings come back from the cache, without summary tokens
+    cached = [event for event, _ in analyzer.iter_analysis_events('AAPL')]
+    assert cached == ['company', 'metrics', 'metrics', 'analysis', 'analysis', 'done']
+
+    assert list(analyzer.iter_analysis_events('NOPE')) == \
+        [('error', {'error': 'Company NOPE not found in S&P 500'})]
+
+
+def test_analyze_multiple_years_progress(analyzer):
+    _stub_company(analyzer)
+    stages = []
+    result = analyzer.analyze_multiple_years('AAPL', progress=lambda stage, **details: stages.append(
+        (stage, details['filings'])))
+
+    assert result['company_name'] == 'Apple Inc.'
+    assert [analysis['summary'] for analysis in result['analyses']] == ['2023 ok', '2022 ok']
+    assert stages[0] == ('resolving_company', {})
+    assert stages[-1] == ('analyzing', {'2023-11-03': 'done', '2022-10-28': 'done'})
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,52 @@
+import os
+import logging
+
+from artifact_cache import ArtifactCache
+
+CLEANED = 'Item 7. Management’s Discussion and Analysis. Net sales were $383,285 million.'
+METRICS = {'revenue': 383285.0}
+
+
+def test_get_or_compute(tmp_path):
+    cache = ArtifactCache(cache_dir=str(tmp_path))
+    key = cache.key_for_bytes(b'<html>filing</html>')
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return CLEANED, METRICS
+
+    assert cache.get_or_compute(key, compute) == {'cleaned': CLEANED, 'metrics': METRICS}
+    assert cache.get_or_compute(key, compute) == {'cleaned': CLEANED, 'metrics': METRICS}
+    assert len(calls) == 1
+    assert os.path.exists(cache.storage.path(key, '.txt.gz'))
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = ArtifactCache(cache_dir=str(tmp_path))
+    key = cache.key_for_bytes(b'<html>filing</html>')
+    cache.put(key, CLEANED, METRICS)
+    with open(cache.storage.path(key, '.txt.gz'), 'wb') as f:
+        f.write(b'not gzip')
+    assert cache.get(key) is None
+
+
+def test_eviction(tmp_path):
+    cache = ArtifactCache(cache_dir=str(tmp_path), max_bytes=4096)
+    for i in range(50):
+        cache.put(cache.key_for_bytes(str(i).encode()), os.urandom(200).hex(), METRICS)
+    assert cache.stats()['bytes'] <= 4096
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    print("Testing ArtifactCache...")
+    for test in (test_get_or_compute, test_corrupt_entry_is_a_miss, test_eviction):
+        with tempfile.TemporaryDirectory() as directory:
+            test(directory)
+    print("\n✅ Artifact cache tests passed!")
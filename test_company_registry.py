@@ -0,0 +1,94 @@
+import os
+import json
+import logging
+
+import pytest
+
+from company_registry import CompanyRegistry, Company
+
+CSV = (
+    "symbol,name,sector,cik\n"
+    "AAPL,Apple Inc.,Information Technology,320193.0\n"
+    "XOM,Exxon Mobil,Energy,\n"
+)
+CIK_CACHE = {'xom': '34088', 'PLTR': '1321655', 'RIVN': 1874178}
+SEC_TICKERS = {
+    '0': {'cik_str': 1321655, 'ticker': 'PLTR', 'title': 'Palantir Technologies Inc.'},
+    '1': {'cik_str': 1318605, 'ticker': 'tsla', 'title': 'Tesla, Inc.'},
+    '2': {'cik_str': 1, 'ticker': 'AAPL', 'title': 'Not Apple'},
+    '3': {'title': 'No ticker'},
+}
+
+
+@pytest.fixture
+def registry(tmp_path):
+    paths = {name: str(tmp_path / name) for name in ('sp500.csv', 'cik_cache.json', 'company_tickers.json')}
+    with open(paths['sp500.csv'], 'w', encoding='utf-8') as f:
+        f.write(CSV)
+    with open(paths['cik_cache.json'], 'w', encoding='utf-8') as f:
+        json.dump(CIK_CACHE, f)
+    with open(paths['company_tickers.json'], 'w', encoding='utf-8') as f:
+        json.dump(SEC_TICKERS, f)
+    return CompanyRegistry(paths['sp500.csv'], paths['cik_cache.json'], paths['company_tickers.json'],
+                           check_interval=0)
+
+
+def test_tickers_outside_the_sp500(registry):
+    # Only in cik_cache: resolvable, with placeholder name and sector
+    assert registry.get('rivn') == Company('RIVN', None, None, '0001874178', False)
+    assert registry.info('RIVN') == {'name': 'RIVN', 'sector': 'Unknown', 'cik': '0001874178'}
+    # cik_cache and SEC's ticker file merge into one entry
+    assert registry.info('PLTR') == {'name': 'Palantir Technologies Inc.', 'sector': 'Unknown', 'cik': '0001321655'}
+    assert registry.cik('TSLA') == '0001318605'
+    assert registry.get('NOPE') is None
+    assert registry.info('NOPE') is None
+
+
+def test_sp500_rows_take_precedence(registry):
+    assert registry.get('AAPL') == Company('AAPL', 'Apple Inc.', 'Information Technology', '0000320193', True)
+    # A member with no CIK in the CSV gets it from cik_cache
+    assert registry.info('XOM') == {'name': 'Exxon Mobil', 'sector': 'Energy', 'cik': '0000034088'}
+    assert [company['symbol'] for company in registry.companies()] == ['AAPL', 'XOM']
+    assert registry.stats() == {'companies': 5, 'sp500_members': 2, 'loads': 1}
+
+
+def test_reloads_changed_files(registry):
+    assert registry.cik('NVDA') is None
+    with open(registry.cik_cache_path, 'w', encoding='utf-8') as f:
+        json.dump({**CIK_CACHE, 'NVDA': '1045810'}, f)
+    # A distinct mtime, in case the rewrite landed in the same tick
+    stat = os.stat(registry.cik_cache_path)
+    os.utime(registry.cik_cache_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert registry.cik('NVDA') == '0001045810'
+    assert registry.loads == 2
+
+    # Unchanged files aren't parsed again
+    registry.get('AAPL')
+    assert registry.loads == 2
+
+
+def test_unreadable_files_are_skipped(registry):
+    with open(registry.tickers_path, 'w', encoding='utf-8') as f:
+        f.write('{not json')
+    os.remove(registry.csv_path)
+    assert registry.companies() == []
+    assert registry.info('PLTR') == {'name': 'PLTR', 'sector': 'Unknown', 'cik': '0001321655'}
+    assert registry.get('TSLA') is None
+
+
+def test_downloader_resolves_registry_tickers(registry, tmp_path, monkeypatch):
+    monkeypatch.setenv('SEC_EMAIL', 'test@example.com')
+    from download_10k import SP500Downloader
+    from filing_index import FilingIndex
+
+    monkeypatch.setattr('download_10k.FilingIndex', lambda: FilingIndex(db_path=str(tmp_path / 'master_index.db')))
+    monkeypatch.setattr('download_10k.company_registry', registry)
+    downloader = SP500Downloader(base_dir=str(tmp_path / 'downloads'))
+    assert downloader.get_company_cik('pltr') == '0001321655'
+    assert downloader.get_company_info('RIVN')['cik'] == '0001874178'
+    assert downloader.get_company_info('NOPE') is None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,146 @@
+import gzip
+import time
+import logging
+import threading
+
+import pytest
+
+MASTER_IDX = (
+    b"Description:           Master Index of EDGAR Dissemination Feed\r\n"
+    b"Last Data Received:    December 31, 2023\r\n"
+    b"CIK|Company Name|Form Type|Date Filed|Filename\r\n"
+    b"--------------------------------------------------------------------------------\r\n"
+    b"1000045|NICHOLAS FINANCIAL INC|10-K|2023-06-28|edgar/data/1000045/0000950170-23-030037.txt\r\n"
+    b"320193|Apple Inc.|10-K|2023-11-03|edgar/data/320193/0000320193-23-000106.txt\r\n"
+    b"320193|Apple Inc.|10-K/A|2023-12-01|edgar/data/320193/0000320193-23-000120.txt\r\n"
+    b"320193|Apple Inc.|8-K|2023-11-02|edgar/data/320193/0000320193-23-000104.txt\r\n"
+    b"3201930|Not Apple|10-K|2023-03-01|edgar/data/3201930/0003201930-23-000001.txt\r\n"
+    b"789019|Soci\xe9t\xe9 Microsoft|10-K|2023-07-27|edgar/data/789019/0000950170-23-035122.txt\r\n"
+    b"malformed line without enough fields\r\n"
+    b"789019|MICROSOFT CORP|10-Q|2023-10-24|edgar/data/789019/0000950170-23-054855.txt"
+)
+
+
+class FakeResponse:
+    def __init__(self, body: bytes, chunk_size: int):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=None):
+        # Chunk boundaries fall mid-line, mid-field and between \r and \n
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+
+class FakeSession:
+    def __init__(self, body: bytes, chunk_size: int = 7):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    def get(self, url, stream=False):
+        return FakeResponse(self.body, self.chunk_size)
+
+
+@pytest.fixture
+def downloader(tmp_path, monkeypatch):
+    monkeypatch.setenv('SEC_EMAIL', 'test@example.com')
+    from download_10k import SP500Downloader
+    from filing_index import FilingIndex
+
+    # Keep the master index database out of the working directory
+    monkeypatch.setattr('download_10k.FilingIndex', lambda: FilingIndex(db_path=str(tmp_path / 'master_index.db')))
+    return SP500Downloader(base_dir=str(tmp_path / 'downloads'))
+
+
+def _rows(downloader, url='https://www.sec.gov/Archives/edgar/full-index/2023/QTR4/master.idx', **filters):
+    return [(row['cik'], row['form_type'], row['date_filed']) for row in downloader.iter_master_idx(url, **filters)]
+
+
+def test_master_idx_filters(downloader):
+    downloader.session = FakeSession(MASTER_IDX)
+
+    # Zero-padded CIKs match the unpadded index; forms match exactly, so 10-K/A is left out
+    assert _rows(downloader, ciks=['0000320193', '789019'], form_types=['10-K']) == [
+        ('320193', '10-K', '2023-11-03'), ('789019', '10-K', '2023-07-27')
+    ]
+    assert _rows(downloader, ciks=['320193']) == [
+        ('320193', '10-K', '2023-11-03'), ('320193', '10-K/A', '2023-12-01'), ('320193', '8-K', '2023-11-02')
+    ]
+    # With no filters every well-formed row after the header comes back, including the unterminated last one
+    rows = list(downloader.iter_master_idx('https://example.com/master.idx'))
+    assert len(rows) == 7
+    assert rows[-1]['form_type'] == '10-Q'
+    assert rows[1] == {
+        'cik': '320193',
+        'company_name': 'Apple Inc.',
+        'form_type': '10-K',
+        'date_filed': '2023-11-03',
+        'filename': 'edgar/data/320193/0000320193-23-000106.txt'
+    }
+    assert [row['company_name'] for row in rows if row['cik'] == '789019'][0] == 'Société Microsoft'
+
+
+def test_master_idx_gzip(downloader):
+    downloader.session = FakeSession(gzip.compress(MASTER_IDX), chunk_size=50)
+    assert _rows(downloader, 'https://www.sec.gov/Archives/edgar/full-index/2023/QTR4/master.gz',
+                 ciks=['320193'], form_types=['10-K', '10-K/A']) == [
+        ('320193', '10-K', '2023-11-03'), ('320193', '10-K/A', '2023-12-01')
+    ]
+
+
+def test_master_idx_line():
+    from download_10k import SP500Downloader
+
+    match = SP500Downloader._match_master_idx_line
+    line = b"320193|Apple Inc.|10-K|2023-11-03|edgar/data/320193/0000320193-23-000106.txt\r"
+    assert match(line, {b'320193'}, {b'10-K'})['filename'] == 'edgar/data/320193/0000320193-23-000106.txt'
+    assert match(line, {b'32019'}, None) is None
+    assert match(line, None, {b'10-Q'}) is None
+    assert match(b"320193|Apple Inc.|10-K", None, None) is None
+    assert match(b"", None, None) is None
+
+
+def test_download_filings_concurrently(downloader):
+    downloader.max_workers = 3
+    downloader.session = downloader.create_session()
+    adapter = downloader.session.get_adapter('https://www.sec.gov/')
+    assert adapter._pool_maxsize == 3
+    assert downloader.session.headers['User-Agent'] == downloader.headers['User-Agent']
+
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def download_filing(filing, sector, ticker):
+        with lock:
+            running.append(filing['accession_number'])
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(filing['accession_number'])
+        if filing['accession_number'] == 'bad':
+            raise IOError("connection reset")
+        return f"{sector}/{ticker}/{filing['accession_number']}.html"
+
+    downloader.download_filing = download_filing
+    jobs = [({'accession_number': str(n), 'url': f'https://example.com/{n}'}, 'Tech', 'AAPL') for n in range(8)]
+    jobs.append(({'accession_number': 'bad', 'url': 'https://example.com/bad'}, 'Tech', 'AAPL'))
+    results = downloader.download_filings(jobs)
+
+    assert results == {**{str(n): f"Tech/AAPL/{n}.html" for n in range(8)}, 'bad': ''}
+    assert max(peak) == 3
+    assert downloader.download_filings([]) == {}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise SystemExit(pytest.main([__file__, '-q']))
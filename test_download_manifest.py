@@ -0,0 +1,147 @@
+import os
+import json
+import hashlib
+import logging
+
+import pytest
+
+from download_manifest import DownloadManifest, write_stream, read_sidecar
+from filing_validator import MIN_FILING_BYTES
+
+FACT = b'<p>Net sales <ix:nonFraction name="us-gaap:Revenues" contextRef="FY" scale="6">383,285</ix:nonFraction></p>\n'
+FILING = b"<html><body>\n" + FACT * (2 * MIN_FILING_BYTES // len(FACT)) + b"</body></html>\n"
+
+FILINGS = [
+    {'accession_number': '0000320193-23-000106', 'date': '2023-11-03', 'url': 'https://example.com/2023.txt'},
+    {'accession_number': '0000320193-22-000108', 'date': '2022-10-28', 'url': 'https://example.com/2022.txt'},
+    {'accession_number': '0000320193-21-000105', 'date': '2021-10-29', 'url': 'https://example.com/2021.txt'},
+]
+COMPANIES = [{'symbol': 'AAPL', 'sector': 'Tech', 'cik': '320193'}]
+
+
+class Crash(BaseException):
+    """Stands in for the process dying mid-batch."""
+
+
+@pytest.fixture
+def downloader(tmp_path, monkeypatch):
+    monkeypatch.setenv('SEC_EMAIL', 'test@example.com')
+    from download_10k import SP500Downloader
+    from filing_index import FilingIndex
+
+    # Keep the master index database out of the working directory
+    monkeypatch.setattr('download_10k.FilingIndex', lambda: FilingIndex(db_path=str(tmp_path / 'master_index.db')))
+
+    downloader = SP500Downloader(base_dir=str(tmp_path / 'downloads'))
+    downloader.max_workers = 1
+    downloader.get_company_filings = lambda cik, years=5: FILINGS
+    # A copy from an earlier run, saved before the manifest existed and without a sidecar
+    os.makedirs(tmp_path / 'downloads' / 'Tech')
+    (tmp_path / 'downloads' / 'Tech' / 'AAPL_2023-11-03.html').write_bytes(FILING)
+    return downloader
+
+
+def _fake_download(downloader, fetched, crash_on=None):
+    def download_filing(filing, sector, ticker):
+        if filing['date'] == crash_on:
+            raise Crash()
+        fetched.append(filing['date'])
+        path = os.path.join(downloader.base_dir, sector, ticker, filing['date'][:4], f"{ticker}_{filing['date']}.html")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_stream(path, [FILING], url=filing['url'])
+        downloader.catalog.invalidate()
+        return path
+    return download_filing
+
+
+def _manifest(downloader):
+    with open(os.path.join(downloader.base_dir, 'download_manifest.json'), encoding='utf-8') as f:
+        return json.load(f)['companies']['AAPL']
+
+
+def test_completed_filings_survive_a_crash(downloader):
+    fetched = []
+    downloader.download_filing = _fake_download(downloader, fetched, crash_on='2021-10-29')
+    with pytest.raises(Crash):
+        downloader.download_all_filings(COMPANIES)
+
+    filings = _manifest(downloader)['filings']
+    assert fetched == ['2022-10-28']
+    assert filings['0000320193-23-000106']['status'] == 'done'
+    assert filings['0000320193-22-000108']['status'] == 'done'
+    assert '0000320193-21-000105' not in filings
+
+    # The rerun fetches only what is left
+    fetched.clear()
+    downloader.download_filing = _fake_download(downloader, fetched)
+    results = downloader.download_all_filings(COMPANIES, verify_hash=True)
+    assert fetched == ['2021-10-29']
+    assert results['success'] == ['AAPL']
+    assert _manifest(downloader)['status'] == 'complete'
+
+
+def test_existing_files_seed_the_manifest(downloader):
+    fetched = []
+    downloader.download_filing = _fake_download(downloader, fetched)
+    downloader.download_all_filings(COMPANIES)
+    assert '2023-11-03' not in fetched
+    record = _manifest(downloader)['filings']['0000320193-23-000106']
+    assert record['path'].endswith('AAPL_2023-11-03.html')
+    assert record['size'] == len(FILING)
+
+
+def test_write_stream_sidecar(tmp_path):
+    path = str(tmp_path / 'AAPL_2023-11-03.html')
+    sidecar = write_stream(path, [FILING[:100], FILING[100:]], expected_size=len(FILING),
+                           url='https://example.com/2023.txt', kept=lambda: 'primary')
+
+    with open(path, 'rb') as f:
+        assert f.read() == FILING
+    assert (sidecar['size'], sidecar['sha256']) == (len(FILING), hashlib.sha256(FILING).hexdigest())
+    assert (sidecar['url'], sidecar['kept']) == ('https://example.com/2023.txt', 'primary')
+    assert read_sidecar(path) == sidecar
+
+    # A sidecar that no longer matches the file's size is ignored
+    with open(path, 'ab') as f:
+        f.write(b'\n')
+    assert read_sidecar(path) is None
+    assert read_sidecar(str(tmp_path / 'missing.html')) is None
+
+
+def test_incomplete_stream_leaves_nothing(tmp_path):
+    path = str(tmp_path / 'AAPL_2023-11-03.html')
+    with pytest.raises(IOError):
+        write_stream(path, [FILING[:100]], expected_size=len(FILING))
+
+    def dropped():
+        yield FILING[:100]
+        raise ConnectionError("connection reset")
+
+    with pytest.raises(ConnectionError):
+        write_stream(path, dropped())
+    assert os.listdir(tmp_path) == []
+
+
+def test_manifest_records_and_verifies_filings(tmp_path):
+    path = str(tmp_path / 'AAPL_2023-11-03.html')
+    write_stream(path, [FILING])
+    manifest = DownloadManifest(str(tmp_path / 'download_manifest.json'))
+    manifest.record_filing('AAPL', '0000320193-23-000106', '2023-11-03', path)
+    assert manifest.company('AAPL')['filings']['0000320193-23-000106']['sha256'] == \
+        hashlib.sha256(FILING).hexdigest()
+    assert manifest.is_filing_done('AAPL', '0000320193-23-000106', verify_hash=True)
+
+    # Same size, different bytes: only the hash check notices
+    with open(path, 'r+b') as f:
+        f.write(b'<HTML>')
+    assert manifest.is_filing_done('AAPL', '0000320193-23-000106')
+    assert not manifest.is_filing_done('AAPL', '0000320193-23-000106', verify_hash=True)
+
+    manifest.record_filing('AAPL', '0000320193-22-000108', '2022-10-28', '', error='HTTP 503')
+    assert manifest.company('AAPL')['filings']['0000320193-22-000108']['status'] == 'failed'
+    assert not manifest.is_filing_done('AAPL', '0000320193-22-000108')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,105 @@
+import os
+import logging
+
+import pytest
+
+import filing_store
+import filing_validator
+from filing_catalog import FilingCatalog
+from filing_store import FilingStore
+
+ITEMS = b''.join(b'<p>ITEM %s. Heading</p>\n' % item for item in (b'1', b'1A', b'7', b'8'))
+
+
+def _write(base, relative: str, padding: int = 0) -> str:
+    path = os.path.join(base, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'<html><body>\n' + ITEMS + b'<p>x</p>\n' * padding + b'</body></html>\n')
+    return path
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    # The fixture filings are far smaller than a real 10-K
+    monkeypatch.setattr(filing_validator, 'MIN_FILING_BYTES', 0)
+    # An empty store of our own, so nothing packed elsewhere shows up
+    store = FilingStore(str(tmp_path / 'store'))
+    monkeypatch.setattr('filing_catalog.filing_store', store)
+    monkeypatch.setattr(filing_store, 'filing_store', store)
+    base = str(tmp_path / 'downloads')
+    _write(base, 'Apple Inc./2023/AAPL_2023-11-03.html')
+    _write(base, 'Apple Inc./2022/AAPL_2022-10-28.html')
+    _write(base, 'Energy/XOM/2024/XOM_2024-02-28.html')
+    return base
+
+
+def test_rescans_only_changed_trees(downloads):
+    catalog = FilingCatalog(downloads, check_interval=0)
+    assert [f['date'] for f in catalog.filings('AAPL')] == ['2023-11-03', '2022-10-28']
+    assert catalog.filings('XOM')[0]['company'] == 'Energy'
+    assert catalog.scans == 2
+
+    # Nothing changed: directory mtimes are compared, nothing is listed again
+    catalog.filings()
+    assert catalog.scans == 2
+
+    # Make sure the next write moves the directory mtime, then add a filing
+    os.utime(os.path.join(downloads, 'Energy', 'XOM', '2024'), (0, 0))
+    _write(downloads, 'Energy/XOM/2024/XOM_2024-02-28_10K_text.txt')
+    assert [f['format'] for f in catalog.filings('XOM', formats=('html', 'txt'))] == ['html', 'txt']
+    assert catalog.scans == 3
+
+
+def test_check_interval(downloads):
+    catalog = FilingCatalog(downloads, check_interval=3600)
+    assert len(catalog.filings()) == 3
+    _write(downloads, 'Apple Inc./2024/AAPL_2024-11-01.html')
+    assert len(catalog.filings()) == 3
+    catalog.invalidate()
+    assert catalog.latest('AAPL')['date'] == '2024-11-01'
+
+
+def test_latest_prefers_the_main_document(downloads):
+    catalog = FilingCatalog(downloads, check_interval=0)
+    main = os.path.join(downloads, 'Apple Inc.', '2023', 'AAPL_2023-11-03.html')
+    raw = _write(downloads, 'Apple Inc./2023/AAPL_2023-11-03_10K_raw.html', padding=100)
+    text = _write(downloads, 'Apple Inc./2023/AAPL_2023-11-03_10K_text.txt', padding=200)
+    _write(downloads, 'Apple Inc./2022/AAPL_2022-10-28_10K_raw.html', padding=300)
+    catalog.invalidate()
+
+    # The larger _10K_raw copy of the same date, and larger older filings, don't win
+    assert catalog.latest('AAPL')['path'] == main
+    assert [f['path'] for f in catalog.filings('AAPL') if f['date'] == '2023-11-03'] == [main, raw]
+    assert catalog.find('AAPL', '2023-11-03', formats=('txt',))['path'] == text
+
+    # A broken main document falls back to the next copy
+    with open(main, 'wb') as f:
+        f.write(b'<html><body>Request Rate Threshold Exceeded</body></html>')
+    os.utime(os.path.dirname(main), (0, 0))
+    assert catalog.latest('AAPL')['path'] == raw
+    assert [f['path'] for f in catalog.invalid()] == [main]
+
+
+def test_packed_only_filings_are_merged(downloads, tmp_path):
+    catalog = FilingCatalog(downloads, check_interval=0)
+    packed = catalog.find('AAPL', '2022-10-28')
+    kept = catalog.find('AAPL', '2023-11-03')
+    store = filing_store.filing_store
+    assert store.pack([packed], remove_originals=True)['removed'] == 1
+    store.pack([kept])
+    # Packed filings outside the downloads tree aren't listed
+    store.pack([{**kept, 'path': _write(str(tmp_path), 'elsewhere/AAPL_2021-10-29.html'), 'date': '2021-10-29'}])
+    catalog.invalidate()
+
+    filings = catalog.filings('AAPL')
+    assert [(f['date'], f['on_disk'], f['company']) for f in filings] == \
+        [('2023-11-03', True, 'Apple Inc.'), ('2022-10-28', False, 'Apple Inc.')]
+    assert catalog.stats()['packed_only'] == 1
+    with catalog.open_filing('AAPL', '2022-10-28') as f:
+        assert f.read().startswith(b'<html><body>\n' + ITEMS)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise SystemExit(pytest.main([__file__, '-q']))
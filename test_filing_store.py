@@ -0,0 +1,138 @@
+import os
+import random
+import logging
+import threading
+import multiprocessing
+
+import pytest
+
+from filing_store import FilingStore, fcntl
+
+FILING = b"<html><body>" + "<p>Item 7. Management’s Discussion and Analysis</p>".encode('utf-8') * 5000 + b"</body></html>"
+
+
+def _filing(tmp_path, name: str = 'AAPL_2023-11-03.html', data: bytes = FILING):
+    path = os.path.join(tmp_path, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return {'path': path, 'ticker': 'AAPL', 'date': '2023-11-03', 'kind': '', 'format': 'html'}
+
+
+def test_nothing_created_until_packed(tmp_path):
+    store = FilingStore(os.path.join(tmp_path, 'store'))
+    assert store.lookup('downloads/AAPL_2023-11-03.html') is None
+    assert store.entries() == []
+    assert store.version() == (0, None)
+    assert store.stats()['filings'] == 0
+    assert store.open_filing('AAPL', '2023-11-03') is None
+    assert not os.path.exists(store.store_dir)
+
+
+def test_pack_and_read_back(tmp_path):
+    store = FilingStore(os.path.join(tmp_path, 'store'))
+    filing = _filing(tmp_path)
+    copy = _filing(tmp_path, 'AAPL_2023-11-03_10K_raw.html')
+    copy['kind'] = '10k_raw'
+    counts = store.pack([filing, copy], remove_originals=True)
+    assert counts['packed'] == 1 and counts['deduplicated'] == 1 and counts['removed'] == 2
+    assert not os.path.exists(filing['path'])
+    with store.open_filing('AAPL', '2023-11-03') as f:
+        assert f.read() == FILING
+    assert store.lookup(filing['path'])['size'] == len(FILING)
+    assert store.stats()['members'] == 1
+
+
+def test_one_connection_per_thread(tmp_path):
+    store = FilingStore(os.path.join(tmp_path, 'store'))
+    store.pack([_filing(tmp_path)])
+    assert store._connect() is store._connect()
+    other = []
+    thread = threading.Thread(target=lambda: other.append(store._connect()))
+    thread.start()
+    thread.join()
+    assert other[0] is not store._connect()
+
+
+def test_changed_filing_is_compacted_away(tmp_path):
+    store = FilingStore(os.path.join(tmp_path, 'store'))
+    filing = _filing(tmp_path)
+    copy = _filing(tmp_path, 'AAPL_2023-11-03_10K_raw.html')
+    store.pack([filing, copy])
+    assert store.stats()['orphaned_bytes'] == 0
+
+    # Re-packing changed bytes appends a new member; the old one stays with the copy
+    changed = FILING.replace(b'Item 7', b'Item 8')
+    _filing(tmp_path, data=changed)
+    os.utime(filing['path'], (0, 0))
+    other = _filing(tmp_path, 'AAPL_2022-10-28.html', data=FILING[::-1])
+    assert store.pack([filing, {**other, 'date': '2022-10-28'}])['packed'] == 2
+    assert store.stats()['orphaned_bytes'] == 0
+
+    # Once the copy changes too, its old member isn't referenced by anything
+    _filing(tmp_path, 'AAPL_2023-11-03_10K_raw.html', data=changed)
+    os.utime(copy['path'], (0, 0))
+    assert store.pack([copy])['deduplicated'] == 1
+    orphaned = store.stats()['orphaned_bytes']
+    assert orphaned > 0
+
+    archive = store.lookup(filing['path'])['archive']
+    assert store.compact() == {'compacted': 1, 'reclaimed_bytes': orphaned}
+    stats = store.stats()
+    assert (stats['orphaned_bytes'], stats['members']) == (0, 2)
+    assert not os.path.exists(os.path.join(store.store_dir, archive))
+    for path, data in ((filing['path'], changed), (copy['path'], changed), (other['path'], FILING[::-1])):
+        with store.open_entry(store.lookup(path)) as f:
+            assert f.read() == data
+    assert store.compact() == {'compacted': 0, 'reclaimed_bytes': 0}
+
+    # Later filings go into the compacted pack and are deduplicated against it
+    again = _filing(tmp_path, 'AAPL_2023-11-03_10K.html', data=changed)
+    assert store.add(again) == 'deduplicated'
+    assert store.lookup(again['path'])['archive'] == store.lookup(filing['path'])['archive']
+
+
+def _pack_in_process(store_dir, paths):
+    store = FilingStore(store_dir)
+    for path in paths:
+        store.add({'path': path, 'ticker': 'AAPL', 'date': os.path.basename(path)[5:15], 'format': 'html'})
+
+
+@pytest.mark.skipif(fcntl is None, reason="cross-process appends need fcntl")
+def test_processes_append_to_one_pack(tmp_path):
+    # Incompressible filings, so every member takes several writes
+    rng = random.Random(0)
+    contents = {}
+    for n in range(12):
+        path = os.path.join(tmp_path, f'AAPL_20{n + 10}-01-01.html')
+        contents[path] = rng.randbytes(600 * 1024)
+        with open(path, 'wb') as f:
+            f.write(contents[path])
+    store_dir = os.path.join(tmp_path, 'store')
+    paths = sorted(contents)
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_pack_in_process, args=(store_dir, paths[n::3])) for n in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [worker.exitcode for worker in workers] == [0, 0, 0]
+
+    store = FilingStore(store_dir)
+    stats = store.stats()
+    assert (stats['filings'], stats['members'], stats['orphaned_bytes']) == (12, 12, 0)
+    for path, data in contents.items():
+        with store.open_entry(store.lookup(path)) as f:
+            assert f.read() == data
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    print("Testing FilingStore...")
+    for test in (test_nothing_created_until_packed, test_pack_and_read_back, test_one_connection_per_thread,
+                 test_changed_filing_is_compacted_away, test_processes_append_to_one_pack):
+        with tempfile.TemporaryDirectory() as directory:
+            test(directory)
+    print("\n✅ Filing store tests passed!")
@@ -0,0 +1,63 @@
+import os
+import logging
+
+from filing_validator import check_filing, MIN_FILING_BYTES
+
+HEAD = (b"<?xml version='1.0' encoding='ASCII'?>\n<html xmlns:ix=\"http://www.xbrl.org/2013/inlineXBRL\">"
+        b"<head><title>aapl-20230930</title></head><body>\n")
+FACT = b'<p>Net sales <ix:nonFraction name="us-gaap:Revenues" unitRef="usd" decimals="-6">383,285</ix:nonFraction></p>\n'
+
+
+def _filing(ending: bytes = b"</body></html>\n") -> bytes:
+    body = FACT * (2 * MIN_FILING_BYTES // len(FACT))
+    return HEAD + body + ending
+
+
+def _write(tmp_path, name: str, data: bytes) -> str:
+    path = os.path.join(tmp_path, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def test_valid_filing(tmp_path):
+    path = _write(tmp_path, "AAPL_2023-11-03.html", _filing())
+    assert check_filing(path) is None
+
+
+def test_valid_filing_with_xbrl_wrapper_end(tmp_path):
+    """Documents cut from a full submission may still end in </XBRL></TEXT>."""
+    path = _write(tmp_path, "AAPL_2023-11-03.html", _filing(b"</body></html>\n</XBRL>\n</TEXT>\n"))
+    assert check_filing(path) is None
+
+
+def test_xbrl_viewer_shell(tmp_path):
+    shell = (b"<!DOCTYPE html><html><head><title>XBRL Viewer</title></head>"
+             b"<body><div id=\"app\"></div><script src=\"ixviewer.js\"></script></body></html>")
+    path = _write(tmp_path, "DOW_2023-02-01_10K.html", shell)
+    assert check_filing(path) == 'xbrl_viewer'
+
+
+def test_truncated_filing(tmp_path):
+    data = _filing()
+    path = _write(tmp_path, "AAPL_2023-11-03.html", data[:len(data) - 5000])
+    assert check_filing(path) == 'truncated'
+
+
+def test_empty_and_missing(tmp_path):
+    assert check_filing(_write(tmp_path, "empty.html", b"")) == 'too_small'
+    assert check_filing(os.path.join(tmp_path, "missing.html")) == 'unreadable'
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    print("Testing check_filing...")
+    for test in (test_valid_filing, test_valid_filing_with_xbrl_wrapper_end, test_xbrl_viewer_shell,
+                 test_truncated_filing, test_empty_and_missing):
+        with tempfile.TemporaryDirectory() as directory:
+            test(directory)
+        print(f"  {test.__name__} passed")
+    print("\n✅ All filing validator tests passed!")
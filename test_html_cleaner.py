@@ -0,0 +1,46 @@
+import mmap
+import logging
+
+import html_cleaner
+from html_cleaner import clean_html, clean_html_buffer, clean_html_file
+
+# No <meta charset>, so nothing in the document says it is UTF-8
+DOCUMENT = '<html><body><p>Company’s revenue — café</p><script>var x = 1;</script></body></html>'
+EXPECTED = 'Company’s revenue — café'
+
+
+def test_clean_html_str():
+    assert clean_html(DOCUMENT, fast=True) == EXPECTED
+    assert clean_html(DOCUMENT, fast=False) == EXPECTED
+
+
+def test_clean_html_buffer_utf8():
+    data = DOCUMENT.encode('utf-8')
+    assert clean_html_buffer(data, fast=True) == EXPECTED
+    assert clean_html_buffer(data, fast=False) == EXPECTED
+
+
+def test_clean_html_buffer_split_characters(tmp_path, monkeypatch):
+    """Multi-byte characters split across chunk boundaries still decode."""
+    monkeypatch.setattr(html_cleaner, 'CHUNK_SIZE', 3)
+    path = tmp_path / 'filing.html'
+    path.write_bytes(DOCUMENT.encode('utf-8'))
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            assert clean_html_buffer(mapped, fast=True) == EXPECTED
+
+
+def test_clean_html_file_utf8(tmp_path):
+    path = tmp_path / 'filing.html'
+    path.write_bytes(DOCUMENT.encode('utf-8'))
+    assert clean_html_file(str(path), fast=True) == EXPECTED
+    assert clean_html_file(str(path), fast=False) == EXPECTED
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    print("Testing HTML cleaning...")
+    test_clean_html_str()
+    test_clean_html_buffer_utf8()
+    print("\n✅ HTML cleaner tests passed!")
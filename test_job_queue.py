@@ -0,0 +1,132 @@
+import time
+import logging
+import threading
+
+import pytest
+
+from analysis_cache import AnalysisCache
+from job_queue import JobQueue, QUEUED, RUNNING, DONE, FAILED
+
+
+def _wait_for(queue, job_id, statuses=(DONE, FAILED), timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} stuck in {job['status']}")
+
+
+def _queue(tmp_path, handler=None, **kwargs):
+    return JobQueue(handler or (lambda payload, progress: payload), db_path=str(tmp_path / 'jobs.db'),
+                    poll_interval=0.05, **kwargs)
+
+
+def test_status_and_result_round_trip(tmp_path):
+    def handler(payload, progress):
+        progress('fetching', done=1, total=2)
+        if payload['ticker'] == 'BAD':
+            raise ValueError("no filings")
+        if payload['ticker'] == 'NONE':
+            return {'error': 'No 10-K filings found'}
+        return {'ticker': payload['ticker'], 'years': [2023, 2022]}
+
+    queue = _queue(tmp_path, handler, workers=1)
+    ok, raised, returned = (queue.submit({'ticker': ticker}) for ticker in ('AAPL', 'BAD', 'NONE'))
+    assert queue.get(ok)['status'] == QUEUED
+    assert queue.get('missing') is None
+    queue.start()
+    try:
+        job = _wait_for(queue, ok)
+        assert job['status'] == DONE
+        assert job['payload'] == {'ticker': 'AAPL'}
+        assert job['result'] == {'ticker': 'AAPL', 'years': [2023, 2022]}
+        assert job['progress'] == {'stage': 'fetching', 'done': 1, 'total': 2}
+        assert job['created_at'] <= job['started_at'] <= job['finished_at']
+
+        job = _wait_for(queue, raised)
+        assert (job['status'], job['error'], job['result']) == (FAILED, 'no filings', None)
+        job = _wait_for(queue, returned)
+        assert (job['status'], job['error']) == (FAILED, 'No 10-K filings found')
+    finally:
+        queue.stop()
+
+
+def test_workers_race_for_one_job(tmp_path):
+    # Two queues on one file stand in for two processes, each with several workers
+    queues = [_queue(tmp_path, workers=0) for _ in range(2)]
+    job_id = queues[0].submit({'ticker': 'AAPL'})
+
+    barrier = threading.Barrier(8)
+    claims = []
+
+    def claim(queue):
+        barrier.wait()
+        claims.append(queue._claim())
+
+    threads = [threading.Thread(target=claim, args=(queues[i % 2],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Every claim completed, and exactly one of them got the job
+    assert len(claims) == 8
+    assert [claim[0] for claim in claims if claim] == [job_id]
+    assert queues[1].get(job_id)['status'] == RUNNING
+
+
+def test_start_requeues_stale_jobs_and_purges_old_ones(tmp_path):
+    queue = _queue(tmp_path, workers=0, stale_after=60, retention=3600)
+    stale, live, old, recent = (queue.submit({'n': n}) for n in range(4))
+    now = time.time()
+    queue._update(stale, status=RUNNING, started_at=now - 120)
+    queue._update(live, status=RUNNING, started_at=now - 10)
+    queue._update(old, status=DONE, result='{}', finished_at=now - 7200)
+    queue._update(recent, status=FAILED, error='boom', finished_at=now - 60)
+
+    queue.start()
+
+    # Only jobs running longer than stale_after are presumed orphaned
+    assert queue.get(stale)['status'] == QUEUED
+    assert queue.get(live)['status'] == RUNNING
+    assert queue.get(old) is None
+    assert queue.get(recent)['status'] == FAILED
+
+
+def test_coalesced_job_gets_leader_progress(tmp_path):
+    cache = AnalysisCache()
+    release = threading.Event()
+
+    def analyze(ticker, progress):
+        progress('summarizing', filings={'2023': 'done'})
+        release.wait(10)
+        return {'ticker': ticker}
+
+    queue = _queue(tmp_path, lambda payload, progress: cache.single_flight(
+        f"analyze:{payload['ticker']}",
+        lambda report: analyze(payload['ticker'], report),
+        progress=progress
+    ), workers=2)
+    queue.start()
+    try:
+        leader = queue.submit({'ticker': 'AAPL'})
+        _wait_for(queue, leader, statuses=(RUNNING,))
+        follower = queue.submit({'ticker': 'AAPL'})
+        deadline = time.time() + 10
+        while not queue.get(follower)['progress'] and time.time() < deadline:
+            time.sleep(0.02)
+        assert queue.get(follower)['progress'] == {'stage': 'summarizing', 'filings': {'2023': 'done'}}
+        release.set()
+
+        assert _wait_for(queue, follower)['result'] == _wait_for(queue, leader)['result'] == {'ticker': 'AAPL'}
+        assert cache.stats()['coalesced'] == 1
+    finally:
+        release.set()
+        queue.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise SystemExit(pytest.main([__file__, '-q']))
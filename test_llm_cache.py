@@ -0,0 +1,62 @@
+import logging
+
+from llm_cache import LLMResponseCache
+
+MODEL = 'gpt-4'
+CONTENT = 'Item 7. Management’s Discussion and Analysis ...'
+METRICS = {'revenue': 383285e6, 'net_income': 96995e6}
+
+
+def test_content_key_covers_metrics_and_prompt_version():
+    key = LLMResponseCache.content_key(MODEL, CONTENT, METRICS, '2')
+    assert key == LLMResponseCache.content_key(MODEL, CONTENT, dict(reversed(list(METRICS.items()))), '2')
+    assert key != LLMResponseCache.content_key(MODEL, CONTENT, {**METRICS, 'revenue': 1.0}, '2')
+    assert key != LLMResponseCache.content_key(MODEL, CONTENT, METRICS, '3')
+    assert key != LLMResponseCache.content_key('gpt-4o', CONTENT, METRICS, '2')
+    assert key != LLMResponseCache.imported_key(MODEL, CONTENT)
+
+
+def test_warm_import_uses_import_alias(tmp_path):
+    analysis_dir = tmp_path / 'analysis'
+    analysis_dir.mkdir()
+    (analysis_dir / 'AAPL_2023_analysis.txt').write_text(CONTENT, encoding='utf-8')
+    (analysis_dir / 'AAPL_2023_summary.md').write_text('Apple grew services revenue.', encoding='utf-8')
+    (analysis_dir / 'MSFT_2023_analysis.txt').write_text('Microsoft', encoding='utf-8')
+    (analysis_dir / 'MSFT_2023_summary.md').write_text('Error: API request failed.', encoding='utf-8')
+
+    cache = LLMResponseCache(cache_dir=str(tmp_path / 'cache'))
+    assert cache.warm_from_analysis_dir(MODEL, str(analysis_dir)) == (1, 1)
+    assert cache.get(cache.imported_key(MODEL, CONTENT)) == 'Apple grew services revenue.'
+    assert cache.get(cache.content_key(MODEL, CONTENT, METRICS, '2')) is None
+    # Already imported entries are left alone
+    assert cache.warm_from_analysis_dir(MODEL, str(analysis_dir)) == (0, 1)
+
+
+def test_round_trip_and_eviction(tmp_path):
+    cache = LLMResponseCache(cache_dir=str(tmp_path), max_bytes=2000)
+    assert cache.get('ab' * 32) is None
+    cache.put('ab' * 32, 'first response', MODEL)
+    assert cache.get('ab' * 32) == 'first response'
+    for i in range(20):
+        cache.put(f"{i:02d}" * 32, 'x' * 200, MODEL)
+    stats = cache.stats()
+    print(f"Stats: {stats}")
+    assert stats['bytes'] <= 2000
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    assert stats['deterministic'] is False
+    assert not hasattr(cache, 'get_or_compute')
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    print("Testing LLMResponseCache...")
+    test_content_key_covers_metrics_and_prompt_version()
+    with tempfile.TemporaryDirectory() as directory:
+        test_warm_import_uses_import_alias(Path(directory))
+    with tempfile.TemporaryDirectory() as directory:
+        test_round_trip_and_eviction(Path(directory))
+    print("\n✅ LLM response cache tests passed!")
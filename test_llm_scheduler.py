@@ -0,0 +1,151 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import logging
+import json
+import time
+
+import llm_scheduler
+from llm_scheduler import LLMScheduler
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Chat completions endpoint that answers slowly and rate limits the first calls."""
+
+    lock = threading.Lock()
+    calls = 0
+    in_flight = 0
+    max_in_flight = 0
+    rate_limited_calls = 2
+    delay = 0.3
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        cls = type(self)
+        with cls.lock:
+            cls.calls += 1
+            call = cls.calls
+        if call <= cls.rate_limited_calls:
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+            return
+
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        time.sleep(cls.delay)
+        with cls.lock:
+            cls.in_flight -= 1
+
+        words = ['Revenue ', 'grew ', 'strongly.']
+        if payload.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            for word in words:
+                chunk = {'choices': [{'delta': {'content': word}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            return
+        body = json.dumps({'choices': [{'message': {'content': ''.join(words)}}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LimitHeadersHandler(FakeOpenAIHandler):
+    """Answers at once, reporting the account's limits like OpenAI does."""
+
+    calls = 0
+    rate_limited_calls = 0
+    delay = 0
+
+    def end_headers(self):
+        self.send_header('x-ratelimit-limit-requests', '5000')
+        self.send_header('x-ratelimit-limit-tokens', '2000000')
+        super().end_headers()
+
+
+def test_llm_scheduler():
+    """Test concurrency, 429 retry-after handling and streaming against a local fake endpoint."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_base = f"http://127.0.0.1:{server.server_port}/v1"
+
+    scheduler = LLMScheduler(api_key='test', api_base=api_base, max_concurrency=4,
+                             requests_per_minute=600, tokens_per_minute=100000, backoff_base=0.1)
+    messages = [{'role': 'user', 'content': 'Summarize this filing.'}]
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: scheduler.complete(messages, max_tokens=100), range(8)))
+    elapsed = time.time() - start
+    stats = scheduler.stats()
+
+    assert results == ['Revenue grew strongly.'] * 8
+    assert FakeOpenAIHandler.max_in_flight <= 4
+    assert stats['rate_limited'] == 2 and stats['completed'] == 8
+    # Both 429s carried Retry-After: 1, so nothing was sent for at least a second
+    assert elapsed >= 1.0
+
+    tokens = list(scheduler.stream(messages, max_tokens=100))
+    assert ''.join(tokens) == 'Revenue grew strongly.'
+
+    # A tokens-per-minute budget of 6,000 refills 100 tokens/second, so once the
+    # burst is spent each 300-token request waits about 3 seconds
+    budgeted = LLMScheduler(api_key='test', api_base=api_base, max_concurrency=4,
+                            requests_per_minute=600, tokens_per_minute=6000)
+    budgeted.token_budget.reserve(6000)  # start with the burst already spent
+    start = time.time()
+    for _ in range(3):
+        budgeted.complete(messages, max_tokens=300 - LLMScheduler.estimate_tokens(messages, 0))
+    elapsed = time.time() - start
+    assert elapsed >= 8.0
+
+    server.shutdown()
+
+
+def test_limits_from_headers(monkeypatch, caplog):
+    """Unconfigured limits follow the response headers, and waits on the token budget are logged."""
+    monkeypatch.delenv('OPENAI_REQUESTS_PER_MINUTE', raising=False)
+    monkeypatch.delenv('OPENAI_TOKENS_PER_MINUTE', raising=False)
+    monkeypatch.setattr(llm_scheduler, 'TPM_WAIT_LOG_SECONDS', 0.1)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), LimitHeadersHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_base = f"http://127.0.0.1:{server.server_port}/v1"
+    messages = [{'role': 'user', 'content': 'Summarize this filing.'}]
+
+    following = LLMScheduler(api_key='test', api_base=api_base)
+    assert (following.requests_per_minute, following.tokens_per_minute) == (500, 10000)
+    following.complete(messages, max_tokens=100)
+    assert (following.requests_per_minute, following.tokens_per_minute) == (5000, 2000000)
+
+    # Explicit limits are kept; 6,000 tokens per minute refills 100 tokens a second
+    configured = LLMScheduler(api_key='test', api_base=api_base, tokens_per_minute=6000)
+    configured.token_budget.reserve(6000)  # start with the burst already spent
+    with caplog.at_level(logging.INFO, logger='llm_scheduler'):
+        configured.complete(messages, max_tokens=20 - LLMScheduler.estimate_tokens(messages, 0))
+    assert configured.tokens_per_minute == 6000
+    assert configured.requests_per_minute == 5000
+    assert configured.stats()['tpm_waits'] == 1
+    assert any('tokens-per-minute budget' in record.getMessage() for record in caplog.records)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    # Set up logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    test_llm_scheduler()
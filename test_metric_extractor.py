@@ -0,0 +1,100 @@
+import re
+import logging
+
+from html_cleaner import clean_html
+from metric_extractor import metric_extractor
+from xbrl_facts import XBRLFactExtractor
+from test_xbrl_facts import DOCUMENT as XBRL_DOCUMENT
+
+NUMBER = r'(\$?\d+(?:,\d{3})*(?:\.\d+)?)'
+# The per-metric patterns MetricExtractor replaced, in priority order
+BASELINE_PATTERNS = {
+    'revenue': [r'(?:revenue|sales|net sales)', r'(?:total revenue|total sales)',
+                r'(?:consolidated revenue|consolidated sales)'],
+    'net_income': [r'(?:net income|net earnings|net profit)', r'(?:net loss)', r'(?:consolidated net income)'],
+    'total_equity': [r'(?:total equity|shareholders equity|stockholders equity)',
+                     r'(?:total stockholders equity)', r'(?:total shareholders equity)'],
+}
+
+SAMPLES = [
+    "Total revenues were $1,234 million. Net income 55. Net sales 77",
+    "Net sales increased 8% to $394,328 million. Net income was $99,803 million.",
+    "Revenues 23,601 22,680 Cost of revenues 12,114",
+    "Consolidated net sales were 5,000. Net earnings of $1,200 were reported.",
+    "Total stockholders equity 62,146 50,672 Total liabilities and equity 352,583",
+    "Total shareholders equity at year end was $90,488 million",
+]
+
+
+def baseline_extract(content: str):
+    metrics = {}
+    for metric, patterns in BASELINE_PATTERNS.items():
+        for pattern in patterns:
+            match = re.search(pattern + r'.*?' + NUMBER, content, re.IGNORECASE)
+            if match:
+                value = float(match.group(1).replace('$', '').replace(',', ''))
+                metrics[metric] = -value if 'loss' in match.group(0).lower() else value
+                break
+    return metrics
+
+
+def test_matches_baseline():
+    for sample in SAMPLES:
+        expected = baseline_extract(sample)
+        metrics, positions = metric_extractor.extract(sample)
+        for metric, value in expected.items():
+            # The baseline returned the figure as printed; MetricExtractor scales it to dollars
+            assert metrics.get(metric) == value * positions[metric]['scale'], (sample, metric, metrics, positions)
+
+
+def test_plural_labels():
+    metrics, positions = metric_extractor.extract("Total revenues were $1,234 million. Net income 55. Net sales 77")
+    assert metrics['revenue'] == 1234e6
+    assert positions['revenue']['label'] == 'Total revenues'
+
+
+def test_apostrophe_equity():
+    plain, _ = metric_extractor.extract("Total stockholders equity 62,146")
+    curly, _ = metric_extractor.extract("Total stockholders’ equity 62,146")
+    straight, _ = metric_extractor.extract("Total stockholders' equity 62,146")
+    assert plain['total_equity'] == curly['total_equity'] == straight['total_equity'] == 62146.0
+
+
+def test_scale_header():
+    metrics, positions = metric_extractor.extract(
+        "(In millions, except number of shares, which are reflected in thousands, and per-share amounts) "
+        "Total net sales 394,328 Net income 99,803 Diluted earnings per share 6.11")
+    assert metrics['revenue'] == 394328e6
+    assert metrics['net_income'] == 99803e6
+    assert metrics['eps'] == 6.11
+    assert positions['revenue']['scale'] == 1e6
+
+
+def test_prose_year_matches_xbrl_year():
+    """A year without inline XBRL falls back to the prose extractor; both must be in dollars."""
+    xbrl_year = XBRLFactExtractor().extract(XBRL_DOCUMENT)
+    prose_year, _ = metric_extractor.extract(clean_html(
+        '<html><body><p>CONSOLIDATED STATEMENTS OF OPERATIONS (In millions)</p>'
+        '<table><tr><td>Total net sales</td><td>394,328</td></tr>'
+        '<tr><td>Net income</td><td>99,803</td></tr></table></body></html>'))
+    for metric in ('revenue', 'net_income'):
+        change = (xbrl_year[metric] - prose_year[metric]) / prose_year[metric]
+        assert -0.1 < change < 0, (metric, xbrl_year[metric], prose_year[metric])
+
+
+def test_bytes_match_str():
+    for sample in SAMPLES + ["Total stockholders’ equity 62,146"]:
+        assert metric_extractor.extract(sample.encode('utf-8'))[0] == metric_extractor.extract(sample)[0]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    print("Testing MetricExtractor...")
+    test_matches_baseline()
+    test_plural_labels()
+    test_apostrophe_equity()
+    test_scale_header()
+    test_prose_year_matches_xbrl_year()
+    test_bytes_match_str()
+    print("\n✅ All metric extractor tests passed!")
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import threading
+
+import pytest
+
+import rate_limiter
+from rate_limiter import SECRateLimiter, fcntl
+
+
+class FakeClock:
+    """Frozen clock; records each sleep and checks the sleeper holds no lock."""
+
+    def __init__(self, limiter_lock=None, state_path=None):
+        self.now = 1000.0
+        self.sleeps = []
+        self.sleeps_under_lock = 0
+        self.lock = threading.Lock()
+        self.limiter_lock = limiter_lock
+        self.state_path = state_path
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, delay):
+        # Counted rather than asserted, since a failure in a worker thread wouldn't fail the test
+        held = self.limiter_lock is not None and self.limiter_lock.owner == threading.get_ident()
+        if self.state_path:
+            # If another descriptor can take the flock, the sleeper isn't holding it
+            with open(self.state_path, 'rb') as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                except BlockingIOError:
+                    held = True
+        with self.lock:
+            self.sleeps.append(delay)
+            self.sleeps_under_lock += held
+
+
+class OwnedLock:
+    """threading.Lock that remembers which thread holds it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.owner = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.owner = threading.get_ident()
+
+    def __exit__(self, *exc):
+        self.owner = None
+        self._lock.release()
+
+
+def _limiter(clock, **kwargs):
+    limiter = SECRateLimiter(requests_per_second=10, clock=clock, sleep=clock.sleep, **kwargs)
+    limiter.lock = clock.limiter_lock = OwnedLock()
+    return limiter
+
+
+def test_threads_share_the_rate():
+    clock = FakeClock()
+    limiter = _limiter(clock)
+    threads = [threading.Thread(target=limiter.wait_for_token) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # With time frozen, the first request goes straight away and each later one
+    # waits one more interval: 20 requests span 20 / 10 req/s
+    assert sorted(clock.sleeps) == pytest.approx([n * 0.1 for n in range(1, 20)])
+    assert clock.sleeps_under_lock == 0
+    assert limiter.next_time == pytest.approx(clock.now + 2.0)
+
+
+def test_burst_then_steady_rate():
+    clock = FakeClock()
+    limiter = _limiter(clock, burst=3)
+    delays = [limiter.reserve() for _ in range(5)]
+    assert delays == pytest.approx([0, 0, 0, 0.1, 0.2])
+
+    # An idle bucket refills, but never beyond the burst
+    clock.now += 10
+    assert [limiter.reserve() for _ in range(4)] == pytest.approx([0, 0, 0, 0.1])
+
+
+def test_weighted_advance():
+    limiter = SECRateLimiter(requests_per_second=10)
+    # The caller waits for its last token to conform
+    assert limiter._advance(0.0, 0.0, 3) == pytest.approx((0.2, 0.3))
+    assert limiter._advance(0.3, 0.0, 1) == pytest.approx((0.3, 0.4))
+
+    bursty = SECRateLimiter(requests_per_second=10, burst=5)
+    assert bursty._advance(0.0, 0.0, 3) == pytest.approx((0.0, 0.3))
+    assert bursty._advance(0.3, 0.0, 3) == pytest.approx((0.1, 0.6))
+
+
+def test_acquire_async(monkeypatch):
+    clock = FakeClock()
+    limiter = _limiter(clock)
+
+    async def fake_sleep(delay):
+        clock.sleep(delay)
+
+    async def acquire_all():
+        await asyncio.gather(*(limiter.acquire_async() for _ in range(5)))
+
+    monkeypatch.setattr(rate_limiter.asyncio, 'sleep', fake_sleep)
+    asyncio.run(acquire_all())
+    assert sorted(clock.sleeps) == pytest.approx([0.1, 0.2, 0.3, 0.4])
+    assert clock.sleeps_under_lock == 0
+
+
+@pytest.mark.skipif(fcntl is None, reason="shared state needs fcntl")
+def test_shared_state_file(tmp_path):
+    state_path = str(tmp_path / 'state' / 'sec_rate')
+    clock = FakeClock(state_path=state_path)
+    first = _limiter(clock, shared_state_path=state_path)
+    second = SECRateLimiter(requests_per_second=10, shared_state_path=state_path, clock=clock, sleep=clock.sleep)
+
+    # Two limiters on one file (as in two worker processes) draw from one budget
+    delays = [limiter.reserve() for limiter in (first, second, first, second)]
+    assert delays == pytest.approx([0, 0.1, 0.2, 0.3])
+
+    threads = [threading.Thread(target=limiter.wait_for_token) for limiter in (first, second) * 3]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(clock.sleeps) == pytest.approx([0.4, 0.5, 0.6, 0.7, 0.8, 0.9])
+    assert clock.sleeps_under_lock == 0
+
+    # Each limiter kept its in-memory state untouched
+    assert first.next_time == second.next_time == 0.0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import logging
+
+import pytest
+
+import filing_validator
+from filing_catalog import catalog_for
+from html_cleaner import clean_html_file
+from search_index import FilingSearchIndex, build_match_query, SECTION_ROWIDS
+
+
+def _filing(business: str, risks: str = "Competition is intense.") -> str:
+    return (
+        '<html><body>\n<p>Annual Report on Form 10-K</p>\n'
+        f'<p>ITEM 1. BUSINESS</p>\n<p>{business}</p>\n'
+        f'<p>ITEM 1A. RISK FACTORS</p>\n<p>{risks}</p>\n'
+        '<p>ITEM 7. MANAGEMENT\'S DISCUSSION AND ANALYSIS</p>\n<p>Net sales grew.</p>\n'
+        '<p>ITEM 8. FINANCIAL STATEMENTS AND SUPPLEMENTARY DATA</p>\n<p>See the statements.</p>\n'
+        '</body></html>\n'
+    )
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    # The fixture filings are far smaller than a real 10-K
+    monkeypatch.setattr(filing_validator, 'MIN_FILING_BYTES', 0)
+    base = tmp_path / 'downloads'
+    for ticker, date, business in (('AAPL', '2023-11-03', 'We design smartphones and wearables.'),
+                                   ('XOM', '2024-02-28', 'We explore for crude oil and natural gas.')):
+        path = base / 'Sector' / ticker / date[:4] / f'{ticker}_{date}.html'
+        path.parent.mkdir(parents=True)
+        path.write_text(_filing(business), encoding='utf-8')
+    return base
+
+
+class Preparer:
+    """Stands in for prepare_filing and records which filings it was asked for."""
+
+    def __init__(self):
+        self.paths = []
+
+    def __call__(self, path):
+        self.paths.append(os.path.basename(path))
+        return {'cleaned': clean_html_file(path), 'sections': None}
+
+
+def _index(tmp_path):
+    return FilingSearchIndex(db_path=str(tmp_path / 'search.db'))
+
+
+def test_build_match_query():
+    assert build_match_query('supply chain') == '"supply" "chain"'
+    assert build_match_query('"supply chain" OR tariffs') == '"supply chain" OR "tariffs"'
+    assert build_match_query('climat* NOT weather') == '"climat"* NOT "weather"'
+    # Punctuation and FTS5 syntax in words can't reach the MATCH expression
+    assert build_match_query('S&P 10-K') == '"S P" "10 K"'
+    assert build_match_query('text:revenue NEAR(a b) ^start') == '"text revenue" "NEAR a" "b" "start"'
+    assert build_match_query('"unbalanced quote') == '"unbalanced" "quote"'
+    # Dangling operators are dropped; nothing searchable leaves an empty query
+    assert build_match_query('AND revenue OR') == '"revenue"'
+    for empty in ('', '   ', '""', 'AND OR NOT', '*', '()'):
+        assert build_match_query(empty) == ''
+
+
+def test_search(tmp_path, downloads):
+    index = _index(tmp_path)
+    index.update(Preparer(), base_dir=str(downloads))
+
+    results = index.search('crude oil')
+    assert [(r['ticker'], r['filing_date'], r['year'], r['item']) for r in results] == \
+        [('XOM', '2024-02-28', 2024, '1')]
+    assert '<mark>crude</mark>' in results[0]['snippet']
+    assert [r['ticker'] for r in index.search('smartphone*')] == ['AAPL']
+    assert [r['item'] for r in index.search('competition', ticker='aapl')] == ['1A']
+    assert index.search('competition', year=2022) == []
+    for query in ('', '"', 'NEAR(', 'sales AND'):
+        assert isinstance(index.search(query), list)
+
+
+def test_incremental_update(tmp_path, downloads):
+    index = _index(tmp_path)
+    prepare = Preparer()
+    assert index.update(prepare, base_dir=str(downloads)) == \
+        {'indexed': 2, 'failed': 0, 'removed': 0, 'unchanged': 0}
+
+    prepare.paths.clear()
+    assert index.update(prepare, base_dir=str(downloads))['unchanged'] == 2
+    assert prepare.paths == []
+
+    # Same size, newer mtime
+    aapl = downloads / 'Sector' / 'AAPL' / '2023' / 'AAPL_2023-11-03.html'
+    stat = aapl.stat()
+    os.utime(aapl, (stat.st_atime, stat.st_mtime + 10))
+    assert index.update(prepare, base_dir=str(downloads))['indexed'] == 1
+    assert prepare.paths == ['AAPL_2023-11-03.html']
+
+    # New size, same mtime
+    prepare.paths.clear()
+    stat = aapl.stat()
+    aapl.write_text(_filing('We design smartphones, wearables and services.'), encoding='utf-8')
+    os.utime(aapl, (stat.st_atime, stat.st_mtime))
+    assert index.update(prepare, base_dir=str(downloads))['indexed'] == 1
+    assert prepare.paths == ['AAPL_2023-11-03.html']
+    assert [r['ticker'] for r in index.search('services')] == ['AAPL']
+
+    # A deleted filing's rows leave the index
+    (downloads / 'Sector' / 'XOM' / '2024' / 'XOM_2024-02-28.html').unlink()
+    catalog_for(str(downloads)).invalidate()
+    assert index.update(prepare, base_dir=str(downloads))['removed'] == 1
+    assert index.search('crude') == []
+    assert index.stats()['documents'] == 1
+
+
+def test_section_rowids(tmp_path, downloads):
+    index = _index(tmp_path)
+    index.update(Preparer(), base_dir=str(downloads))
+    aapl = str(downloads / 'Sector' / 'AAPL' / '2023' / 'AAPL_2023-11-03.html')
+
+    def rows():
+        with sqlite3.connect(index.db_path) as conn:
+            documents = dict(conn.execute('SELECT ticker, id FROM documents'))
+            sections = conn.execute('SELECT rowid, item FROM sections ORDER BY rowid').fetchall()
+        return documents, sections
+
+    documents, sections = rows()
+    # The cover page, then Items 1, 1A, 7 and 8, at doc_id * SECTION_ROWIDS + n
+    for doc_id in documents.values():
+        assert [(rowid, item) for rowid, item in sections if rowid // SECTION_ROWIDS == doc_id] == [
+            (doc_id * SECTION_ROWIDS + n, item) for n, item in enumerate(['', '1', '1A', '7', '8'])
+        ]
+
+    # Re-indexing with fewer sections replaces the filing's whole rowid range
+    # and leaves the other filing alone
+    assert index.index_document('AAPL', '2023-11-03', aapl, 'Just a cover page') == 1
+    _, after = rows()
+    assert [row for row in after if row[0] // SECTION_ROWIDS == documents['AAPL']] == \
+        [(documents['AAPL'] * SECTION_ROWIDS, '')]
+    assert [row for row in after if row[0] // SECTION_ROWIDS == documents['XOM']] == \
+        [row for row in sections if row[0] // SECTION_ROWIDS == documents['XOM']]
+
+
+def test_status(tmp_path, downloads):
+    index = _index(tmp_path)
+    status = index.status(str(downloads))
+    assert status == {'documents': 0, 'indexed_at': None, 'pending': 2, 'removed': 0, 'stale': True}
+
+    index.update(Preparer(), base_dir=str(downloads))
+    status = index.status(str(downloads))
+    assert (status['documents'], status['pending'], status['removed'], status['stale']) == (2, 0, 0, False)
+    assert status['indexed_at'] is not None
+
+    (downloads / 'Sector' / 'XOM' / '2024' / 'XOM_2024-02-28.html').unlink()
+    catalog_for(str(downloads)).invalidate()
+    status = index.status(str(downloads))
+    assert (status['documents'], status['pending'], status['removed'], status['stale']) == (2, 0, 1, True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise SystemExit(pytest.main([__file__, '-q']))
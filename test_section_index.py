@@ -0,0 +1,101 @@
+import os
+import json
+import logging
+
+import pytest
+
+import filing_store
+from filing_store import FilingStore
+from html_cleaner import clean_html_file
+from section_index import (get_section_index, load_section_index, read_section, read_raw_section,
+                           find_raw_sections, index_path, cleaned_path)
+
+# Tags and entities between "Item" and its number, as real filings have them,
+# and non-ASCII text so character and byte offsets differ
+FILING = (
+    '<html><body>\n'
+    '<p><a href="#i1">Item 1. Business</a></p>\n<p><a href="#i7">Item 7. Management</a></p>\n'
+    '<p id="i1"><b>ITEM&#160;1. BUSINESS</b></p>\n<p>We make phones — in Zürich.</p>\n'
+    '<p><b>ITEM</b> <span>1A.</span> <b>RISK FACTORS</b></p>\n<p>Competition is intense.</p>\n'
+    '<p id="i7">ITEM&nbsp;7. MANAGEMENT&#8217;S DISCUSSION AND ANALYSIS</p>\n<p>Net sales grew 8%.</p>\n'
+    '<p>ITEM 8. FINANCIAL STATEMENTS AND SUPPLEMENTARY DATA</p>\n<p>Statements.</p>\n'
+    '</body></html>\n'
+)
+
+
+@pytest.fixture
+def filing(tmp_path, monkeypatch):
+    # An empty store of our own, so nothing packed elsewhere shows up
+    monkeypatch.setattr(filing_store, 'filing_store', FilingStore(str(tmp_path / 'store')))
+    path = tmp_path / 'AAPL' / '2023' / 'AAPL_2023-11-03.html'
+    path.parent.mkdir(parents=True)
+    path.write_text(FILING, encoding='utf-8')
+    return str(path)
+
+
+def test_raw_sections_skip_table_of_contents(filing):
+    with open(filing, 'rb') as f:
+        raw = f.read()
+    sections = find_raw_sections(raw)
+    assert list(sections) == ['1', '1A', '7', '8']
+    assert raw[sections['1']['start']:].startswith(b'ITEM&#160;1. BUSINESS')
+    assert raw[sections['1A']['start']:].startswith(b'ITEM</b> <span>1A.')
+    assert sections['1']['end'] == sections['1A']['start']
+    assert sections['8']['end'] == len(raw)
+
+
+def test_index_round_trip(filing):
+    cleaned = clean_html_file(filing)
+    assert load_section_index(filing) is None
+    index = get_section_index(filing, cleaned)
+    assert set(index['sections']) == {'1', '1A', '7', '8'}
+    assert os.path.exists(index_path(filing)) and os.path.exists(cleaned_path(filing))
+    assert load_section_index(filing) == index
+
+    # Byte offsets into the cleaned file land on the same text as the character offsets
+    business = read_section(filing, '1')
+    section = index['sections']['1']
+    assert business == cleaned[section['start']:section['end']]
+    assert 'Zürich' in business and 'Competition' not in business
+    assert read_section(filing, '1a').startswith('ITEM 1A')
+    assert read_section(filing, '9A') is None
+
+    assert read_raw_section(filing, '7').startswith(b'ITEM&nbsp;7.')
+    assert b'Net sales grew 8%.' in read_raw_section(filing, '7')
+    # Without cleaned text a missing index can't be built
+    assert get_section_index(filing + '.missing') is None
+
+
+def test_stale_index_is_rebuilt(filing):
+    get_section_index(filing, clean_html_file(filing))
+
+    with open(filing, 'a', encoding='utf-8') as f:
+        f.write('<p>Amended.</p>\n')
+    assert load_section_index(filing) is None
+    assert read_section(filing, '1') is None
+    index = get_section_index(filing, clean_html_file(filing))
+    assert index['raw_size'] == os.path.getsize(filing)
+
+    with open(index_path(filing), 'r', encoding='utf-8') as f:
+        stored = json.load(f)
+    with open(index_path(filing), 'w', encoding='utf-8') as f:
+        json.dump({**stored, 'version': '0'}, f)
+    assert load_section_index(filing) is None
+
+
+def test_raw_section_from_the_filing_store(filing):
+    get_section_index(filing, clean_html_file(filing))
+    expected = read_raw_section(filing, '1A')
+    store = filing_store.filing_store
+    assert store.pack([{'path': filing, 'ticker': 'AAPL', 'date': '2023-11-03'}],
+                      remove_originals=True)['removed'] == 1
+
+    # The index still matches the packed copy's size and mtime
+    assert not os.path.exists(filing)
+    assert read_raw_section(filing, '1A') == expected
+    assert read_section(filing, '1A').startswith('ITEM 1A')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise SystemExit(pytest.main([__file__, '-q']))
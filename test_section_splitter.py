@@ -0,0 +1,83 @@
+import logging
+
+import pytest
+
+from section_splitter import find_sections, split_sections, chunk_text
+
+# A table of contents, cross-references in mixed case and a heading run into
+# the previous line, the way cleaned filings come out
+FILING = (
+    "Annual Report on Form 10-K\n"
+    "Table of Contents\n"
+    "Item 1. Business 4\n"
+    "Item 1A. Risk Factors 12\n"
+    "Item 7. Management's Discussion and Analysis 30\n"
+    "Item 8. Financial Statements and Supplementary Data 45\n"
+    "PART I\n"
+    "ITEM 1. BUSINESS\n"
+    "We make phones. See Item 7, Management's Discussion, for results.\n"
+    "ITEM 1A. RISK FACTORS\n"
+    "Competition is intense. Item 8 of this Form 10-K has the statements.\n"
+    "PART II\n"
+    "ITEM 5. MARKET FOR REGISTRANT'S COMMON EQUITY\n"
+    "Shares trade on Nasdaq.\n"
+    "Table of ContentsITEM 7. MANAGEMENT'S DISCUSSION AND ANALYSIS\n"
+    "Net sales grew 8%.\n"
+    "ITEM 8. FINANCIAL STATEMENTS AND SUPPLEMENTARY DATA\n"
+    "Balance sheets follow.\n"
+)
+
+
+def test_find_sections_skips_table_of_contents():
+    sections = find_sections(FILING)
+    assert list(sections) == ['1', '1A', '5', '7', '8']
+    assert FILING[sections['1']['start']:].startswith('ITEM 1. BUSINESS')
+    assert FILING[sections['7']['start']:].startswith("ITEM 7. MANAGEMENT'S")
+    # Each section runs to the next one's heading, the last to the end of the text
+    assert sections['1']['end'] == sections['1A']['start']
+    assert sections['8']['end'] == len(FILING)
+
+
+def test_split_sections():
+    sections = split_sections(FILING)
+    # Item 7A isn't in the filing and Item 5 wasn't asked for
+    assert list(sections) == ['1', '1A', '7', '8']
+    assert sections['1'] == (
+        "ITEM 1. BUSINESS\n"
+        "We make phones. See Item 7, Management's Discussion, for results.\n"
+    )
+    # The Item 8 cross-reference stays inside Item 1A
+    assert sections['1A'].endswith("Item 8 of this Form 10-K has the statements.\nPART II\n")
+    assert sections['7'].endswith("Net sales grew 8%.\n")
+    assert list(split_sections(FILING, ['8', '1'])) == ['8', '1']
+
+
+def test_mixed_case_headings_when_nothing_is_in_capitals():
+    text = (
+        "Item 1. Business 4\nItem 1A. Risk Factors 12\n"
+        "Item 1. Business\nWe make phones.\n"
+        "Item 1A. Risk Factors\nCompetition is intense.\n"
+    )
+    # With no capitalized titles the latest candidate before the next item wins
+    assert split_sections(text) == {
+        '1': "Item 1. Business\nWe make phones.\n",
+        '1A': "Item 1A. Risk Factors\nCompetition is intense.\n",
+    }
+    assert split_sections('No items here.') == {}
+
+
+def test_chunk_text():
+    text = 'One sentence here. Another one follows. ' * 10
+    chunks = chunk_text(text, 50)
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    # Cuts fall on sentence ends and nothing is lost but whitespace
+    assert all(chunk.endswith('.') for chunk in chunks)
+    assert ' '.join(chunks) == text.strip()
+    # Without a sentence end in reach the text is cut at the limit
+    assert chunk_text('x' * 120, 50) == ['x' * 50, 'x' * 50, 'x' * 20]
+    assert chunk_text('   ', 50) == []
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raise SystemExit(pytest.main([__file__, '-q']))
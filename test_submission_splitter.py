@@ -0,0 +1,89 @@
+import logging
+
+from submission_splitter import SubmissionSplitter
+
+PRIMARY = (b"<?xml version='1.0' encoding='ASCII'?>\n<html><head><title>aapl-20230930</title></head>\n"
+           b"<body><p>Item 1. Business</p><p>" + b"x" * 500 + b"</p></body></html>\n")
+EXHIBIT = b"<html><body><p>Subsidiaries of the Registrant</p></body></html>\n"
+
+SUBMISSION = (
+    b"<SEC-DOCUMENT>0000320193-23-000106.txt : 20231103\n"
+    b"<SEC-HEADER>0000320193-23-000106.hdr.sgml : 20231103\n</SEC-HEADER>\n"
+    b"<DOCUMENT>\n<TYPE>10-K\n<SEQUENCE>1\n<FILENAME>aapl-20230930.htm\n<DESCRIPTION>10-K\n"
+    b"<TEXT>\n<XBRL>\n" + PRIMARY + b"</XBRL>\n</TEXT>\n</DOCUMENT>\n"
+    b"<DOCUMENT>\n<TYPE>EX-21.1\n<SEQUENCE>2\n<FILENAME>a10-kexhibit2111.htm\n"
+    b"<TEXT>\n" + EXHIBIT + b"</TEXT>\n</DOCUMENT>\n"
+    b"<DOCUMENT>\n<TYPE>GRAPHIC\n<SEQUENCE>3\n<FILENAME>logo.jpg\n"
+    b"<TEXT>\nbegin 644 logo.jpg\nM_]C_X``02D9)1@`!`0$`8`!@``#_\nend\n</TEXT>\n</DOCUMENT>\n"
+    b"</SEC-DOCUMENT>\n"
+)
+
+# Small sizes split every tag (<TEXT>, <XBRL>, </XBRL>, </TEXT>) across chunks somewhere
+CHUNK_SIZES = (1, 2, 3, 5, 7, 11, 64, 1 << 20)
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_primary_document_unwrapped():
+    """The 10-K body comes out without its <XBRL> wrapper at every chunk size."""
+    for size in CHUNK_SIZES:
+        splitter = SubmissionSplitter()
+        output = b''.join(splitter.filter(_chunks(SUBMISSION, size)))
+        print(f"chunk size {size}: {len(output)} bytes out, stopped early: {splitter.stopped_early}")
+        assert output == PRIMARY
+        assert splitter.bytes_out == len(PRIMARY)
+        assert splitter.stopped_early
+        assert splitter.primary['type'] == '10-K'
+        assert splitter.primary['filename'] == 'aapl-20230930.htm'
+
+
+def test_exhibits_kept():
+    """Wanted exhibits follow the primary document; unwanted documents are dropped."""
+    for size in CHUNK_SIZES:
+        splitter = SubmissionSplitter(exhibits=('EX-21',))
+        output = b''.join(splitter.filter(_chunks(SUBMISSION, size)))
+        assert output == PRIMARY + EXHIBIT
+        assert [document['type'] for document in splitter.documents] == ['10-K', 'EX-21.1', 'GRAPHIC']
+        assert [document['kept'] for document in splitter.documents] == [True, True, False]
+        assert splitter.bytes_in == len(SUBMISSION)
+
+
+def test_pdf_wrapper_unwrapped():
+    body = b"begin 644 report.pdf\nM)5!$1BTQ+C0*\nend\n"
+    submission = (b"<SEC-DOCUMENT>\n<DOCUMENT>\n<TYPE>10-K\n<TEXT>\r\n<PDF>\r\n" + body +
+                  b"</PDF>\r\n</TEXT>\n</DOCUMENT>\n</SEC-DOCUMENT>\n")
+    for size in CHUNK_SIZES:
+        output = b''.join(SubmissionSplitter().filter(_chunks(submission, size)))
+        assert output == body
+
+
+def test_unwrapped_body_kept_intact():
+    """A body that merely mentions the wrapper tags is not trimmed."""
+    body = b"<html><body><p>Tagged with &lt;XBRL&gt;</p></body></html>\n"
+    submission = b"<SEC-DOCUMENT>\n<DOCUMENT>\n<TYPE>10-K\n<TEXT>\n" + body + b"</TEXT>\n</DOCUMENT>\n"
+    for size in CHUNK_SIZES:
+        output = b''.join(SubmissionSplitter().filter(_chunks(submission, size)))
+        assert output == body
+
+
+def test_plain_html_passthrough():
+    html = b"<html><body>" + b"<p>Item 7. Management's Discussion</p>" * 400 + b"</body></html>"
+    splitter = SubmissionSplitter()
+    output = b''.join(splitter.filter(_chunks(html, 1000)))
+    assert output == html
+    assert splitter.passthrough
+    assert splitter.documents == []
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    print("Testing SubmissionSplitter...")
+    test_primary_document_unwrapped()
+    test_exhibits_kept()
+    test_pdf_wrapper_unwrapped()
+    test_unwrapped_body_kept_intact()
+    test_plain_html_passthrough()
+    print("\n✅ All submission splitter tests passed!")
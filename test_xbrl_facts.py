@@ -0,0 +1,49 @@
+import logging
+
+from xbrl_facts import XBRLFactExtractor
+
+DOCUMENT = (
+    '<html><body><ix:header><ix:resources>'
+    '<xbrli:context id="FY2023"><xbrli:entity>x</xbrli:entity><xbrli:period>'
+    '<xbrli:startDate>2022-10-01</xbrli:startDate><xbrli:endDate>2023-09-30</xbrli:endDate>'
+    '</xbrli:period></xbrli:context>'
+    '<xbrli:context id="FY2023_seg"><xbrli:entity><xbrli:segment>Products</xbrli:segment></xbrli:entity>'
+    '<xbrli:period><xbrli:startDate>2022-10-01</xbrli:startDate><xbrli:endDate>2023-09-30</xbrli:endDate>'
+    '</xbrli:period></xbrli:context>'
+    '<xbrli:context id="I2023"><xbrli:period><xbrli:instant>2023-09-30</xbrli:instant></xbrli:period>'
+    '</xbrli:context>'
+    '</ix:resources></ix:header>'
+    '<p>Fiscal year ended <ix:nonNumeric name="dei:DocumentPeriodEndDate" contextRef="FY2023">'
+    'September 30, 2023</ix:nonNumeric> — Company’s results</p>'
+    '<p>Net sales <ix:nonFraction name="us-gaap:Revenues" contextRef="FY2023" scale="6" '
+    'format="ixt:num-dot-decimal">383,285</ix:nonFraction></p>'
+    '<p>Products <ix:nonFraction name="us-gaap:Revenues" contextRef="FY2023_seg" scale="6">'
+    '298,085</ix:nonFraction></p>'
+    '<p>Net income <ix:nonFraction name="us-gaap:NetIncomeLoss" contextRef="FY2023" scale="6">'
+    '96,995</ix:nonFraction></p>'
+    '<p>Total assets <ix:nonFraction name="us-gaap:Assets" contextRef="I2023" scale="6">'
+    '352,583</ix:nonFraction></p>'
+    '</body></html>'
+)
+
+
+def test_extract():
+    metrics = XBRLFactExtractor().extract(DOCUMENT)
+    assert metrics['revenue'] == 383285e6
+    assert metrics['net_income'] == 96995e6
+    assert metrics['total_assets'] == 352583e6
+
+
+def test_buffer_matches_text():
+    """The bytes scan finds the same facts as the chunked text scan."""
+    extractor = XBRLFactExtractor(chunk_size=7)
+    assert extractor.extract_buffer(DOCUMENT.encode('utf-8')) == extractor.extract(DOCUMENT)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    print("Testing XBRLFactExtractor...")
+    test_extract()
+    test_buffer_matches_text()
+    print("\n✅ XBRL fact extractor tests passed!")
@@ -0,0 +1,218 @@
+import re
+import html
+from datetime import datetime, date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from metric_extractor import add_derived_metrics
+
+# us-gaap concepts per metric, most specific first
+METRIC_CONCEPTS = {
+    'revenue': [
+        'us-gaap:Revenues',
+        'us-gaap:RevenueFromContractWithCustomerExcludingAssessedTax',
+        'us-gaap:RevenueFromContractWithCustomerIncludingAssessedTax',
+        'us-gaap:SalesRevenueNet',
+    ],
+    'gross_profit': ['us-gaap:GrossProfit'],
+    'operating_income': ['us-gaap:OperatingIncomeLoss'],
+    'net_income': ['us-gaap:NetIncomeLoss', 'us-gaap:ProfitLoss'],
+    'eps': ['us-gaap:EarningsPerShareDiluted', 'us-gaap:EarningsPerShareBasic'],
+    'free_cash_flow': [
+        'us-gaap:NetCashProvidedByUsedInOperatingActivities',
+        'us-gaap:NetCashProvidedByUsedInOperatingActivitiesContinuingOperations',
+    ],
+    'total_assets': ['us-gaap:Assets'],
+    'total_equity': [
+        'us-gaap:StockholdersEquity',
+        'us-gaap:StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest',
+    ],
+}
+WANTED_CONCEPTS = {concept for concepts in METRIC_CONCEPTS.values() for concept in concepts}
+
+# One alternation over the three element kinds we need; everything else is skipped
+ELEMENT_RE = re.compile(
+    r'<(?:'
+    r'ix:nonFraction\b(?P<fact_attrs>[^>]*?)(?<!/)>(?P<fact_value>.*?)</ix:nonFraction>'
+    r'|xbrli:context\b(?P<context_attrs>[^>]*)>(?P<context_body>.*?)</xbrli:context>'
+    r'|ix:nonNumeric\b(?=[^>]*name="dei:DocumentPeriodEndDate")[^>]*>(?P<period_end>.*?)</ix:nonNumeric>'
+    r')',
+    re.IGNORECASE | re.DOTALL
+)
+# The same alternation over UTF-8 bytes or an mmap of them
+ELEMENT_BYTES_RE = re.compile(ELEMENT_RE.pattern.encode(), re.IGNORECASE | re.DOTALL)
+# Start of an element that may be cut off at a chunk boundary
+PARTIAL_RE = re.compile(r'<(?:ix:nonFraction|xbrli:context|ix:nonNumeric)\b', re.IGNORECASE)
+# Longest unfinished element carried into the next chunk; larger leftovers are
+# text blocks we never match (e.g. a long ix:nonNumeric) and are dropped.
+MAX_CARRY = 64 * 1024
+ATTR_RE = re.compile(r'([\w:.-]+)\s*=\s*"([^"]*)"')
+TAG_RE = re.compile(r'<[^>]+>')
+DATE_RE = re.compile(r'<xbrli:(startDate|endDate|instant)>\s*([\d-]+)\s*</xbrli:\1>', re.IGNORECASE)
+SEGMENT_RE = re.compile(r'<xbrli:(?:segment|scenario)\b', re.IGNORECASE)
+
+
+def _parse_date(value: str) -> Optional[date]:
+    try:
+        return datetime.strptime(value.strip(), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _parse_number(text: str, fmt: str) -> Optional[float]:
+    """Apply an inline-XBRL transformation format to the displayed text."""
+    fmt = fmt.lower()
+    text = text.strip()
+    if fmt.endswith('fixed-zero') or fmt.endswith('zerodash'):
+        return 0.0
+    if 'comma-decimal' in fmt or 'numcommadecimal' in fmt:
+        text = text.replace('.', '').replace(' ', '').replace(',', '.')
+    else:
+        text = text.replace(',', '').replace(' ', '')
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+class XBRLFactExtractor:
+    """Streaming reader of inline-XBRL ``ix:nonFraction`` facts for the key 10-K metrics.
+
+    The document is scanned with one compiled regex across fixed-size chunks,
+    so no tree is built. Only non-dimensional contexts are used, and the
+    period ending on ``dei:DocumentPeriodEndDate`` (or the latest one found)
+    is reported.
+    """
+
+    def __init__(self, chunk_size: int = 1024 * 1024):
+        self.chunk_size = chunk_size
+
+    def scan(self, chunks: Iterable[str]) -> Tuple[List[Dict], Dict[str, Tuple], Optional[date]]:
+        """Return (facts, contexts, document period end) from a stream of text chunks."""
+        facts = []
+        contexts = {}
+        period_end = None
+        buffer = ''
+        for chunk in chunks:
+            buffer += chunk
+            consumed = 0
+            for match in ELEMENT_RE.finditer(buffer):
+                consumed = match.end()
+                period_end = self._collect(match.groupdict(), facts, contexts) or period_end
+            # Keep only what could still be the start of an unfinished element
+            partial = PARTIAL_RE.search(buffer, max(consumed, len(buffer) - MAX_CARRY))
+            buffer = buffer[partial.start():] if partial else buffer[-32:]
+        return facts, contexts, period_end
+
+    def scan_buffer(self, buffer) -> Tuple[List[Dict], Dict[str, Tuple], Optional[date]]:
+        """Like ``scan``, over UTF-8 bytes or an mmap of them. The buffer is
+        searched in place and only the matched elements are decoded."""
+        facts = []
+        contexts = {}
+        period_end = None
+        for match in ELEMENT_BYTES_RE.finditer(buffer):
+            groups = {
+                name: value.decode('utf-8', errors='replace') if value is not None else None
+                for name, value in match.groupdict().items()
+            }
+            period_end = self._collect(groups, facts, contexts) or period_end
+        return facts, contexts, period_end
+
+    def _collect(self, groups: Dict[str, Optional[str]], facts: List[Dict],
+                 contexts: Dict[str, Tuple]) -> Optional[date]:
+        """Add one matched element to ``facts``/``contexts``; returns the period end it states, if any."""
+        if groups['fact_attrs'] is not None:
+            fact = self._parse_fact(groups['fact_attrs'], groups['fact_value'])
+            if fact:
+                facts.append(fact)
+        elif groups['context_attrs'] is not None:
+            context_id = dict(ATTR_RE.findall(groups['context_attrs'])).get('id')
+            if context_id:
+                contexts[context_id] = self._parse_context(groups['context_body'])
+        else:
+            text = html.unescape(TAG_RE.sub('', groups['period_end']))
+            return self._parse_period_end(text)
+        return None
+
+    @staticmethod
+    def _parse_fact(attr_text: str, value_html: str) -> Optional[Dict]:
+        attrs = dict(ATTR_RE.findall(attr_text))
+        name = attrs.get('name')
+        if name not in WANTED_CONCEPTS:
+            return None
+        text = html.unescape(TAG_RE.sub('', value_html))
+        value = _parse_number(text, attrs.get('format', ''))
+        if value is None:
+            return None
+        try:
+            value *= 10 ** int(attrs.get('scale', 0))
+        except ValueError:
+            pass
+        if attrs.get('sign') == '-':
+            value = -value
+        return {'name': name, 'context': attrs.get('contextRef'), 'value': value}
+
+    @staticmethod
+    def _parse_context(body: str) -> Tuple:
+        """Return (start, end, dimensional) for a context body."""
+        dates = {kind.lower(): _parse_date(value) for kind, value in DATE_RE.findall(body)}
+        end = dates.get('enddate') or dates.get('instant')
+        return dates.get('startdate'), end, bool(SEGMENT_RE.search(body))
+
+    @staticmethod
+    def _parse_period_end(text: str) -> Optional[date]:
+        text = ' '.join(text.replace(',', ', ').split()).replace(' ,', ',')
+        for fmt in ('%B %d, %Y', '%b %d, %Y', '%Y-%m-%d', '%m/%d/%Y'):
+            try:
+                return datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+        return None
+
+    def select_metrics(self, facts: List[Dict], contexts: Dict[str, Tuple],
+                       period_end: Optional[date] = None) -> Dict:
+        """Pick one value per metric for the reporting period."""
+        candidates = []
+        for fact in facts:
+            context = contexts.get(fact['context'])
+            if not context or context[2] or context[1] is None:
+                continue
+            start, end, _ = context
+            candidates.append((fact, start, end))
+        if not candidates:
+            return {}
+
+        ends = {end for _, _, end in candidates}
+        if period_end not in ends:
+            period_end = max(ends)
+
+        metrics = {}
+        for metric, concepts in METRIC_CONCEPTS.items():
+            for concept in concepts:
+                matching = [
+                    (fact, start) for fact, start, end in candidates
+                    if fact['name'] == concept and end == period_end
+                ]
+                if not matching:
+                    continue
+                # Prefer the longest duration (the fiscal year over a quarter)
+                fact, _ = max(matching, key=lambda m: (period_end - m[1]).days if m[1] else 0)
+                metrics[metric] = fact['value']
+                break
+        return add_derived_metrics(metrics)
+
+    def extract(self, html_content: str) -> Dict:
+        """Extract metrics from an in-memory inline-XBRL document."""
+        chunks = (html_content[i:i + self.chunk_size] for i in range(0, len(html_content), self.chunk_size))
+        return self.select_metrics(*self.scan(chunks))
+
+    def extract_buffer(self, buffer) -> Dict:
+        """Extract metrics from UTF-8 document bytes or an mmap, without decoding it whole."""
+        return self.select_metrics(*self.scan_buffer(buffer))
+
+    def extract_file(self, path: str) -> Dict:
+        """Extract metrics by streaming a filing from disk."""
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return self.select_metrics(*self.scan(iter(lambda: f.read(self.chunk_size), '')))
+
+
+xbrl_fact_extractor = XBRLFactExtractor()